@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Indexed store for transcripts, summaries and formatted prompts.
+
+Every artifact saved by the pipeline is also written to a SQLite database
+keyed by video ID, one row per (video, kind, model), so re-processing a
+video replaces its row instead of adding another dated file. Bodies over
+1 KB are zlib-compressed. Lookups by video, channel, day
+and model use indexes rather than directory walks, and `export` rebuilds
+the transcript/, summary/<date>/ and formatted_prompts/<date>/ layout.
+
+This is a migration step: the dated files are still written next to the
+store so existing workflows keep working, so the duplication remains
+until they read from the store instead. The store is the source of
+truth; the files can be deleted at any time and regenerated with export.
+
+Usage:
+  python artifact_store.py get VIDEO_ID --kind summary
+  python artifact_store.py list --channel "Some Channel" --since 2026-01-01
+  python artifact_store.py export ./exported
+  python artifact_store.py stats
+"""
+
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+from config.config_manager import get_setting
+from video_metadata import get_cached_metadata
+from youtube_utils import sanitize_filename
+from search_index import index_document
+
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(__file__), "data", "artifacts.db")
+KINDS = ('transcript', 'summary', 'prompt')
+
+# Bodies up to this size are stored as-is; compressing them saves little
+_COMPRESS_MIN_BYTES = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    title TEXT,
+    channel TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_videos_channel ON videos (channel);
+
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL DEFAULT '',
+    title TEXT,
+    day TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    compressed INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    body BLOB NOT NULL,
+    UNIQUE (video_id, kind, model)
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_day ON artifacts (day);
+CREATE INDEX IF NOT EXISTS idx_artifacts_model ON artifacts (model);
+"""
+
+
+def _encode(text: str):
+    data = text.encode('utf-8')
+    if len(data) < _COMPRESS_MIN_BYTES:
+        return data, 0, len(data)
+    return zlib.compress(data, 6), 1, len(data)
+
+
+def _decode(body: bytes, compressed: int) -> str:
+    return (zlib.decompress(body) if compressed else bytes(body)).decode('utf-8')
+
+
+class ArtifactStore:
+    """
+    Args:
+        path: SQLite database file
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite connections are not shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def put(self, video_id: str, kind: str, text: str, title: Optional[str] = None,
+            channel: Optional[str] = None, model: Optional[str] = None):
+        """
+        Store an artifact, replacing any earlier one for the same video, kind and model.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown artifact kind: {kind}")
+        now = time.time()
+        body, compressed, size = _encode(text)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO videos (video_id, title, channel, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET title = COALESCE(excluded.title, title), "
+                "channel = COALESCE(excluded.channel, channel), updated_at = excluded.updated_at",
+                (video_id, title, channel, now),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (video_id, kind, model, title, day, created_at, compressed, size, body) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (video_id, kind, model or '', title, datetime.date.fromtimestamp(now).isoformat(), now,
+                 compressed, size, body),
+            )
+
+    def get(self, video_id: str, kind: str, model: Optional[str] = None) -> Optional[str]:
+        """
+        Return the newest artifact of this kind for the video (for the given
+        model, if one is given), or None.
+        """
+        query = "SELECT body, compressed FROM artifacts WHERE video_id = ? AND kind = ?"
+        params = [video_id, kind]
+        if model is not None:
+            query += " AND model = ?"
+            params.append(model)
+        row = self._conn().execute(query + " ORDER BY created_at DESC LIMIT 1", params).fetchone()
+        return _decode(*row) if row else None
+
+    def find(self, video_id: Optional[str] = None, channel: Optional[str] = None, since: Optional[str] = None,
+             model: Optional[str] = None, kind: Optional[str] = None, limit: int = 0) -> List[Dict]:
+        """
+        List artifact metadata (no bodies) matching all given filters, newest first.
+        """
+        clauses, params = [], []
+        for column, value in (("a.video_id", video_id), ("v.channel", channel), ("a.model", model),
+                              ("a.kind", kind)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append("a.day >= ?")
+            params.append(since)
+        query = ("SELECT a.video_id, a.kind, a.model, COALESCE(a.title, v.title), v.channel, a.day, a.size "
+                 "FROM artifacts a JOIN videos v ON v.video_id = a.video_id")
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY a.created_at DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        columns = ("video_id", "kind", "model", "title", "channel", "day", "size")
+        return [dict(zip(columns, row)) for row in self._conn().execute(query, params)]
+
+    def stats(self) -> Dict[str, int]:
+        """Return video count, artifact count and raw/stored byte totals."""
+        conn = self._conn()
+        videos = conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+        artifacts, raw, stored = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(body)), 0) FROM artifacts"
+        ).fetchone()
+        return {"videos": videos, "artifacts": artifacts, "raw_bytes": raw, "stored_bytes": stored}
+
+    def export(self, dest_dir: str) -> int:
+        """
+        Write every artifact into the classic layout under dest_dir:
+        transcript/<title>_<date>_transcript.txt,
+        summary/<date>/<date>_<title>_summary.md and
+        formatted_prompts/<date>/<date>_<title>_prompt.txt.
+        Summaries of the same title and day from different models get the
+        model in the name (<date>_<title>_<model>_summary.md) instead of
+        overwriting each other. Returns the number of files written.
+        """
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT a.id, a.kind, a.model, COALESCE(a.title, v.title, a.video_id), a.day "
+            "FROM artifacts a JOIN videos v ON v.video_id = a.video_id ORDER BY a.created_at"
+        ).fetchall()
+        models_per_name: Dict[tuple, set] = {}
+        for _, kind, model, title, day in rows:
+            models_per_name.setdefault((kind, sanitize_filename(title), day), set()).add(model)
+
+        written = 0
+        for artifact_id, kind, model, title, day in rows:
+            title = sanitize_filename(title)
+            if kind == 'transcript':
+                path = os.path.join(dest_dir, "transcript", f"{title}_{day}_transcript.txt")
+            elif kind == 'summary':
+                if len(models_per_name[(kind, title, day)]) > 1:
+                    title = f"{title}_{sanitize_filename(model or 'default')}"
+                path = os.path.join(dest_dir, "summary", day, f"{day}_{title}_summary.md")
+            else:
+                path = os.path.join(dest_dir, "formatted_prompts", day, f"{day}_{title}_prompt.txt")
+            body, compressed = conn.execute("SELECT body, compressed FROM artifacts WHERE id = ?",
+                                            (artifact_id,)).fetchone()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(_decode(body, compressed))
+            written += 1
+        return written
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """
+    Return the process-wide store at ARTIFACT_STORE_PATH (default: data/artifacts.db).
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore(get_setting("ARTIFACT_STORE_PATH", DEFAULT_STORE_PATH))
+        return _store
+
+
+def store_artifact(video_id: Optional[str], kind: str, text: str, title: Optional[str] = None,
+                   model: Optional[str] = None):
+    """
+    Record an artifact for a video in the store, taking the channel from
+    known metadata, and add transcripts and summaries to the search index.
+    Does nothing without a video ID; errors are printed, never raised.
+    """
+    if not video_id:
+        return
+    metadata = get_cached_metadata(video_id)
+    try:
+        get_artifact_store().put(video_id, kind, text, title=(metadata or {}).get('title') or title,
+                                 channel=metadata.get('channel') if metadata else None, model=model)
+    except (sqlite3.Error, OSError) as e:
+        print(f"[ArtifactStore] Could not store {kind} for {video_id}: {e}")
+    index_document(video_id, kind, text, title)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or export the artifact store")
+    parser.add_argument("--store", help=f"Store database (default: {DEFAULT_STORE_PATH})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    get_parser = subparsers.add_parser("get", help="Print one artifact")
+    get_parser.add_argument("video_id")
+    get_parser.add_argument("--kind", choices=KINDS, default="summary", help="Artifact kind (default: summary)")
+    get_parser.add_argument("--model", help="Only the summary made with this model")
+
+    list_parser = subparsers.add_parser("list", help="List stored artifacts")
+    list_parser.add_argument("--video", help="Video ID")
+    list_parser.add_argument("--channel", help="Channel name")
+    list_parser.add_argument("--since", metavar="YYYY-MM-DD", help="Only artifacts stored on or after this day")
+    list_parser.add_argument("--model", help="Model name")
+    list_parser.add_argument("--kind", choices=KINDS, help="Artifact kind")
+    list_parser.add_argument("--limit", type=int, default=50, help="Maximum rows (default: 50, 0 for all)")
+
+    export_parser = subparsers.add_parser("export", help="Write artifacts out in the transcript/summary file layout")
+    export_parser.add_argument("dest", help="Destination directory")
+
+    subparsers.add_parser("stats", help="Show counts and compression")
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.store) if args.store else get_artifact_store()
+    if args.command == "get":
+        text = store.get(args.video_id, args.kind, args.model)
+        if text is None:
+            print(f"No {args.kind} stored for {args.video_id}", file=sys.stderr)
+            sys.exit(1)
+        print(text)
+    elif args.command == "list":
+        rows = store.find(args.video, args.channel, args.since, args.model, args.kind, args.limit)
+        for row in rows:
+            print(f"{row['day']}  {row['video_id']}  {row['kind']:<10}  {row['model'] or '-':<30}  "
+                  f"{row['channel'] or '-'}  {row['title'] or ''}")
+        if not rows:
+            print("No artifacts found.")
+    elif args.command == "export":
+        written = store.export(args.dest)
+        print(f"Exported {written} files to {args.dest}")
+    else:
+        stats = store.stats()
+        ratio = stats["stored_bytes"] / stats["raw_bytes"] if stats["raw_bytes"] else 0
+        print(f"{stats['videos']} videos, {stats['artifacts']} artifacts, "
+              f"{stats['raw_bytes']:,} bytes ({stats['stored_bytes']:,} stored, {ratio:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Non-interactive batch processing for many YouTube videos.
+
+Transcript fetching, title lookup and summarization run as separate stages,
+each with its own bounded worker pool, so transcripts for the next videos
+download while earlier ones are still being summarized. With a deadline,
+each video gets that many seconds of stage running time; time spent
+queued for a worker does not count. A video that runs out is abandoned
+at its next network step and reported as timed out instead of holding
+a worker.
+"""
+
+import datetime
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Union
+
+from youtube_utils import extract_video_id, get_video_title
+from transcript_handler import (fetch_transcript, format_transcript, save_transcript, render_transcript,
+                                report_reduction, clean_transcript, text_size)
+from summarizer import save_summary, StreamingSummaryWriter, get_usage_totals
+from chunked_summarizer import summarize_transcript
+from provider_router import ProviderRouter
+from model_policy import PolicyRouter
+from video_manifest import VideoManifest
+from batch_queue import BatchRun
+from artifact_store import store_artifact
+from prompt_formatter import format_prompt, save_formatted_prompt
+from summary_cache import get_summary_cache
+from http_client import get_http_client
+from tracing import Trace, use_trace, print_stage_table
+from deadline import Deadline, DeadlineExceeded
+
+
+@dataclass
+class VideoResult:
+    """Outcome of processing a single video in a batch."""
+    source: str
+    video_id: Optional[str] = None
+    video_title: Optional[str] = None
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BatchPipeline:
+    """
+    Stage-pipelined batch runner.
+
+    Args:
+        api_key: API key for the selected service (unused in transcript-only mode)
+        grok: Whether to use Grok API
+        use_openai: Whether to use OpenAI API
+        openrouter_model: Model name for OpenRouter
+        transcript_only: Save formatted prompts instead of calling the LLM
+        transcript_workers: Concurrent transcript fetches
+        title_workers: Concurrent title lookups
+        llm_workers: Concurrent LLM calls
+        prefetch: How many videos may be fetched ahead of the LLM stage
+        use_cache: Reuse cached transcripts and summaries
+        stream: Stream LLM responses straight into the summary files
+        chunk_tokens: Map-reduce transcripts longer than this many tokens (0 disables)
+        chunk_workers: Concurrent chunk summaries per video
+        render_mode: Transcript rendering sent to the LLM (see render_transcript)
+        render_interval: Paragraph length in seconds for compact renderings
+        dedupe: Remove rolling auto-caption overlap before formatting
+        trace_log: JSONL file for per-video stage timings (None to skip)
+        router: ProviderRouter or PolicyRouter to use instead of the single provider above
+        manifest: Record each summarized video here
+        run: Durable run record updated as each video moves through the stages
+        deadline: Seconds each video may spend in its stages, not counting
+            time queued for a worker (0 disables)
+    """
+
+    def __init__(self, api_key: Optional[str] = None, grok: bool = False, use_openai: bool = False,
+                 openrouter_model: Optional[str] = None, transcript_only: bool = False,
+                 transcript_workers: int = 4, title_workers: int = 4, llm_workers: int = 2,
+                 prefetch: int = 8, use_cache: bool = True, stream: bool = False,
+                 chunk_tokens: int = 0, chunk_workers: int = 4, render_mode: str = 'full',
+                 render_interval: int = 60, dedupe: bool = True, trace_log: Optional[str] = None,
+                 router: Optional[Union[ProviderRouter, PolicyRouter]] = None, manifest: Optional[VideoManifest] = None,
+                 run: Optional[BatchRun] = None, deadline: float = 0.0):
+        self.api_key = api_key
+        self.grok = grok
+        self.use_openai = use_openai
+        self.openrouter_model = openrouter_model
+        self.transcript_only = transcript_only
+        self.transcript_workers = transcript_workers
+        self.title_workers = title_workers
+        self.llm_workers = llm_workers
+        self.prefetch = prefetch
+        self.use_cache = use_cache
+        self.stream = stream
+        self.chunk_tokens = chunk_tokens
+        self.chunk_workers = chunk_workers
+        self.render_mode = render_mode
+        self.render_interval = render_interval
+        self.dedupe = dedupe
+        self.trace_log = trace_log
+        self.router = router
+        self.manifest = manifest
+        self.run_record = run
+        self.deadline = deadline
+
+    def start(self):
+        """
+        Create the stage worker pools. run() does this itself; long-lived
+        callers start once, submit() videos as they arrive and close() at the end.
+        """
+        # Caps how far transcript fetching may run ahead of summarization
+        self._slots = threading.BoundedSemaphore(self.llm_workers + self.prefetch)
+        self._transcript_pool = ThreadPoolExecutor(self.transcript_workers, thread_name_prefix="transcript")
+        self._title_pool = ThreadPoolExecutor(self.title_workers, thread_name_prefix="title")
+        self._llm_pool = ThreadPoolExecutor(self.llm_workers, thread_name_prefix="llm")
+
+    def close(self):
+        """Wait for submitted videos to finish and shut the worker pools down."""
+        self._transcript_pool.shutdown()
+        self._title_pool.shutdown()
+        self._llm_pool.shutdown()
+
+    def submit(self, url: str) -> Future:
+        """
+        Queue one video and return a Future resolving to its VideoResult.
+        Blocks while llm_workers + prefetch videos are already in flight.
+        """
+        done = Future()
+        result = VideoResult(source=url)
+        # A video resumed after its transcript stage reads the checkpointed transcript back,
+        # even if its summary step failed afterwards
+        resumed = False
+        if self.run_record:
+            resumed = self.run_record.transcript_fetched(url)
+            self.run_record.start_attempt(url)
+        try:
+            result.video_id = extract_video_id(url)
+        except ValueError as e:
+            result.error = str(e)
+            if self.run_record:
+                self.run_record.mark(url, 'failed', result.error)
+            done.set_result(result)
+            return done
+
+        self._slots.acquire()
+        done.add_done_callback(lambda _: self._slots.release())
+        trace = Trace(result.video_id, self.trace_log,
+                      Deadline(self.deadline, paused=True) if self.deadline else None)
+
+        title_future = self._title_pool.submit(self._traced, trace, get_video_title, result.video_id)
+        transcript_future = self._transcript_pool.submit(self._traced, trace, fetch_transcript,
+                                                         result.video_id, self.use_cache or resumed,
+                                                         self.run_record is not None)
+        transcript_future.add_done_callback(
+            lambda f: self._on_transcript(f, result, title_future, done, trace, self._llm_pool)
+        )
+        return done
+
+    def run(self, urls: Iterable[str]) -> List[VideoResult]:
+        """
+        Process every URL and return one VideoResult per input, in input order.
+        """
+        start_time = time.monotonic()
+        self.start()
+        try:
+            pending = [self.submit(url) for url in urls]
+            wait(pending)
+        finally:
+            self.close()
+        results = [future.result() for future in pending]
+
+        self._report(results, time.monotonic() - start_time)
+        if self.use_cache and not self.transcript_only:
+            stats = get_summary_cache().stats()
+            print(f"[Batch] Summary cache: {stats['hits']} hits, {stats['misses']} misses")
+        usage = get_usage_totals()
+        if usage["prompt_tokens"]:
+            print(f"[Batch] LLM: {usage['calls']} calls, {usage['prompt_tokens']} prompt tokens "
+                  f"({usage['cached_tokens'] / usage['prompt_tokens']:.0%} served from provider prompt cache), "
+                  f"{usage['completion_tokens']} completion tokens")
+        http_stats = get_http_client().stats()
+        print(f"[Batch] HTTP: {http_stats['requests']} requests, {http_stats['retries']} retries, "
+              f"{http_stats['reused_connections']} reused / {http_stats['new_connections']} new connections")
+        if self.router:
+            self.router.print_stats()
+        print_stage_table()
+        return results
+
+    def _on_transcript(self, transcript_future: Future, result: VideoResult, title_future: Future,
+                       done: Future, trace: Trace, llm_pool: ThreadPoolExecutor):
+        """Hand a fetched transcript to the LLM stage, or finish the video on failure."""
+        try:
+            transcript = transcript_future.result()
+            if transcript is None:
+                result.error = "No transcript available"
+                self._complete(result, trace, done)
+                return
+            if self.run_record:
+                self.run_record.mark(result.source, 'transcript_fetched')
+            llm_future = llm_pool.submit(self._traced, trace, self._finish, result, transcript, title_future)
+        except DeadlineExceeded as e:
+            self._time_out(result, e)
+            self._complete(result, trace, done)
+            return
+        except Exception as e:
+            result.error = f"Transcript error: {e}"
+            self._complete(result, trace, done)
+            return
+        llm_future.add_done_callback(lambda _: self._complete(result, trace, done))
+
+    def _complete(self, result: VideoResult, trace: Trace, done: Future):
+        """Record the video's trace, manifest entry and run state, then release its pipeline slot."""
+        try:
+            if self.manifest and result.ok and not self.transcript_only:
+                self.manifest.mark_processed(result.video_id, result.output_path)
+            if self.run_record:
+                state = 'summarized' if result.ok else 'timed_out' if result.timed_out else 'failed'
+                self.run_record.mark(result.source, state, result.error, result.output_path)
+            trace.finish("ok" if result.ok else "timeout" if result.timed_out else "failed", result.error)
+        finally:
+            # run() waits on this future; it must resolve even if the bookkeeping above fails
+            done.set_result(result)
+
+    @staticmethod
+    def _time_out(result: VideoResult, error: DeadlineExceeded):
+        print(f"[Batch] {result.video_id}: {error}")
+        result.error = str(error)
+        result.timed_out = True
+
+    @staticmethod
+    def _traced(trace: Trace, fn, *args):
+        """
+        Run a stage function in a worker thread with the video's trace active
+        and its deadline clock running.
+        """
+        with use_trace(trace), (trace.deadline.running() if trace.deadline else nullcontext()):
+            return fn(*args)
+
+    def _summary_args(self) -> dict:
+        return dict(grok=self.grok, use_openai=self.use_openai, openrouter_model=self.openrouter_model,
+                    use_cache=self.use_cache, chunk_tokens=self.chunk_tokens, chunk_workers=self.chunk_workers,
+                    router=self.router)
+
+    def _finish(self, result: VideoResult, transcript, title_future: Future):
+        """Format, save and summarize a single video (LLM stage)."""
+        try:
+            result.video_title = title_future.result()
+            if self.dedupe:
+                transcript = clean_transcript(transcript)
+            transcript_content = format_transcript(transcript, result.video_title)
+            save_transcript(transcript_content, result.video_title, result.video_id)
+            if self.render_mode != 'full':
+                # Only one full-length rendering is held at a time
+                full_size = text_size(transcript_content)
+                del transcript_content
+                transcript_content = render_transcript(transcript, result.video_title,
+                                                       self.render_mode, self.render_interval)
+                report_reduction(full_size, transcript_content, self.render_mode)
+            current_date = datetime.datetime.now().strftime('%Y-%m-%d')
+
+            if self.transcript_only:
+                formatted_prompt = format_prompt(transcript_content)
+                result.output_path = save_formatted_prompt(formatted_prompt, result.video_title, current_date,
+                                                           result.video_id)
+                return
+
+            if self.stream:
+                with StreamingSummaryWriter(result.video_title, current_date) as writer:
+                    response = summarize_transcript(transcript_content, self.api_key, stream=True, on_token=writer,
+                                                    video_id=result.video_id, **self._summary_args())
+                result.output_path = writer.path
+                if not response:
+                    result.error = "API call failed (partial summary kept)"
+                    return
+                store_artifact(result.video_id, 'summary', response['choices'][0]['message']['content'],
+                               result.video_title, response.get('model'))
+            else:
+                response = summarize_transcript(transcript_content, self.api_key, video_id=result.video_id,
+                                                **self._summary_args())
+                if not response:
+                    result.error = "API call failed"
+                    return
+                summary = response['choices'][0]['message']['content']
+                result.output_path = save_summary(summary, result.video_title, current_date,
+                                                  result.video_id, response.get('model'))
+            print(f"[Batch] Summary saved to {result.output_path}")
+        except DeadlineExceeded as e:
+            self._time_out(result, e)
+        except KeyError as e:
+            result.error = f"Error parsing API response: {e}"
+        except Exception as e:
+            result.error = f"Unexpected error: {e}"
+
+    @staticmethod
+    def _report(results: List[VideoResult], elapsed: float):
+        """Print per-video failures and overall throughput."""
+        succeeded = sum(1 for r in results if r.ok)
+        failed = [r for r in results if not r.ok]
+        if failed:
+            print("\n[Batch] Failed videos:")
+            for r in failed:
+                print(f"  {r.video_id or r.source}: {r.error}")
+        timed_out = sum(1 for r in failed if r.timed_out)
+        if timed_out:
+            print(f"[Batch] {timed_out} videos ran out of time")
+        per_minute = succeeded / elapsed * 60 if elapsed > 0 else 0.0
+        print(f"\n[Batch] {succeeded}/{len(results)} videos succeeded in {elapsed:.1f}s "
+              f"({per_minute:.2f} videos/min)")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Durable record of batch runs, so an interrupted run can be resumed.
+
+Every batch run gets an ID and one row per video with its state
+(pending, transcript_fetched, summarized, failed or timed_out, for a
+video that ran out of its deadline), the number of attempts and the last
+error. States are committed as each stage finishes,
+so after a crash, Ctrl-C or reboot `youtube_summary.py --resume RUN_ID`
+redoes only the videos that were in flight, failed or timed out. Fetched transcripts
+are checkpointed in the transcript cache and flagged on the video's row,
+which a later failure does not clear, so a resumed video that got past the
+transcript stage skips the download.
+
+Usage:
+  python batch_queue.py list
+  python batch_queue.py show RUN_ID [--state failed]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from config.config_manager import get_setting
+
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(__file__), "data", "batch_queue.db")
+STATES = ('pending', 'transcript_fetched', 'summarized', 'failed', 'timed_out')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    options TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    run_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    output_path TEXT,
+    updated_at REAL NOT NULL,
+    transcript_fetched INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, source)
+);
+"""
+
+
+def _migrate(conn: sqlite3.Connection):
+    """Add the transcript_fetched flag to queues created before it existed."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(items)")}
+    if "transcript_fetched" not in columns:
+        with conn:
+            conn.execute("ALTER TABLE items ADD COLUMN transcript_fetched INTEGER NOT NULL DEFAULT 0")
+            conn.execute("UPDATE items SET transcript_fetched = 1 WHERE state = 'transcript_fetched'")
+
+
+class BatchQueue:
+    """
+    Args:
+        path: SQLite database file (default: BATCH_QUEUE_PATH or data/batch_queue.db)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_setting("BATCH_QUEUE_PATH", DEFAULT_QUEUE_PATH)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; pipeline callbacks update items from worker threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            _migrate(conn)
+            self._local.conn = conn
+        return conn
+
+    def create_run(self, urls: List[str], options: Dict) -> "BatchRun":
+        """Record a new run over `urls` with the options needed to resume it."""
+        run_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT INTO runs (run_id, created_at, options) VALUES (?, ?, ?)",
+                         (run_id, now, json.dumps(options)))
+            conn.executemany(
+                "INSERT OR IGNORE INTO items (run_id, position, source, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, position, url, 'pending', now) for position, url in enumerate(urls)],
+            )
+        return BatchRun(self, run_id)
+
+    def get_run(self, run_id: str) -> Optional["BatchRun"]:
+        """Return the run with this ID ("last" for the newest), or None."""
+        if run_id == "last":
+            row = self._conn().execute("SELECT run_id FROM runs ORDER BY created_at DESC LIMIT 1").fetchone()
+        else:
+            row = self._conn().execute("SELECT run_id FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return BatchRun(self, row[0]) if row else None
+
+    def runs(self, limit: int = 20) -> List[Dict]:
+        """Recent runs, newest first, with per-state video counts."""
+        conn = self._conn()
+        runs = []
+        for run_id, created_at in conn.execute(
+                "SELECT run_id, created_at FROM runs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall():
+            runs.append({"run_id": run_id, "created_at": created_at, "counts": BatchRun(self, run_id).counts()})
+        return runs
+
+
+class BatchRun:
+    """One recorded run; the methods update its videos' states."""
+
+    def __init__(self, queue: BatchQueue, run_id: str):
+        self.queue = queue
+        self.run_id = run_id
+
+    def options(self) -> Dict:
+        row = self.queue._conn().execute("SELECT options FROM runs WHERE run_id = ?", (self.run_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def remaining(self, max_attempts: int = 3) -> List[str]:
+        """Sources still to do: unfinished videos, and failed or timed-out ones with attempts left."""
+        rows = self.queue._conn().execute(
+            "SELECT source FROM items WHERE run_id = ? AND state != 'summarized' "
+            "AND (state NOT IN ('failed', 'timed_out') OR attempts < ?) ORDER BY position",
+            (self.run_id, max_attempts),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def state(self, source: str) -> Optional[str]:
+        row = self.queue._conn().execute("SELECT state FROM items WHERE run_id = ? AND source = ?",
+                                         (self.run_id, source)).fetchone()
+        return row[0] if row else None
+
+    def transcript_fetched(self, source: str) -> bool:
+        """Whether an earlier attempt checkpointed the video's transcript, whatever its state now."""
+        row = self.queue._conn().execute("SELECT transcript_fetched FROM items WHERE run_id = ? AND source = ?",
+                                         (self.run_id, source)).fetchone()
+        return bool(row and row[0])
+
+    def items(self, state: Optional[str] = None) -> List[Dict]:
+        query = "SELECT source, state, attempts, error, output_path FROM items WHERE run_id = ?"
+        params = [self.run_id]
+        if state:
+            query += " AND state = ?"
+            params.append(state)
+        columns = ("source", "state", "attempts", "error", "output_path")
+        return [dict(zip(columns, row)) for row in self.queue._conn().execute(query + " ORDER BY position", params)]
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.queue._conn().execute("SELECT state, COUNT(*) FROM items WHERE run_id = ? GROUP BY state",
+                                          (self.run_id,)).fetchall()
+        return dict(rows)
+
+    def start_attempt(self, source: str):
+        """Count an attempt at a video; a failed or timed-out one goes back to pending."""
+        self._execute("UPDATE items SET attempts = attempts + 1, "
+                      "state = CASE WHEN state IN ('failed', 'timed_out') THEN 'pending' ELSE state END, "
+                      "updated_at = ? "
+                      "WHERE run_id = ? AND source = ?", (time.time(), self.run_id, source))
+
+    def mark(self, source: str, state: str, error: Optional[str] = None, output_path: Optional[str] = None):
+        """Record a video's new state. Errors are printed, never raised."""
+        self._execute("UPDATE items SET state = ?, error = ?, output_path = COALESCE(?, output_path), "
+                      "transcript_fetched = MAX(transcript_fetched, ?), "
+                      "updated_at = ? WHERE run_id = ? AND source = ?",
+                      (state, error, output_path, state == 'transcript_fetched', time.time(), self.run_id, source))
+
+    def _execute(self, sql: str, params):
+        try:
+            conn = self.queue._conn()
+            with conn:
+                conn.execute(sql, params)
+        except (sqlite3.Error, OSError) as e:
+            print(f"[BatchQueue] Could not update run {self.run_id}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect recorded batch runs")
+    parser.add_argument("--queue", help=f"Queue database (default: {DEFAULT_QUEUE_PATH})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    list_parser = subparsers.add_parser("list", help="Recent runs with per-state counts")
+    list_parser.add_argument("--limit", type=int, default=20, help="Maximum runs (default: 20)")
+    show_parser = subparsers.add_parser("show", help="Videos of one run")
+    show_parser.add_argument("run_id", help="Run ID, or 'last'")
+    show_parser.add_argument("--state", choices=STATES, help="Only videos in this state")
+    args = parser.parse_args()
+
+    queue = BatchQueue(args.queue)
+    if args.command == "list":
+        runs = queue.runs(args.limit)
+        for run in runs:
+            counts = ", ".join(f"{count} {state}" for state, count in sorted(run["counts"].items()))
+            print(f"{run['run_id']}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(run['created_at']))}  {counts}")
+        if not runs:
+            print("No runs recorded.")
+    else:
+        run = queue.get_run(args.run_id)
+        if run is None:
+            print(f"Unknown run: {args.run_id}")
+            return
+        for item in run.items(args.state):
+            error = f"  {item['error']}" if item["error"] else ""
+            print(f"{item['state']:<18}  {item['attempts']}  {item['source']}{error}")
+
+
+if __name__ == "__main__":
+    main()
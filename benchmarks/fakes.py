@@ -0,0 +1,360 @@
+"""
+Local stand-ins for the services the pipeline talks to.
+
+- FakeLLMServer: an OpenAI-compatible /v1/chat/completions endpoint with
+  configurable latency, token rate, streaming and 429 responses
+- FakeYouTubeServer: the oEmbed endpoint and a watch page carrying the
+  title meta tag, as read by get_video_title
+- FakeTranscriptApi: a drop-in for YouTubeTranscriptApi that serves
+  synthetic rolling auto-captions from a few seconds up to 10 hours
+
+Synthetic video IDs encode the transcript length (see fake_video_id), so
+every component agrees on what a given video contains.
+"""
+
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from youtube_transcript_api import FetchedTranscript, FetchedTranscriptSnippet, NoTranscriptFound
+
+from token_utils import estimate_tokens
+
+
+# Transcript lengths in seconds
+TRANSCRIPT_SIZES = {
+    'tiny': 30,
+    'short': 10 * 60,
+    'medium': 60 * 60,
+    'long': 3 * 60 * 60,
+    'huge': 10 * 60 * 60,
+}
+
+_WORDS = (
+    "the model data we result network energy market growth system really so "
+    "and this that because actually going think important question answer "
+    "example people time year point problem research number first different"
+).split()
+
+
+def fake_video_id(seconds: int, index: int = 0) -> str:
+    """Return a synthetic video ID whose transcript lasts `seconds`."""
+    return f"fake-{seconds}-{index}"
+
+
+def _video_seconds(video_id: str) -> int:
+    try:
+        return int(video_id.split('-')[1])
+    except (IndexError, ValueError):
+        return TRANSCRIPT_SIZES['short']
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients drop connections on purpose (e.g. the streamed watch page read)
+        pass
+
+
+class _ServerThread:
+    """Run a ThreadingHTTPServer on a free localhost port in a daemon thread."""
+
+    handler_class = BaseHTTPRequestHandler
+
+    def start(self):
+        handler = type("Handler", (self.handler_class,), {"fake": self})
+        self._server = _Server(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: Optional[Dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _message_text(message: Dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return content
+
+
+class _LLMHandler(_QuietHandler):
+
+    def do_POST(self):
+        fake: FakeLLMServer = self.fake
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if urlparse(self.path).path != "/v1/chat/completions":
+            self.send_body(404, b'{"error": "not found"}', "application/json")
+            return
+
+        if fake.should_rate_limit():
+            self.send_body(429, b'{"error": {"message": "rate limited"}}', "application/json",
+                           {"Retry-After": str(fake.retry_after)})
+            return
+
+        messages = [_message_text(m) for m in request.get("messages", [])]
+        prompt_tokens = sum(estimate_tokens(text) for text in messages)
+        # Simulate provider prefix caching of a repeated leading system message
+        cached_tokens = estimate_tokens(messages[0]) if messages and fake.seen_prefix(messages[0]) else 0
+        words = [_WORDS[i % len(_WORDS)] for i in range(fake.completion_tokens)]
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                 "total_tokens": prompt_tokens + len(words),
+                 "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+        model = request.get("model", "fake-model")
+        time.sleep(fake.latency)
+
+        if request.get("stream"):
+            self._stream(words, usage, model, fake.tokens_per_second)
+            return
+        if fake.tokens_per_second:
+            time.sleep(len(words) / fake.tokens_per_second)
+        response = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                         "finish_reason": "stop"}],
+            "usage": usage,
+        }
+        self.send_body(200, json.dumps(response).encode("utf-8"), "application/json")
+
+    def _stream(self, words: List[str], usage: Dict, model: str, tokens_per_second: float):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        delay = 1.0 / tokens_per_second if tokens_per_second else 0.0
+        for i, word in enumerate(words):
+            chunk = {"id": "chatcmpl-fake", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word},
+                                  "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if delay:
+                self.wfile.flush()
+                time.sleep(delay)
+        final = {"id": "chatcmpl-fake", "model": model,
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self.wfile.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class FakeLLMServer(_ServerThread):
+    """
+    OpenAI-compatible chat completions server.
+
+    Args:
+        latency: Seconds before the first byte of every response
+        completion_tokens: Words in every completion
+        tokens_per_second: Generation rate (0 returns the completion at once)
+        rate_limit_every: Answer every Nth request with 429 (0 disables)
+        retry_after: Retry-After seconds sent with 429 responses
+    """
+
+    handler_class = _LLMHandler
+
+    def __init__(self, latency: float = 0.2, completion_tokens: int = 300, tokens_per_second: float = 0.0,
+                 rate_limit_every: int = 0, retry_after: float = 0):
+        self.latency = latency
+        self.completion_tokens = completion_tokens
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.rate_limited = 0
+        self._prefixes = set()
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as OPENROUTER_BASE_URL / OPENAI_BASE_URL / GROK_BASE_URL."""
+        return f"{self.base_url}/v1"
+
+    def seen_prefix(self, text: str) -> bool:
+        """Record a prompt prefix; True if an earlier request already sent it."""
+        with self._lock:
+            seen = text in self._prefixes
+            self._prefixes.add(text)
+            return seen
+
+    def should_rate_limit(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            limited = bool(self.rate_limit_every) and self.requests % self.rate_limit_every == 0
+            if limited:
+                self.rate_limited += 1
+            return limited
+
+
+class _YouTubeHandler(_QuietHandler):
+
+    def do_GET(self):
+        fake: FakeYouTubeServer = self.fake
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        time.sleep(fake.latency)
+
+        if parsed.path == "/oembed":
+            if not fake.oembed:
+                self.send_body(401, b"Unauthorized", "text/html")
+                return
+            video_id = parse_qs(urlparse(query.get("url", [""])[0]).query).get("v", [""])[0]
+            body = {"title": fake.title_for(video_id), "author_name": "Benchmark Channel", "type": "video"}
+            self.send_body(200, json.dumps(body).encode("utf-8"), "application/json")
+        elif parsed.path == "/watch":
+            video_id = query.get("v", [""])[0]
+            self.send_body(200, fake.watch_page(video_id), "text/html; charset=utf-8")
+        else:
+            self.send_body(404, b"Not Found", "text/html")
+
+
+class FakeYouTubeServer(_ServerThread):
+    """
+    Serves /oembed and /watch the way get_video_metadata reads them.
+
+    Args:
+        latency: Seconds before every response
+        oembed: Serve oEmbed; when False it answers 401 so lookups fall back
+            to the watch page
+        head_bytes: Filler placed before the title meta tag
+        page_bytes: Approximate total size of a watch page
+    """
+
+    handler_class = _YouTubeHandler
+
+    def __init__(self, latency: float = 0.05, oembed: bool = True, head_bytes: int = 64 * 1024,
+                 page_bytes: int = 1024 * 1024):
+        self.latency = latency
+        self.oembed = oembed
+        self.head_bytes = head_bytes
+        self.page_bytes = page_bytes
+
+    @staticmethod
+    def title_for(video_id: str) -> str:
+        return f"Benchmark video {video_id}"
+
+    def watch_page(self, video_id: str) -> bytes:
+        filler = b"<script>var ytcfg = {};</script>\n"
+        head = filler * (self.head_bytes // len(filler))
+        title = html.escape(self.title_for(video_id)).encode("utf-8")
+        body = filler * (max(0, self.page_bytes - self.head_bytes) // len(filler))
+        return (b"<!DOCTYPE html><html><head>" + head
+                + b'<meta name="title" content="' + title + b'">'
+                + b"</head><body>" + body + b"</body></html>")
+
+
+class _FakeTranscript:
+    """Mimics youtube_transcript_api.Transcript for one synthetic track."""
+
+    def __init__(self, api: "FakeTranscriptApi", video_id: str, language_code: str = 'en'):
+        self.api = api
+        self.video_id = video_id
+        self.language_code = language_code
+        self.language = "English" if language_code == 'en' else language_code
+        self.is_generated = True
+        self.is_translatable = True
+
+    def translate(self, language_code: str) -> "_FakeTranscript":
+        return _FakeTranscript(self.api, self.video_id, language_code)
+
+    def fetch(self) -> FetchedTranscript:
+        time.sleep(self.api.latency)
+        return FetchedTranscript(
+            snippets=synthetic_snippets(_video_seconds(self.video_id), seed=self.video_id),
+            video_id=self.video_id,
+            language=self.language,
+            language_code=self.language_code,
+            is_generated=self.is_generated,
+        )
+
+
+class _FakeTranscriptList:
+
+    def __init__(self, api: "FakeTranscriptApi", video_id: str):
+        self.api = api
+        self.video_id = video_id
+
+    def find_transcript(self, language_codes):
+        if 'en' in language_codes:
+            return _FakeTranscript(self.api, self.video_id)
+        raise NoTranscriptFound(self.video_id, language_codes, self)
+
+    def __iter__(self):
+        return iter([_FakeTranscript(self.api, self.video_id)])
+
+    def __str__(self):
+        return f"synthetic English captions for {self.video_id}"
+
+
+class FakeTranscriptApi:
+    """
+    Stand-in for YouTubeTranscriptApi. Every video has one auto-generated
+    English track whose length comes from its ID (see fake_video_id).
+
+    Args:
+        latency: Seconds spent in each list() and fetch() call
+    """
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+
+    def list(self, video_id: str) -> _FakeTranscriptList:
+        time.sleep(self.latency)
+        return _FakeTranscriptList(self, video_id)
+
+
+def synthetic_snippets(seconds: int, seed: str = "", entry_seconds: float = 3.0,
+                       words_per_entry: int = 8, overlap_words: int = 4) -> List[FetchedTranscriptSnippet]:
+    """
+    Generate rolling auto-caption entries: each entry repeats the last
+    overlap_words of the previous one before its new words.
+    """
+    rng = random.Random(seed)
+    snippets = []
+    previous: List[str] = []
+    start = 0.0
+    while start < seconds:
+        new_words = [rng.choice(_WORDS) for _ in range(words_per_entry)]
+        words = previous[-overlap_words:] + new_words if overlap_words else new_words
+        snippets.append(FetchedTranscriptSnippet(text=" ".join(words), start=start, duration=entry_seconds))
+        previous = new_words
+        start += entry_seconds
+    return snippets
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the transcript and summary pipeline.
+
+YouTube, the transcript API and the LLM providers are replaced by the local
+fakes in benchmarks/fakes.py, and every cache, output file and ledger goes
+to a temporary directory, so runs need no network and cost nothing.
+
+Scenarios:
+  transcript   get_transcript for each synthetic transcript size
+  title        get_video_title via oEmbed and via the watch page
+  summary      get_summary, non-streaming and streaming
+  end-to-end   BatchPipeline over a batch of videos
+
+Each scenario reports latency percentiles, throughput and peak traced
+Python memory (tracemalloc), so results are comparable between commits on
+the same machine.
+
+Usage (from the project root):
+  python -m benchmarks.run
+  python -m benchmarks.run --scenario transcript --sizes tiny,huge --iterations 3
+  python -m benchmarks.run --llm-latency 0.5 --rate-limit-every 5 --json before.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import transcript_handler
+import video_metadata
+from batch_pipeline import BatchPipeline
+from config.config_manager import get_setting
+from summarizer import get_summary
+from tracing import _percentile
+from youtube_utils import get_video_title
+from benchmarks.fakes import (FakeLLMServer, FakeTranscriptApi, FakeYouTubeServer, TRANSCRIPT_SIZES,
+                              fake_video_id, synthetic_snippets)
+
+
+SCENARIOS = ('transcript', 'title', 'summary', 'end-to-end')
+
+
+def measure(name: str, fn: Callable[[int], None], iterations: int, concurrency: int = 1,
+            verbose: bool = False) -> Dict:
+    """
+    Call fn(i) for i in range(iterations) on `concurrency` threads and
+    return latency percentiles, throughput and peak traced memory.
+    """
+    latencies: List[float] = []
+
+    def timed(i: int):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    tracemalloc.start()
+    start = time.perf_counter()
+    with output:
+        if concurrency > 1:
+            with ThreadPoolExecutor(concurrency) as pool:
+                list(pool.map(timed, range(iterations)))
+        else:
+            for i in range(iterations):
+                timed(i)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return summarize(name, latencies, elapsed, peak)
+
+
+def summarize(name: str, latencies: List[float], elapsed: float, peak_bytes: int) -> Dict:
+    values = sorted(latencies)
+    return {
+        "scenario": name,
+        "count": len(values),
+        "p50": _percentile(values, 0.5) if values else None,
+        "p95": _percentile(values, 0.95) if values else None,
+        "p99": _percentile(values, 0.99) if values else None,
+        "max": values[-1] if values else None,
+        "throughput": len(values) / elapsed if elapsed > 0 else 0.0,
+        "peak_mb": peak_bytes / (1024 * 1024),
+    }
+
+
+def bench_transcript(args) -> List[Dict]:
+    results = []
+    for size in args.sizes:
+        seconds = TRANSCRIPT_SIZES[size]
+
+        def run(i, seconds=seconds):
+            text, _ = transcript_handler.get_transcript(fake_video_id(seconds, i), video_title="Benchmark",
+                                                        use_cache=args.cache, render_mode=args.render)
+            if text is None:
+                raise RuntimeError("get_transcript returned no transcript")
+        results.append(measure(f"transcript[{size}]", run, args.iterations, verbose=args.verbose))
+    return results
+
+
+def bench_title(args, youtube: FakeYouTubeServer) -> List[Dict]:
+    results = []
+    for source, oembed in (("oembed", True), ("watch-page", False)):
+        youtube.oembed = oembed
+        video_metadata._memory.clear()
+
+        def run(i, source=source):
+            # Distinct IDs so neither the memory nor the disk cache answers
+            title = get_video_title(f"title-{source}-{time.monotonic_ns()}-{i}")
+            if not title.startswith("Benchmark_video"):
+                raise RuntimeError(f"Unexpected title: {title}")
+        results.append(measure(f"title[{source}]", run, args.iterations * 5, args.concurrency,
+                               verbose=args.verbose))
+    youtube.oembed = True
+    return results
+
+
+def bench_summary(args) -> List[Dict]:
+    snippets = synthetic_snippets(TRANSCRIPT_SIZES['short'], seed="summary")
+    transcript = transcript_handler.format_transcript(snippets, "Benchmark")
+    results = []
+    for stream in (False, True):
+        def run(i, stream=stream):
+            response = get_summary(transcript, "benchmark-key", openrouter_model="bench/fake-model",
+                                   use_cache=args.cache, stream=stream)
+            if not response:
+                raise RuntimeError("get_summary failed")
+        results.append(measure(f"summary[{'stream' if stream else 'json'}]", run, args.iterations,
+                               args.concurrency, verbose=args.verbose))
+    return results
+
+
+def bench_end_to_end(args, workdir: str) -> List[Dict]:
+    results = []
+    for size in args.sizes:
+        seconds = TRANSCRIPT_SIZES[size]
+        trace_log = os.path.join(workdir, f"trace-{size}.jsonl")
+        urls = [f"https://www.youtube.com/watch?v={fake_video_id(seconds, 1000 + i)}" for i in range(args.videos)]
+        pipeline = BatchPipeline(api_key="benchmark-key", openrouter_model="bench/fake-model",
+                                 use_cache=args.cache, render_mode=args.render, trace_log=trace_log,
+                                 chunk_tokens=args.chunk_tokens)
+
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        tracemalloc.start()
+        start = time.perf_counter()
+        with output:
+            batch = pipeline.run(urls)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        failed = [r for r in batch if not r.ok]
+        if failed:
+            print(f"[Benchmark] end-to-end[{size}]: {len(failed)} videos failed, first error: {failed[0].error}")
+        with open(trace_log, 'r', encoding='utf-8') as f:
+            latencies = [json.loads(line)["total_seconds"] for line in f if line.strip()]
+        results.append(summarize(f"end-to-end[{size}]", latencies, elapsed, peak))
+    return results
+
+
+def print_results(results: List[Dict]):
+    width = max(len(r["scenario"]) for r in results)
+    print(f"\n{'scenario':<{width}}  {'n':>4}  {'p50 (s)':>8}  {'p95 (s)':>8}  {'p99 (s)':>8}  "
+          f"{'max (s)':>8}  {'ops/s':>8}  {'peak MB':>8}")
+    for r in results:
+        print(f"{r['scenario']:<{width}}  {r['count']:>4}  {r['p50']:>8.3f}  {r['p95']:>8.3f}  {r['p99']:>8.3f}  "
+              f"{r['max']:>8.3f}  {r['throughput']:>8.2f}  {r['peak_mb']:>8.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the offline pipeline benchmarks")
+    parser.add_argument("--scenario", choices=SCENARIOS + ('all',), default='all', help="Scenario to run (default: all)")
+    parser.add_argument("--sizes", default="tiny,short,medium,long,huge",
+                        help=f"Comma-separated transcript sizes: {', '.join(TRANSCRIPT_SIZES)}")
+    parser.add_argument("--iterations", type=int, default=5, help="Calls per measurement (default: 5)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent calls for title/summary (default: 1)")
+    parser.add_argument("--videos", type=int, default=8, help="Videos per end-to-end batch (default: 8)")
+    parser.add_argument("--render", choices=transcript_handler.RENDER_MODES, default='full', help="Transcript rendering mode (default: full)")
+    parser.add_argument("--chunk-tokens", type=int, default=0, help="Map-reduce threshold for end-to-end (default: off)")
+    parser.add_argument("--cache", action="store_true", help="Leave the transcript/summary caches on (default: cold)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM time to first byte (default: 0.2s)")
+    parser.add_argument("--llm-tokens", type=int, default=300, help="Fake completion length in words (default: 300)")
+    parser.add_argument("--llm-tps", type=float, default=0.0, help="Fake generation rate, tokens/s (default: instant)")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Fake LLM answers every Nth request with 429")
+    parser.add_argument("--youtube-latency", type=float, default=0.05, help="Fake YouTube response delay (default: 0.05s)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the results to a JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    args = parser.parse_args()
+    args.sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in args.sizes if s not in TRANSCRIPT_SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+    return args
+
+
+def main():
+    args = parse_args()
+    # Load .env first so it cannot override the benchmark settings below
+    get_setting("OUTPUT_DIR", "")
+
+    with tempfile.TemporaryDirectory(prefix="yt-bench-") as workdir, \
+            FakeLLMServer(args.llm_latency, args.llm_tokens, args.llm_tps, args.rate_limit_every) as llm, \
+            FakeYouTubeServer(args.youtube_latency) as youtube:
+        os.environ.update({
+            "OUTPUT_DIR": workdir,
+            "TRANSCRIPT_CACHE_DIR": os.path.join(workdir, "cache", "transcripts"),
+            "SUMMARY_CACHE_DIR": os.path.join(workdir, "cache", "summaries"),
+            "METADATA_CACHE_DIR": os.path.join(workdir, "cache", "metadata"),
+            "USAGE_LEDGER_PATH": os.path.join(workdir, "data", "usage_ledger.db"),
+            "MANIFEST_PATH": os.path.join(workdir, "data", "manifest.db"),
+            "ARTIFACT_STORE_PATH": os.path.join(workdir, "data", "artifacts.db"),
+            "SEARCH_INDEX_PATH": os.path.join(workdir, "data", "search.db"),
+            "RATE_LIMIT_STATE_PATH": os.path.join(workdir, "data", "rate_limits.db"),
+            "BATCH_QUEUE_PATH": os.path.join(workdir, "data", "batch_queue.db"),
+            "OPENROUTER_BASE_URL": llm.url,
+            "OPENAI_BASE_URL": llm.url,
+            "GROK_BASE_URL": llm.url,
+            "YOUTUBE_BASE_URL": youtube.base_url,
+            "HTTP_BACKOFF_BASE": "0.05",
+        })
+
+        fake_api = FakeTranscriptApi(latency=args.youtube_latency)
+        transcript_handler.new_transcript_api = lambda: fake_api
+
+        scenarios = SCENARIOS if args.scenario == 'all' else (args.scenario,)
+        results = []
+        for scenario in scenarios:
+            print(f"[Benchmark] Running {scenario}...", file=sys.stderr)
+            if scenario == 'transcript':
+                results += bench_transcript(args)
+            elif scenario == 'title':
+                results += bench_title(args, youtube)
+            elif scenario == 'summary':
+                results += bench_summary(args)
+            else:
+                results += bench_end_to_end(args, workdir)
+
+        print_results(results)
+        print(f"\n[Benchmark] Fake LLM: {llm.requests} requests, {llm.rate_limited} answered with 429")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != 'json'}, "results": results}, f, indent=2)
+        print(f"[Benchmark] Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
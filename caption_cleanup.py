@@ -0,0 +1,97 @@
+"""
+Removal of rolling auto-caption overlap.
+
+Auto-generated captions often repeat the tail of the previous entry at the
+head of the next one. dedupe_segments trims that overlap and drops entries
+that repeat the previous line exactly, in O(n * max_overlap) time. Entries
+are processed as a stream straight into a compact SegmentArray. Only
+generated tracks should be passed in; manual captions do not roll.
+"""
+
+import re
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from transcript_segments import SegmentArray
+
+
+_WORD_RE = re.compile(r'\S+')
+# A single shared word ("...is that" + "that is...") is usually coincidence
+DEFAULT_MIN_OVERLAP = 2
+# Short overlaps in unspaced (CJK) text are usually coincidence
+_MIN_CHAR_OVERLAP = 3
+
+
+def _tokenize(text: str) -> Tuple[List[str], bool]:
+    """
+    Split into words, or into characters for unspaced (e.g. CJK) text.
+    Returns (tokens, spaced).
+    """
+    words = _WORD_RE.findall(text)
+    if len(words) == 1 and len(words[0]) > 1 and not words[0].isascii():
+        return list(words[0]), False
+    return words, True
+
+
+def overlap_length(previous: Sequence[str], current: Sequence[str], max_overlap: int) -> int:
+    """
+    Length of the longest suffix of `previous` that is also a prefix of `current`,
+    capped at max_overlap tokens. Uses the KMP prefix function, so the cost is
+    linear in max_overlap.
+    """
+    head = list(current[:max_overlap])
+    tail = list(previous[-max_overlap:]) if max_overlap else []
+    if not head or not tail:
+        return 0
+    sequence = head + [None] + tail
+    prefix = [0] * len(sequence)
+    for i in range(1, len(sequence)):
+        k = prefix[i - 1]
+        while k and sequence[i] != sequence[k]:
+            k = prefix[k - 1]
+        if sequence[i] == sequence[k]:
+            k += 1
+        prefix[i] = k
+    return prefix[-1]
+
+
+def dedupe_segments(segments: Iterable, max_overlap: int = 30,
+                    min_overlap: int = DEFAULT_MIN_OVERLAP) -> SegmentArray:
+    """
+    Return new segments with rolling overlap removed, keeping the input's
+    track metadata.
+
+    Each entry is compared with the original text of the entry before it:
+    the shared suffix/prefix (at least min_overlap tokens) is cut from the
+    new entry, and entries that repeat or are fully contained in that
+    overlap are dropped.
+
+    Args:
+        segments: Entries with .text, .start and .duration
+        max_overlap: Longest overlap (in words, or characters for CJK) to look for
+        min_overlap: Shortest overlap (in words) treated as a repeat rather than
+            coincidence; CJK text needs at least 3 characters
+    """
+    cleaned = SegmentArray.like(segments)
+    cleaned.extend(_deduped(segments, max_overlap, min_overlap))
+    return cleaned
+
+
+def _deduped(segments: Iterable, max_overlap: int, min_overlap: int) -> Iterator[Tuple[str, float, float]]:
+    """Yield (text, start, duration) for each entry kept by dedupe_segments."""
+    previous_text = None
+    previous_tokens: List[str] = []
+
+    for segment in segments:
+        text = ' '.join(segment.text.split())
+        if not text or text == previous_text:
+            continue
+        tokens, spaced = _tokenize(text)
+        overlap = overlap_length(previous_tokens, tokens, max_overlap)
+        previous_text, previous_tokens = text, tokens
+
+        if overlap >= (min_overlap if spaced else max(min_overlap, _MIN_CHAR_OVERLAP)):
+            tokens = tokens[overlap:]
+            if not tokens:
+                continue
+            text = ' '.join(tokens) if spaced else ''.join(tokens)
+        yield text, segment.start, segment.duration
@@ -0,0 +1,172 @@
+"""
+Token-aware map-reduce summarization for long transcripts.
+
+The formatted transcript is split on its segment line boundaries ('[mm:ss]'
+lines, or paragraphs in the plain rendering) into chunks that fit a token
+budget. Chunks are summarized in parallel (map), and the chunk notes are
+combined by a final call that uses prompt.txt (reduce).
+Short transcripts go straight to a single get_summary call. With a model
+policy, transcripts too large for every policy rule are chunked to fit the
+largest one even when no chunk budget is given.
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from summarizer import get_summary
+from provider_router import ProviderRouter
+from model_policy import PolicyRouter
+from token_utils import estimate_tokens
+from tracing import bind_trace
+
+
+_TIMESTAMP_RE = re.compile(r'^\[(\d+:\d{2})\]')
+
+MAP_PROMPT = (
+    "You are reading one section of a long video transcript. "
+    "Write dense notes on this section only: the main points, arguments, "
+    "key data, numbers, names, examples and notable quotes, each with its "
+    "[mm:ss] timestamp. Do not add an introduction or conclusion. "
+    "Write the notes in the same language as the transcript."
+)
+
+REDUCE_HEADER = (
+    "The transcript of this video was too long to send at once, so it was "
+    "split into consecutive sections and each section was condensed into "
+    "notes. Treat the notes below as the full transcript.\n\n"
+)
+
+
+def split_transcript(transcript_content: str, max_tokens: int) -> Tuple[str, List[str]]:
+    """
+    Split a formatted transcript into chunks of at most max_tokens (estimated),
+    breaking only between segment lines. A single line larger than the
+    budget becomes its own chunk.
+
+    Returns:
+        (header, chunks) where header is the leading '#' title block
+    """
+    lines = transcript_content.splitlines(keepends=True)
+    header_parts = []
+    index = 0
+    while index < len(lines) and (lines[index].startswith('#') or not lines[index].strip()):
+        header_parts.append(lines[index])
+        index += 1
+
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+    for line in lines[index:]:
+        line_tokens = estimate_tokens(line)
+        if current and current_tokens + line_tokens > max_tokens:
+            chunks.append(''.join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        chunks.append(''.join(current))
+    return ''.join(header_parts), chunks
+
+
+def _section_label(number: int, chunk: str) -> str:
+    """Return 'Section N (mm:ss-mm:ss)' using the first and last timestamps in a chunk."""
+    stamps = [m.group(1) for m in (_TIMESTAMP_RE.match(line) for line in chunk.splitlines()) if m]
+    if not stamps:
+        return f"Section {number}"
+    return f"Section {number} ({stamps[0]}-{stamps[-1]})"
+
+
+def _add_usage(total: Dict, usage: Dict):
+    """Add one usage block's numbers into total, descending into nested details."""
+    for key, value in usage.items():
+        if isinstance(value, dict):
+            _add_usage(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[key] = total.get(key, 0) + value
+
+
+def _merge_usage(responses: List[Dict]) -> Optional[Dict]:
+    """
+    Sum token counts and cost across all calls that reported usage,
+    including nested details such as prompt_tokens_details.cached_tokens.
+    """
+    total: Dict = {}
+    for response in responses:
+        _add_usage(total, response.get('usage') or {})
+    return total or None
+
+
+def summarize_transcript(transcript_content: str, api_key: str, grok: bool = False, use_openai: bool = False,
+                         openrouter_model: str = None, use_cache: bool = True, stream: bool = False,
+                         on_token: Optional[Callable[[str], None]] = None, chunk_tokens: int = 0,
+                         chunk_workers: int = 4, video_id: Optional[str] = None,
+                         router: Optional[Union[ProviderRouter, PolicyRouter]] = None) -> Optional[Dict]:
+    """
+    Summarize a transcript, using map-reduce when it exceeds chunk_tokens.
+    Returns the final API response JSON as a dict (with usage summed over all
+    calls and a "chunks" count), or None on failure.
+
+    Args:
+        transcript_content: The formatted transcript text
+        api_key: API key for the selected service
+        grok: Whether to use Grok API
+        use_openai: Whether to use OpenAI API
+        openrouter_model: Model name for OpenRouter
+        use_cache: Reuse cached responses for chunks and the final summary
+        stream: Stream the final (reduce) call
+        on_token: Token callback for the streamed final call
+        chunk_tokens: Token budget per chunk; 0 disables chunking
+        chunk_workers: Concurrent chunk summaries
+        video_id: Video the calls are made for, recorded in the usage ledger
+        router: Send every call through this ProviderRouter or PolicyRouter
+            instead of the single provider given by grok/use_openai/openrouter_model
+    """
+    def summarize(content: str, **kwargs) -> Optional[Dict]:
+        if router:
+            return router.summarize(content, use_cache=use_cache, video_id=video_id, **kwargs)
+        return get_summary(content, api_key, grok=grok, use_openai=use_openai, openrouter_model=openrouter_model,
+                           use_cache=use_cache, video_id=video_id, **kwargs)
+
+    if not chunk_tokens and isinstance(router, PolicyRouter):
+        policy_limit = router.max_input_tokens()
+        if policy_limit and estimate_tokens(transcript_content) > policy_limit:
+            print(f"[ChunkedSummarizer] Transcript exceeds every model policy rule, "
+                  f"chunking to {policy_limit} tokens")
+            chunk_tokens = policy_limit
+
+    if not chunk_tokens or estimate_tokens(transcript_content) <= chunk_tokens:
+        return summarize(transcript_content, stream=stream, on_token=on_token)
+
+    header, chunks = split_transcript(transcript_content, chunk_tokens)
+    print(f"[ChunkedSummarizer] Transcript split into {len(chunks)} chunks of <= {chunk_tokens} tokens")
+
+    def summarize_chunk(numbered_chunk):
+        number, chunk = numbered_chunk
+        content = f"{header}{_section_label(number, chunk)} of {len(chunks)}\n\n{chunk}"
+        return summarize(content, system_prompt=MAP_PROMPT)
+
+    with ThreadPoolExecutor(max_workers=chunk_workers, thread_name_prefix="chunk") as pool:
+        chunk_responses = list(pool.map(bind_trace(summarize_chunk), enumerate(chunks, start=1)))
+
+    if not all(chunk_responses):
+        failed = sum(1 for r in chunk_responses if not r)
+        print(f"[ChunkedSummarizer] {failed}/{len(chunks)} chunk summaries failed")
+        return None
+
+    try:
+        notes = [
+            f"## {_section_label(number, chunk)}\n\n{response['choices'][0]['message']['content']}\n"
+            for number, (chunk, response) in enumerate(zip(chunks, chunk_responses), start=1)
+        ]
+    except (KeyError, IndexError) as e:
+        print(f"[ChunkedSummarizer] Error parsing chunk response: {e}")
+        return None
+
+    reduce_content = header + REDUCE_HEADER + "\n".join(notes)
+    result = summarize(reduce_content, stream=stream, on_token=on_token)
+    if result:
+        result = dict(result)
+        result['usage'] = _merge_usage(chunk_responses + [result])
+        result['chunks'] = len(chunks)
+    return result
@@ -1,6 +1,6 @@
 import os
 import json
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 from pathlib import Path
 import re
 
@@ -32,6 +32,41 @@ def load_dotenv(dotenv_path=None):
             os.environ[key] = value
 
 
+_dotenv_loaded = False
+
+
+def get_setting(name: str, default: Any) -> Any:
+    """
+    Read a tunable setting from the environment (or .env file).
+    The value is converted to the type of `default`; invalid values fall back to it.
+    """
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        load_dotenv()
+        _dotenv_loaded = True
+
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        if isinstance(default, bool):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        if default is None:
+            return value
+        return type(default)(value)
+    except ValueError:
+        print(f"[ConfigManager] Invalid value for {name}: {value!r}, using {default!r}")
+        return default
+
+
+def get_output_dir() -> str:
+    """
+    Root directory for transcript/, summary/ and formatted_prompts/
+    (OUTPUT_DIR, default: the project root).
+    """
+    return get_setting("OUTPUT_DIR", str(Path(__file__).parent.parent))
+
+
 def load_api_keys() -> Dict[str, Optional[str]]:
     """
     Load API keys from environment variables or fallback to config/config.json.
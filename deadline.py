@@ -0,0 +1,124 @@
+"""
+Per-video time budgets and per-stage network timeouts.
+
+A Deadline is attached to a video's Trace, so it follows the video into
+every worker thread the trace is bound to. Network code takes its
+(connect, read) timeout from stage_timeout() or clamp_timeout(), which cap
+both at the time the video has left and raise DeadlineExceeded once none
+is left. Retry backoff, rate-limit waits and streamed reads check the
+deadline between steps, so an in-flight call is abandoned at its next
+chunk instead of running on. Without a deadline, every stage still has
+its own timeouts, so a stalled socket cannot hang a worker.
+
+Stage timeouts in seconds, from <STAGE>_CONNECT_TIMEOUT and <STAGE>_READ_TIMEOUT:
+  transcript  caption list and track downloads (default 10 / 30)
+  metadata    oEmbed and watch-page title lookups (default 5 / 15)
+  summary     LLM calls use HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT (default 10 / 600)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple, Union
+
+from tracing import current_trace
+from config.config_manager import get_setting
+
+
+STAGE_TIMEOUTS = {
+    "transcript": (10.0, 30.0),
+    "metadata": (5.0, 15.0),
+}
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a video runs out of time; `stage` names the stage it was in."""
+
+    def __init__(self, stage: str, budget: float):
+        super().__init__(f"Deadline of {budget:g}s exceeded during {stage}")
+        self.stage = stage
+        self.budget = budget
+
+
+class Deadline:
+    """
+    Args:
+        seconds: Time budget for one video
+        paused: Start with the clock stopped, so that only time inside
+            running() blocks counts (e.g. not time queued for a worker)
+    """
+
+    def __init__(self, seconds: float, paused: bool = False):
+        self.seconds = seconds
+        self._lock = threading.Lock()
+        self._spent = 0.0
+        self._active = 0 if paused else 1
+        self._resumed_at = time.monotonic()
+
+    def remaining(self) -> float:
+        with self._lock:
+            spent = self._spent + (time.monotonic() - self._resumed_at if self._active else 0.0)
+        return max(0.0, self.seconds - spent)
+
+    @contextmanager
+    def running(self):
+        """Run the clock for the duration of the block; blocks may overlap."""
+        with self._lock:
+            if not self._active:
+                self._resumed_at = time.monotonic()
+            self._active += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._active -= 1
+                if not self._active:
+                    self._spent += time.monotonic() - self._resumed_at
+
+    def check(self, stage: str):
+        """Raise DeadlineExceeded if no time is left."""
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(stage, self.seconds)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the deadline of the active trace, if any."""
+    trace = current_trace()
+    return getattr(trace, "deadline", None)
+
+
+def check_deadline(stage: str):
+    """Raise DeadlineExceeded if the active deadline has passed."""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def check_wait(seconds: float, stage: str):
+    """Raise DeadlineExceeded if waiting `seconds` would outlast the active deadline."""
+    deadline = current_deadline()
+    if deadline is not None and seconds >= deadline.remaining():
+        raise DeadlineExceeded(stage, deadline.seconds)
+
+
+def clamp_timeout(timeout: Union[float, Tuple[Optional[float], Optional[float]], None],
+                  stage: str) -> Union[float, Tuple[float, float], None]:
+    """
+    Cap a requests timeout (seconds or a (connect, read) pair) at the active
+    deadline's remaining time. Raises DeadlineExceeded if none is left.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return timeout
+    deadline.check(stage)
+    remaining = deadline.remaining()
+    if not isinstance(timeout, tuple):
+        timeout = (timeout, timeout)
+    return tuple(min(value, remaining) if value else remaining for value in timeout)
+
+
+def stage_timeout(stage: str) -> Tuple[float, float]:
+    """Return the configured (connect, read) timeout of a stage, clamped to the active deadline."""
+    connect, read = STAGE_TIMEOUTS[stage]
+    return clamp_timeout((get_setting(f"{stage.upper()}_CONNECT_TIMEOUT", connect),
+                          get_setting(f"{stage.upper()}_READ_TIMEOUT", read)), stage)
@@ -0,0 +1,213 @@
+"""
+Shared HTTP layer with per-host connection pools and retry/backoff.
+
+Each host gets its own keep-alive requests.Session, so repeated calls to the
+same API reuse TCP/TLS connections. Requests that fail with 429/5xx or a
+connection error are retried with exponential backoff and full jitter,
+honoring Retry-After when the server sends it. Non-idempotent requests
+(POST, e.g. a billed LLM call) are only retried after a connection error
+if the request never reached the server: a read timeout or a connection
+dropped mid-request is raised at once. Every attempt's timeout is
+capped at the active video deadline, and a backoff that would outlast it
+raises DeadlineExceeded instead of sleeping.
+"""
+
+import email.utils
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from config.config_manager import get_setting
+from tracing import record_retry, response_bytes_hook
+from deadline import check_wait, clamp_timeout
+
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def failed_to_connect(error: requests.exceptions.RequestException) -> bool:
+    """
+    True if the request failed while connecting (connect timeout, refused
+    connection, DNS failure), so the server cannot have seen it.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    # requests wraps urllib3's MaxRetryError, which holds the underlying cause
+    return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delta seconds or HTTP date) into seconds.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class HttpClient:
+    """
+    Args:
+        pool_maxsize: Keep-alive connections kept per host
+        max_retries: Retries after the first attempt
+        backoff_base: Base delay in seconds for exponential backoff
+        backoff_max: Upper bound on a single backoff delay
+        connect_timeout: Default connect timeout in seconds
+        read_timeout: Default read timeout in seconds
+    """
+
+    def __init__(self, pool_maxsize: int = 10, max_retries: int = 4, backoff_base: float = 1.0,
+                 backoff_max: float = 60.0, connect_timeout: float = 10.0, read_timeout: float = 600.0):
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = (connect_timeout, read_timeout)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+
+    def session_for(self, url: str) -> requests.Session:
+        """
+        Return the keep-alive session for the URL's host, creating it on first use.
+        """
+        parsed = urlparse(url)
+        host_key = f"{parsed.scheme}://{parsed.netloc}"
+        with self._lock:
+            session = self._sessions.get(host_key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount(f"{host_key}/", adapter)
+                session.hooks["response"].append(response_bytes_hook)
+                self._sessions[host_key] = session
+            return session
+
+    def backoff_delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """
+        Delay before retry number `attempt` (0-based): Retry-After if present,
+        otherwise a full-jitter exponential backoff.
+        """
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the host's pooled session, retrying transient failures.
+        Returns the final response (which may still be an error status);
+        raises the last connection error if every attempt failed to connect.
+        Non-idempotent methods are not retried after a read timeout or a
+        connection dropped mid-request, since the server may have acted on them.
+        Pass on_throttle=callable to be told the delay before each retry after a 429,
+        stage=name to label DeadlineExceeded errors (default: "http"), and
+        max_retries=n to override the client's retry count for this request.
+        """
+        on_throttle = kwargs.pop("on_throttle", None)
+        stage = kwargs.pop("stage", "http")
+        timeout = kwargs.pop("timeout", self.timeout)
+        max_retries = kwargs.pop("max_retries", None)
+        if max_retries is None:
+            max_retries = self.max_retries
+        session = self.session_for(url)
+        attempt = 0
+        while True:
+            with self._lock:
+                self._requests += 1
+            try:
+                response = session.request(method, url, timeout=clamp_timeout(timeout, stage), **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= max_retries or (method.upper() not in IDEMPOTENT_METHODS
+                                                   and not failed_to_connect(e)):
+                    raise
+                delay = self.backoff_delay(attempt)
+                print(f"[HttpClient] {type(e).__name__} for {url}, retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                    return response
+                delay = self.backoff_delay(attempt, response)
+                print(f"[HttpClient] HTTP {response.status_code} for {url}, retrying in {delay:.1f}s")
+                if response.status_code == 429 and on_throttle:
+                    on_throttle(delay)
+                response.close()
+
+            check_wait(delay, stage)
+            with self._lock:
+                self._retries += 1
+            record_retry()
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return request, retry and connection counters across all hosts.
+        """
+        new_connections = 0
+        pooled_requests = 0
+        with self._lock:
+            sessions = list(self._sessions.values())
+            counters = {"requests": self._requests, "retries": self._retries}
+        for session in sessions:
+            for adapter in session.adapters.values():
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    new_connections += pool.num_connections
+                    pooled_requests += pool.num_requests
+        counters["new_connections"] = new_connections
+        counters["reused_connections"] = max(0, pooled_requests - new_connections)
+        return counters
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """
+    Return the process-wide client configured from HTTP_POOL_SIZE,
+    HTTP_MAX_RETRIES, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX,
+    HTTP_CONNECT_TIMEOUT and HTTP_READ_TIMEOUT.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(
+                pool_maxsize=get_setting("HTTP_POOL_SIZE", 10),
+                max_retries=get_setting("HTTP_MAX_RETRIES", 4),
+                backoff_base=get_setting("HTTP_BACKOFF_BASE", 1.0),
+                backoff_max=get_setting("HTTP_BACKOFF_MAX", 60.0),
+                connect_timeout=get_setting("HTTP_CONNECT_TIMEOUT", 10.0),
+                read_timeout=get_setting("HTTP_READ_TIMEOUT", 600.0),
+            )
+        return _client
@@ -0,0 +1,349 @@
+"""
+Long-running HTTP job service around the batch pipeline.
+
+One process keeps the imports, HTTP connection pools, caches, loaded
+prompt and stage worker pools of a BatchPipeline warm, so submitting a
+video costs a local HTTP request instead of a fresh interpreter. The
+number of unfinished videos is bounded; a submission that would exceed it
+is refused with 429 rather than piling up.
+
+Endpoints (JSON unless noted):
+  POST /jobs                   {"urls": [...], "reprocess": false} -> 202 {"id": ..., ...}
+  GET  /jobs                   recent jobs, newest first
+  GET  /jobs/<id>              job status with one entry per video
+  GET  /videos/<id>/summary    stored summary (text/markdown)
+  GET  /videos/<id>/transcript stored transcript (text/plain)
+  GET  /health                 queue depth and worker counts
+
+Started with `python youtube_summary.py --serve [HOST:]PORT ...`.
+"""
+
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from batch_pipeline import BatchPipeline, VideoResult
+from video_sources import expand_inputs
+from video_manifest import VideoManifest
+from artifact_store import get_artifact_store
+from youtube_utils import extract_video_id
+from prompt_formatter import load_system_prompt
+from http_client import get_http_client
+
+
+# Largest accepted request body
+MAX_BODY_BYTES = 1024 * 1024
+
+_ARTIFACT_CONTENT_TYPES = {
+    "summary": "text/markdown; charset=utf-8",
+    "transcript": "text/plain; charset=utf-8",
+    "prompt": "text/plain; charset=utf-8",
+}
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the job queue is full."""
+
+
+class Job:
+    """A submitted list of URLs and the per-video results as they finish."""
+
+    def __init__(self, sources: List[str], reprocess: bool = False):
+        self.id = uuid.uuid4().hex[:12]
+        self.sources = sources
+        self.reprocess = reprocess
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.videos: List[Dict] = []
+        self._remaining = 0
+        # Videos this job holds against the service's max_queue
+        self._counted = 0
+        self._lock = threading.Lock()
+
+    def to_dict(self, videos: bool = True) -> Dict:
+        with self._lock:
+            counts = {}
+            for video in self.videos:
+                counts[video["status"]] = counts.get(video["status"], 0) + 1
+            job = {
+                "id": self.id,
+                "status": self.status,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "counts": counts,
+            }
+            if videos:
+                job["sources"] = self.sources
+                job["videos"] = [dict(video) for video in self.videos]
+            return job
+
+
+class JobService:
+    """
+    Args:
+        pipeline: Pipeline whose worker pools run every job
+        manifest: Skip videos already summarized (unless a job asks to reprocess)
+        max_queue: Unfinished videos (across all jobs) beyond which submissions are refused
+        max_videos: Per-playlist/channel limit when expanding inputs
+        keep_jobs: Finished jobs kept for status queries
+    """
+
+    def __init__(self, pipeline: BatchPipeline, manifest: Optional[VideoManifest] = None,
+                 max_queue: int = 100, max_videos: int = 0, keep_jobs: int = 1000):
+        self.pipeline = pipeline
+        self.manifest = manifest
+        self.max_videos = max_videos
+        self.keep_jobs = keep_jobs
+        self.max_queue = max_queue
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+        # Videos submitted but not finished; playlists count as one until expanded
+        self._queued_videos = 0
+        self._count_lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._dispatcher: Optional[threading.Thread] = None
+
+    def start(self):
+        """Warm up shared state, start the pipeline pools and the dispatcher."""
+        load_system_prompt()
+        get_http_client()
+        try:
+            # Playlist and channel expansion imports yt_dlp lazily; pay for it now
+            import yt_dlp  # noqa: F401
+        except ImportError:
+            pass
+        self.pipeline.start()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def stop(self):
+        """Finish the jobs already queued, then stop the dispatcher and pipeline."""
+        self._queue.put(None)
+        self._dispatcher.join()
+        self.pipeline.close()
+
+    def submit(self, sources: List[str], reprocess: bool = False) -> Job:
+        """
+        Queue a job. Raises QueueFullError when its videos would take the
+        unfinished videos past max_queue (a job is always accepted when
+        nothing is waiting, so one larger than max_queue is not refused forever).
+        """
+        job = Job(sources, reprocess)
+        with self._count_lock:
+            if self._queued_videos and self._queued_videos + len(sources) > self.max_queue:
+                raise QueueFullError(f"Job queue is full ({self._queued_videos} videos waiting, "
+                                     f"limit {self.max_queue})")
+            self._queued_videos += len(sources)
+            job._counted = len(sources)
+        self._queue.put(job)
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+            self._evict()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, limit: int = 50) -> List[Job]:
+        """Most recent jobs first."""
+        with self._jobs_lock:
+            return list(reversed(self._jobs.values()))[:limit]
+
+    def health(self) -> Dict:
+        return {
+            "status": "ok",
+            "queued_jobs": self._queue.qsize(),
+            "queued_videos": self._queued_videos,
+            "max_queue": self.max_queue,
+            "transcript_workers": self.pipeline.transcript_workers,
+            "llm_workers": self.pipeline.llm_workers,
+        }
+
+    def _recount(self, job: Job, videos: int):
+        """Set the number of videos the job holds against max_queue."""
+        with self._count_lock:
+            self._queued_videos += videos - job._counted
+            job._counted = videos
+
+    def _evict(self):
+        """Drop the oldest finished jobs beyond keep_jobs (caller holds _jobs_lock)."""
+        excess = len(self._jobs) - self.keep_jobs
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.status == "done"][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def _dispatch(self):
+        """Feed queued jobs into the pipeline, one video at a time."""
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                self._run(job)
+            except Exception as e:
+                print(f"[JobService] Job {job.id} failed: {e}")
+                with job._lock:
+                    self._recount(job, 0)
+                    job.status = "done"
+                    job.finished_at = time.time()
+
+    def _run(self, job: Job):
+        with job._lock:
+            job.status = "running"
+            job.started_at = time.time()
+        urls = expand_inputs(job.sources, self.max_videos)
+
+        new_ids = None
+        if self.manifest and not job.reprocess:
+            video_ids = []
+            for url in urls:
+                try:
+                    video_ids.append(extract_video_id(url))
+                except ValueError:
+                    pass
+            new_ids = set(self.manifest.filter_new(video_ids))
+
+        entries = []
+        with job._lock:
+            for url in urls:
+                entry = {"source": url, "video_id": None, "title": None, "status": "pending",
+                         "output_path": None, "error": None}
+                try:
+                    entry["video_id"] = extract_video_id(url)
+                except ValueError:
+                    pass
+                if new_ids is not None and entry["video_id"] and entry["video_id"] not in new_ids:
+                    entry["status"] = "skipped"
+                else:
+                    entries.append(entry)
+                job.videos.append(entry)
+            job._remaining = len(entries)
+            # Expanded playlists and skipped videos change what the job holds
+            self._recount(job, len(entries))
+            if not entries:
+                job.status = "done"
+                job.finished_at = time.time()
+                return
+
+        for entry in entries:
+            # Blocks while the pipeline already has its fill of videos in flight
+            future = self.pipeline.submit(entry["source"])
+            future.add_done_callback(lambda f, e=entry: self._on_video(job, e, f))
+
+    def _on_video(self, job: Job, entry: Dict, future: Future):
+        result: VideoResult = future.result()
+        with job._lock:
+            entry.update(video_id=result.video_id, title=result.video_title, output_path=result.output_path,
+                         error=result.error,
+                         status="done" if result.ok else "timed_out" if result.timed_out else "failed")
+            job._remaining -= 1
+            self._recount(job, max(job._counted - 1, 0))
+            if job._remaining == 0:
+                job.status = "done"
+                job.finished_at = time.time()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps client connections open between requests
+    protocol_version = "HTTP/1.1"
+    service: JobService = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status: int, payload, headers: Optional[Dict] = None):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                   "application/json; charset=utf-8", headers)
+
+    def _error(self, status: int, message: str, headers: Optional[Dict] = None):
+        self._json(status, {"error": message}, headers)
+
+    def do_GET(self):
+        parts = [part for part in urlparse(self.path).path.split("/") if part]
+        if parts == ["health"]:
+            self._json(200, self.service.health())
+        elif parts == ["jobs"]:
+            self._json(200, {"jobs": [job.to_dict(videos=False) for job in self.service.jobs()]})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.service.get(parts[1])
+            if job is None:
+                self._error(404, f"Unknown job: {parts[1]}")
+            else:
+                self._json(200, job.to_dict())
+        elif len(parts) == 3 and parts[0] == "videos" and parts[2] in _ARTIFACT_CONTENT_TYPES:
+            text = get_artifact_store().get(parts[1], parts[2])
+            if text is None:
+                self._error(404, f"No {parts[2]} stored for {parts[1]}")
+            else:
+                self._send(200, text.encode("utf-8"), _ARTIFACT_CONTENT_TYPES[parts[2]])
+        else:
+            self._error(404, "Not found")
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip("/") != "/jobs":
+            self._error(404, "Not found")
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            self._error(400, "Invalid Content-Length")
+            self.close_connection = True
+            return
+        if length > MAX_BODY_BYTES:
+            self._error(413, "Request body too large")
+            self.close_connection = True
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            urls = body.get("urls") or ([body["url"]] if body.get("url") else [])
+            if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+                raise ValueError("'urls' must be a list of strings")
+        except (ValueError, AttributeError) as e:
+            self._error(400, f"Invalid request: {e}")
+            return
+        if not urls:
+            self._error(400, "No URLs given")
+            return
+        try:
+            job = self.service.submit(urls, reprocess=bool(body.get("reprocess")))
+        except QueueFullError as e:
+            self._error(429, str(e), {"Retry-After": "5"})
+            return
+        self._json(202, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+
+
+def serve(service: JobService, host: str = "127.0.0.1", port: int = 8765):
+    """Run the HTTP server until interrupted, then let queued jobs finish."""
+    handler = type("Handler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    service.start()
+    print(f"[JobService] Listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[JobService] Shutting down, finishing queued jobs...")
+    finally:
+        server.server_close()
+        service.stop()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Choice of provider and model by transcript size.
+
+Rules come from config/model_routing.json (or MODEL_POLICY_PATH) and are
+tried in order; the first one whose limits fit a call serves it:
+
+  {
+    "output_tokens": 1500,
+    "rules": [
+      {"name": "short", "max_input_tokens": 8000, "route": "grok"},
+      {"name": "standard", "max_input_tokens": 200000, "route": "openai:gpt-5.1"},
+      {"name": "long", "max_input_tokens": 900000, "max_output_tokens": 32000,
+       "route": "openrouter:google/gemini-2.5-pro,openrouter:anthropic/claude-sonnet-4.5"}
+    ]
+  }
+
+Input tokens are estimated over the system prompt and the text sent.
+output_tokens is the summary length the calls need; rules whose
+max_output_tokens is smaller are skipped. A rule without max_input_tokens
+takes any size. Each rule's route is one or more provider[:model] entries
+served by a ProviderRouter, so a rule can fail over like --route. Every
+decision is printed with its reason, and transcripts larger than every
+rule are summarized with map-reduce in chunks that fit the largest one.
+
+Usage:
+  python model_policy.py 45000    # show which rule a 45k-token transcript gets
+"""
+
+import argparse
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from provider_router import ProviderRouter, Route, parse_routes
+from prompt_formatter import load_system_prompt
+from token_utils import estimate_tokens
+from config.config_manager import get_setting
+
+
+DEFAULT_POLICY_PATH = os.path.join(os.path.dirname(__file__), "config", "model_routing.json")
+DEFAULT_OUTPUT_TOKENS = 1000
+
+
+@dataclass(frozen=True)
+class PolicyRule:
+    """One routing rule; a limit of None means unbounded."""
+    name: str
+    routes: Tuple[Route, ...]
+    max_input_tokens: Optional[int] = None
+    max_output_tokens: Optional[int] = None
+
+    def fits(self, input_tokens: int, output_tokens: int) -> bool:
+        return ((self.max_input_tokens is None or input_tokens <= self.max_input_tokens)
+                and (self.max_output_tokens is None or output_tokens <= self.max_output_tokens))
+
+    def describe(self) -> str:
+        limits = []
+        if self.max_input_tokens is not None:
+            limits.append(f"<= {self.max_input_tokens:,} input tokens")
+        if self.max_output_tokens is not None:
+            limits.append(f"<= {self.max_output_tokens:,} output tokens")
+        return f"rule '{self.name}': {', '.join(limits) or 'any size'}"
+
+
+class ModelPolicy:
+    """
+    Args:
+        rules: Rules in order of preference; names must be unique
+        output_tokens: Summary length every call needs
+    """
+
+    def __init__(self, rules: List[PolicyRule], output_tokens: int = DEFAULT_OUTPUT_TOKENS):
+        if not rules:
+            raise ValueError("No rules given")
+        names = [rule.name for rule in rules]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate rule names: {', '.join(duplicates)}")
+        self.rules = list(rules)
+        self.output_tokens = output_tokens
+
+    def choose(self, input_tokens: int) -> Tuple[PolicyRule, str]:
+        """
+        Return the first rule that fits, and the reason it was chosen. If
+        none fits, the rule taking the largest input is returned.
+        """
+        for rule in self.rules:
+            if rule.fits(input_tokens, self.output_tokens):
+                return rule, rule.describe()
+        candidates = [r for r in self.rules if r.fits(0, self.output_tokens)] or self.rules
+        rule = max(candidates, key=lambda r: r.max_input_tokens or 0)
+        return rule, f"larger than every rule, using the largest ({rule.describe()})"
+
+    def max_input_tokens(self) -> Optional[int]:
+        """The most input any rule takes, or None if one is unbounded."""
+        candidates = [r for r in self.rules if r.fits(0, self.output_tokens)] or self.rules
+        if any(r.max_input_tokens is None for r in candidates):
+            return None
+        return max(r.max_input_tokens for r in candidates)
+
+    def describe(self) -> str:
+        """Stable one-line description, used to key the processed-video manifest."""
+        return ";".join(f"{r.name}<={r.max_input_tokens or '*'}"
+                        f"{f'/{r.max_output_tokens}' if r.max_output_tokens is not None else ''}"
+                        f":{','.join(str(route) for route in r.routes)}"
+                        for r in self.rules) + f";out={self.output_tokens}"
+
+
+def load_policy(path: Optional[str] = None) -> ModelPolicy:
+    """
+    Load a policy file (default: MODEL_POLICY_PATH or config/model_routing.json).
+    Raises ValueError if the file is missing or invalid.
+    """
+    path = path or get_setting("MODEL_POLICY_PATH", DEFAULT_POLICY_PATH)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"Policy file not found: {path}")
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Could not read policy file {path}: {e}")
+    if not isinstance(config, dict):
+        raise ValueError(f"Policy file {path} must hold a JSON object")
+    if not isinstance(config.get("rules") or [], list):
+        raise ValueError("'rules' must be a list")
+
+    rules = []
+    for number, entry in enumerate(config.get("rules") or [], start=1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Rule {number} must be an object")
+        if not isinstance(entry.get("route"), str) or not entry["route"]:
+            raise ValueError(f"Rule {number} has no route")
+        limits = {}
+        for limit in ("max_input_tokens", "max_output_tokens"):
+            if entry.get(limit) is not None:
+                if not _positive_int(entry[limit]):
+                    raise ValueError(f"Rule {number}: {limit} must be a positive integer")
+                limits[limit] = entry[limit]
+        rules.append(PolicyRule(str(entry.get("name") or number), tuple(parse_routes(entry["route"])), **limits))
+    output_tokens = config.get("output_tokens", DEFAULT_OUTPUT_TOKENS)
+    if not _positive_int(output_tokens):
+        raise ValueError("output_tokens must be a positive integer")
+    return ModelPolicy(rules, output_tokens)
+
+
+def _positive_int(value) -> bool:
+    # bool is a subclass of int, but true/false is not a token count
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+class PolicyRouter:
+    """
+    Routes each summary call by its size, with the same summarize()
+    interface as ProviderRouter, so it can be passed wherever a router is.
+
+    Args:
+        policy: Rules to choose by
+        api_keys: API key per provider name
+        hedge_after: Passed to each rule's ProviderRouter
+        timeout: Passed to each rule's ProviderRouter
+    """
+
+    def __init__(self, policy: ModelPolicy, api_keys: Dict[str, str], hedge_after: float = 0.0,
+                 timeout: Optional[float] = None):
+        self.policy = policy
+        self._routers = {rule.name: ProviderRouter(list(rule.routes), api_keys, hedge_after=hedge_after,
+                                                   timeout=timeout)
+                         for rule in policy.rules}
+        self._decisions = {rule.name: 0 for rule in policy.rules}
+        self._lock = threading.Lock()
+
+    def max_input_tokens(self) -> Optional[int]:
+        """Largest transcript (estimated tokens, without the prompt) one call can take, or None."""
+        limit = self.policy.max_input_tokens()
+        if limit is None:
+            return None
+        return max(1, limit - estimate_tokens(load_system_prompt()))
+
+    def summarize(self, transcript_content: str, use_cache: bool = True, stream: bool = False,
+                  on_token: Optional[Callable[[str], None]] = None, system_prompt: Optional[str] = None,
+                  video_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Summarize through the routes of the first rule that fits the call.
+        The response gets a "policy" entry naming the rule.
+        """
+        prompt = system_prompt if system_prompt is not None else load_system_prompt()
+        input_tokens = estimate_tokens(prompt) + estimate_tokens(transcript_content)
+        rule, reason = self.policy.choose(input_tokens)
+        with self._lock:
+            self._decisions[rule.name] += 1
+        print(f"[ModelPolicy] ~{input_tokens:,} input tokens -> {','.join(str(r) for r in rule.routes)} ({reason})")
+        result = self._routers[rule.name].summarize(transcript_content, use_cache=use_cache, stream=stream,
+                                                    on_token=on_token, system_prompt=system_prompt,
+                                                    video_id=video_id)
+        if result:
+            result['policy'] = rule.name
+        return result
+
+    def print_stats(self):
+        """Print how many calls each rule took, then each rule's route statistics."""
+        with self._lock:
+            decisions = dict(self._decisions)
+        for rule in self.policy.rules:
+            print(f"[ModelPolicy] {rule.describe()}: {decisions[rule.name]} calls")
+            if decisions[rule.name]:
+                self._routers[rule.name].print_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show which policy rule a transcript size is routed to")
+    parser.add_argument("tokens", type=int, nargs="+", help="Estimated transcript tokens")
+    parser.add_argument("--policy", help=f"Policy file (default: {DEFAULT_POLICY_PATH})")
+    args = parser.parse_args()
+
+    try:
+        policy = load_policy(args.policy)
+    except ValueError as e:
+        print(e)
+        return
+    prompt_tokens = estimate_tokens(load_system_prompt())
+    for tokens in args.tokens:
+        rule, reason = policy.choose(tokens + prompt_tokens)
+        print(f"{tokens:>10,} (+{prompt_tokens:,} prompt) -> {','.join(str(r) for r in rule.routes)}  ({reason})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,50 @@
 import os
+import threading
 from typing import Optional
+from tracing import span
+from config.config_manager import get_output_dir
+from artifact_store import store_artifact
 
 
+PROMPT_FILE_PATH = os.path.join(os.path.dirname(__file__), 'prompt.txt')
+FALLBACK_PROMPT = "Please summarize the following content."
+
+# (mtime_ns, size, text) of the last prompt.txt read
+_prompt_memo = None
+_prompt_lock = threading.Lock()
+
+
+@span("prompt.load")
 def load_system_prompt() -> str:
     """
     Load system prompt from prompt.txt file.
-    
+
+    The text is read once and reused until the file's mtime or size changes,
+    so every request carries a byte-identical prefix that provider-side
+    prompt caching can match.
+
     Returns:
         System prompt string, or default prompt if file not found
     """
-    prompt_file_path = os.path.join(os.path.dirname(__file__), 'prompt.txt')
+    global _prompt_memo
     try:
-        with open(prompt_file_path, 'r', encoding='utf-8') as f:
-            sys_prompt = f.read()
-        return sys_prompt
+        stat = os.stat(PROMPT_FILE_PATH)
+        with _prompt_lock:
+            if _prompt_memo and _prompt_memo[:2] == (stat.st_mtime_ns, stat.st_size):
+                return _prompt_memo[2]
+            with open(PROMPT_FILE_PATH, 'r', encoding='utf-8') as f:
+                sys_prompt = f.read()
+            _prompt_memo = (stat.st_mtime_ns, stat.st_size, sys_prompt)
+            return sys_prompt
     except FileNotFoundError:
-        print(f"[PromptFormatter] Warning: Prompt file not found at {prompt_file_path}")
-        return "Please summarize the following content."  # Fallback prompt
+        print(f"[PromptFormatter] Warning: Prompt file not found at {PROMPT_FILE_PATH}")
+        return FALLBACK_PROMPT
     except Exception as e:
         print(f"[PromptFormatter] Error reading prompt file: {e}")
-        return "Please summarize the following content."  # Fallback prompt
+        return FALLBACK_PROMPT
 
 
+@span("prompt.format")
 def format_prompt(transcript_content: str, system_prompt: Optional[str] = None) -> str:
     """
     Format transcript with system prompt.
@@ -47,7 +70,9 @@ def format_prompt(transcript_content: str, system_prompt: Optional[str] = None)
     return formatted_prompt
 
 
-def save_formatted_prompt(formatted_prompt: str, video_title: str, current_date: str) -> str:
+@span("prompt.save")
+def save_formatted_prompt(formatted_prompt: str, video_title: str, current_date: str,
+                          video_id: Optional[str] = None) -> str:
     """
     Save formatted prompt to file.
     
@@ -55,12 +80,13 @@ def save_formatted_prompt(formatted_prompt: str, video_title: str, current_date:
         formatted_prompt: The formatted prompt text
         video_title: Video title for filename
         current_date: Current date string (YYYY-MM-DD format)
+        video_id: Also record the prompt in the artifact store under this video
         
     Returns:
         Path to saved file
     """
     prompt_filename = f"{current_date}_{video_title}_prompt.txt"
-    prompt_dir = os.path.join(os.path.dirname(__file__), "formatted_prompts", current_date)
+    prompt_dir = os.path.join(get_output_dir(), "formatted_prompts", current_date)
     
     if not os.path.exists(prompt_dir):
         os.makedirs(prompt_dir)
@@ -68,5 +94,6 @@ def save_formatted_prompt(formatted_prompt: str, video_title: str, current_date:
     prompt_path = os.path.join(prompt_dir, prompt_filename)
     with open(prompt_path, 'w', encoding='utf-8') as f:
         f.write(formatted_prompt)
+    store_artifact(video_id, 'prompt', formatted_prompt, video_title)
     
     return prompt_path
@@ -0,0 +1,307 @@
+"""
+Summary requests routed across several provider/model pairs.
+
+A ProviderRouter takes an ordered list of routes such as
+"openrouter:anthropic/claude-sonnet-4.5,openai:gpt-5.1,grok" and
+- fails over to the next route when a call errors or times out; while
+  another route is left, an attempt is not retried by the HTTP layer
+  (ROUTE_MAX_RETRIES, default 0), so a degraded provider is left quickly,
+- optionally hedges: if the current route has not produced its first byte
+  within hedge_after seconds, the same request is also sent to the next
+  route and whichever answers first is used,
+- keeps rolling latency samples per route, so routes that are currently
+  much slower than the fastest one, or failing repeatedly, are tried later.
+
+First byte means the first streamed token, or the whole response for
+non-streaming calls (which arrive in one piece).
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from summarizer import get_summary
+from tracing import _percentile, bind_trace
+from deadline import DeadlineExceeded
+from config.config_manager import get_setting
+
+
+PROVIDERS = ('openai', 'grok', 'openrouter')
+
+
+@dataclass(frozen=True)
+class Route:
+    """One provider/model pair; model None means the provider's default."""
+    provider: str
+    model: Optional[str] = None
+
+    def __str__(self):
+        return f"{self.provider}:{self.model}" if self.model else self.provider
+
+
+def parse_routes(spec: str) -> List[Route]:
+    """
+    Parse "provider[:model],..." into routes. Only the first ':' separates
+    provider and model, so OpenRouter names like "x/y:free" are kept whole.
+    Raises ValueError for unknown providers or an empty list.
+    """
+    routes = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        provider, _, model = item.partition(':')
+        provider = provider.strip().lower()
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown provider '{provider}' in route '{item}'")
+        routes.append(Route(provider, model.strip() or None))
+    if not routes:
+        raise ValueError("No routes given")
+    return routes
+
+
+class RouteStats:
+    """
+    Rolling latency samples and failure state for one route.
+
+    Args:
+        window: Number of recent latencies kept
+        max_failures: Consecutive failures before the route cools down
+        cooldown: Seconds a failing route is moved to the back of the order
+    """
+
+    def __init__(self, window: int = 20, max_failures: int = 3, cooldown: float = 60.0):
+        self.latencies = deque(maxlen=window)
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.calls = 0
+        self.failures = 0
+        self.hedges_won = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def record_success(self, latency: float):
+        self.calls += 1
+        self.latencies.append(latency)
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.calls += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.max_failures:
+            self.cooldown_until = time.monotonic() + self.cooldown
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        return _percentile(sorted(self.latencies), fraction)
+
+
+class HedgeCancelled(Exception):
+    """Raised inside a streamed attempt whose competitor already won."""
+
+
+class _Attempt:
+    """State for one call to one route within a routed request."""
+
+    def __init__(self, route: Route, hedge: bool):
+        self.route = route
+        self.hedge = hedge
+        # Set when the attempt leaves the worker pool's queue, so queue wait does not count toward hedge_after
+        self.started: Optional[float] = None
+        self.first_byte_at: Optional[float] = None
+        self.cancelled = False
+        self.max_retries: Optional[int] = None
+
+
+class ProviderRouter:
+    """
+    Args:
+        routes: Routes in order of preference
+        api_keys: API key per provider name
+        hedge_after: Seconds without a first byte before hedging (0 disables)
+        timeout: Read timeout per attempt in seconds (None: HTTP_READ_TIMEOUT)
+        slow_factor: Routes whose median latency exceeds the fastest route's
+            by this factor are tried after the others
+        window: Latency samples kept per route
+        max_workers: Concurrent attempts across all routed requests
+        max_retries: HTTP retries per attempt while another route is left to
+            fail over to (None: ROUTE_MAX_RETRIES, default 0); the last route
+            left keeps HTTP_MAX_RETRIES
+    """
+
+    def __init__(self, routes: List[Route], api_keys: Dict[str, str], hedge_after: float = 0.0,
+                 timeout: Optional[float] = None, slow_factor: float = 2.0, window: int = 20,
+                 max_workers: int = 8, max_retries: Optional[int] = None):
+        missing = sorted({r.provider for r in routes if not api_keys.get(r.provider)})
+        if missing:
+            raise ValueError(f"No API key for: {', '.join(missing)}")
+        self.routes = list(routes)
+        self.api_keys = api_keys
+        self.hedge_after = hedge_after
+        self.timeout = timeout
+        self.slow_factor = slow_factor
+        self.max_retries = get_setting("ROUTE_MAX_RETRIES", 0) if max_retries is None else max_retries
+        self._stats = {route: RouteStats(window) for route in self.routes}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="route")
+
+    def ranked_routes(self) -> List[Route]:
+        """
+        Routes in the order they should be tried: healthy routes in configured
+        order, then slow ones (fastest first), then routes cooling down.
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [r for r in self.routes if self._stats[r].available(now)]
+            cooling = [r for r in self.routes if r not in healthy]
+            medians = {r: self._stats[r].percentile(0.5) for r in healthy}
+        known = [m for m in medians.values() if m is not None]
+        if not known:
+            return healthy + cooling
+        limit = min(known) * self.slow_factor
+        preferred = [r for r in healthy if medians[r] is None or medians[r] <= limit]
+        slow = sorted((r for r in healthy if r not in preferred), key=lambda r: medians[r])
+        return preferred + slow + cooling
+
+    def summarize(self, transcript_content: str, use_cache: bool = True, stream: bool = False,
+                  on_token: Optional[Callable[[str], None]] = None, system_prompt: Optional[str] = None,
+                  video_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        get_summary with failover and hedging across the configured routes.
+        Returns the winning response (with a "route" entry), or None if every route failed.
+        """
+        remaining = self.ranked_routes()
+        pending = {}
+        owner = []  # the streamed attempt whose tokens reach on_token
+        owner_lock = threading.Lock()
+        hedged = False
+
+        def forward(attempt: _Attempt) -> Callable[[str], None]:
+            def on_attempt_token(token: str):
+                if attempt.cancelled:
+                    raise HedgeCancelled(f"{attempt.route} superseded by a faster route")
+                if attempt.first_byte_at is None:
+                    attempt.first_byte_at = time.monotonic()
+                with owner_lock:
+                    if not owner:
+                        owner.append(attempt)
+                    if owner[0] is not attempt:
+                        attempt.cancelled = True
+                        raise HedgeCancelled(f"{attempt.route} superseded by a faster route")
+                if on_token:
+                    on_token(token)
+            return on_attempt_token
+
+        def launch(hedge: bool = False):
+            route = remaining.pop(0)
+            attempt = _Attempt(route, hedge)
+            # Fail over instead of retrying while there is a route left to fail over to
+            attempt.max_retries = self.max_retries if remaining else None
+            call = bind_trace(self._call)
+            pending[self._pool.submit(call, attempt, transcript_content, use_cache, stream,
+                                      forward(attempt) if stream else None, system_prompt, video_id)] = attempt
+
+        launch()
+        while pending:
+            timeout = None
+            if self.hedge_after and not hedged and remaining and len(pending) == 1:
+                primary = next(iter(pending.values()))
+                waited = time.monotonic() - primary.started if primary.started is not None else 0.0
+                timeout = max(0.0, self.hedge_after - waited)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                if primary.started is None or time.monotonic() - primary.started < self.hedge_after:
+                    # Still queued for a worker, or started since the wait began
+                    continue
+                hedged = True
+                if primary.first_byte_at is None:
+                    print(f"[ProviderRouter] No first byte from {primary.route} after {self.hedge_after:.1f}s, "
+                          f"hedging with {remaining[0]}")
+                    launch(hedge=True)
+                continue
+
+            for future in done:
+                attempt = pending.pop(future)
+                try:
+                    result = future.result()
+                except DeadlineExceeded:
+                    self._cancel(pending)
+                    raise
+                if result is None:
+                    if not attempt.cancelled:
+                        print(f"[ProviderRouter] {attempt.route} failed")
+                    with owner_lock:
+                        lost_stream = stream and owner and owner[0] is attempt
+                    if lost_stream:
+                        print("[ProviderRouter] Stream failed after output started, not failing over")
+                        self._cancel(pending)
+                        return None
+                    if not pending and remaining:
+                        print(f"[ProviderRouter] Failing over to {remaining[0]}")
+                        hedged = False
+                        launch()
+                    continue
+                with owner_lock:
+                    if stream and owner and owner[0] is not attempt:
+                        continue
+                self._cancel(pending)
+                if attempt.hedge:
+                    print(f"[ProviderRouter] Hedged request to {attempt.route} answered first")
+                    with self._lock:
+                        self._stats[attempt.route].hedges_won += 1
+                result = dict(result)
+                result['route'] = str(attempt.route)
+                return result
+
+        print("[ProviderRouter] All routes failed")
+        return None
+
+    def _call(self, attempt: _Attempt, transcript_content: str, use_cache: bool, stream: bool,
+              on_token: Optional[Callable[[str], None]], system_prompt: Optional[str],
+              video_id: Optional[str]) -> Optional[Dict]:
+        """Run get_summary for one attempt and record its latency or failure."""
+        attempt.started = time.monotonic()
+        route = attempt.route
+        result = get_summary(transcript_content, self.api_keys[route.provider], grok=route.provider == 'grok',
+                             use_openai=route.provider == 'openai',
+                             openrouter_model=route.model if route.provider == 'openrouter' else None,
+                             model=route.model, use_cache=use_cache, stream=stream, on_token=on_token,
+                             system_prompt=system_prompt, video_id=video_id, timeout=self.timeout,
+                             max_retries=attempt.max_retries)
+        with self._lock:
+            stats = self._stats[route]
+            if result is not None:
+                # Losing non-streamed attempts still finish and are worth a sample
+                first_byte = attempt.first_byte_at or time.monotonic()
+                stats.record_success(first_byte - attempt.started)
+            elif not attempt.cancelled:
+                stats.record_failure()
+        return None if attempt.cancelled else result
+
+    @staticmethod
+    def _cancel(pending: Dict):
+        """Stop forwarding losing attempts; streamed ones abort at their next token."""
+        for attempt in pending.values():
+            attempt.cancelled = True
+
+    def print_stats(self):
+        """Print calls, failures, hedge wins and rolling first-byte latency per route."""
+        with self._lock:
+            rows = [(str(r), s.calls, s.failures, s.hedges_won, s.percentile(0.5), s.percentile(0.95))
+                    for r, s in self._stats.items()]
+        width = max(len(row[0]) for row in rows)
+        print(f"[ProviderRouter] {'route':<{width}}  {'calls':>5}  {'failed':>6}  {'hedges won':>10}  "
+              f"{'p50 (s)':>8}  {'p95 (s)':>8}")
+        for name, calls, failures, hedges_won, p50, p95 in rows:
+            p50 = f"{p50:>8.2f}" if p50 is not None else f"{'-':>8}"
+            p95 = f"{p95:>8.2f}" if p95 is not None else f"{'-':>8}"
+            print(f"[ProviderRouter] {name:<{width}}  {calls:>5}  {failures:>6}  {hedges_won:>10}  {p50}  {p95}")
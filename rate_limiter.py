@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Provider rate limits shared by every thread and process on this host.
+
+Limits come from config/rate_limits.json, keyed by "provider/model" or by
+provider alone, in requests and tokens per minute:
+
+  {"openai/gpt-5.1": {"rpm": 500, "tpm": 500000}, "grok": {"rpm": 60}}
+
+Each limit is a token bucket whose state lives in SQLite, so parallel
+copies of the pipeline draw from the same quota. A caller reserves its
+request and estimated tokens up front and sleeps only until the bucket
+covers them; reservations queue behind each other, which spreads calls
+evenly at the sustained rate instead of bursting into 429s. Token
+estimates are corrected once the response reports real usage, and a 429
+drains the bucket for everyone until its Retry-After has passed.
+
+Usage:
+  python rate_limiter.py    # show how much of each quota is available now
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from config.config_manager import get_setting
+from deadline import DeadlineExceeded, current_deadline
+
+
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(__file__), "data", "rate_limits.db")
+LIMITS_PATH = os.path.join(os.path.dirname(__file__), "config", "rate_limits.json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    level REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def _load_limits() -> Dict:
+    """Load config/rate_limits.json; a missing file means no limits."""
+    try:
+        with open(LIMITS_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"[RateLimiter] Could not read rate limits file: {e}")
+        return {}
+
+
+class RateLimiter:
+    """
+    Args:
+        limits: {"provider/model" or "provider": {"rpm": ..., "tpm": ...}}
+        path: SQLite database holding the bucket state
+        burst_seconds: Bucket capacity in seconds of quota; smaller values
+            pace calls more evenly
+    """
+
+    def __init__(self, limits: Dict, path: str = DEFAULT_STATE_PATH, burst_seconds: float = 10.0):
+        self.limits = limits
+        self.path = path
+        self.burst_seconds = burst_seconds
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; transactions are managed explicitly
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def buckets_for(self, provider: str, model: str) -> Dict[str, float]:
+        """
+        Return {"<key>:rpm": per-minute limit, "<key>:tpm": ...} for the
+        most specific configured entry, or {} if the route is unlimited.
+        """
+        for key in (f"{provider}/{model}", provider):
+            entry = self.limits.get(key)
+            if entry:
+                return {f"{key}:{kind}": float(entry[kind]) for kind in ("rpm", "tpm") if entry.get(kind)}
+        return {}
+
+    def _update(self, changes: Dict[str, Tuple[float, float]], penalty: float = 0.0) -> float:
+        """
+        Refill the given buckets, subtract each (cost, per-minute limit)
+        pair's cost, and return how long until the deepest one is back at zero.
+        With a penalty, buckets are also emptied for that many seconds.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            wait = 0.0
+            for key, (cost, per_minute) in changes.items():
+                rate = per_minute / 60.0
+                capacity = rate * self.burst_seconds
+                row = conn.execute("SELECT level, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+                level = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                level -= cost
+                if penalty:
+                    level = min(level, -penalty * rate)
+                conn.execute("INSERT OR REPLACE INTO buckets (key, level, updated_at) VALUES (?, ?, ?)",
+                             (key, level, now))
+                if level < 0:
+                    wait = max(wait, -level / rate)
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def acquire(self, provider: str, model: str, tokens: int) -> float:
+        """
+        Reserve one request and `tokens` estimated tokens, sleeping until the
+        reservation is within quota. Returns the seconds waited. If the wait
+        would outlast the active video deadline, the reservation is given
+        back and DeadlineExceeded is raised.
+        """
+        buckets = self.buckets_for(provider, model)
+        if not buckets:
+            return 0.0
+        changes = {key: (1 if key.endswith(":rpm") else tokens, limit) for key, limit in buckets.items()}
+        try:
+            wait = self._update(changes)
+        except (sqlite3.Error, OSError) as e:
+            # A broken state file must not stop the call; go ahead unlimited
+            print(f"[RateLimiter] Could not reserve quota: {e}")
+            return 0.0
+        deadline = current_deadline()
+        if deadline is not None and wait >= deadline.remaining():
+            try:
+                self._update({key: (-cost, limit) for key, (cost, limit) in changes.items()})
+            except (sqlite3.Error, OSError) as e:
+                print(f"[RateLimiter] Could not release quota: {e}")
+            raise DeadlineExceeded("summary.rate_limit", deadline.seconds)
+        if wait > 0:
+            if wait >= 1:
+                print(f"[RateLimiter] Waiting {wait:.1f}s for {provider}/{model} quota")
+            time.sleep(wait)
+        return wait
+
+    def settle(self, provider: str, model: str, estimated: int, actual: int):
+        """Correct a reservation's token estimate with the usage the provider reported."""
+        buckets = {key: limit for key, limit in self.buckets_for(provider, model).items() if key.endswith(":tpm")}
+        if not buckets or actual == estimated:
+            return
+        try:
+            self._update({key: (actual - estimated, limit) for key, limit in buckets.items()})
+        except (sqlite3.Error, OSError) as e:
+            print(f"[RateLimiter] Could not settle quota: {e}")
+
+    def penalize(self, provider: str, model: str, delay: float):
+        """Empty the route's buckets for `delay` seconds after the provider answered 429."""
+        buckets = self.buckets_for(provider, model)
+        if not buckets:
+            return
+        try:
+            self._update({key: (0, limit) for key, limit in buckets.items()}, penalty=delay)
+        except (sqlite3.Error, OSError) as e:
+            print(f"[RateLimiter] Could not record throttling: {e}")
+
+    def status(self) -> Dict[str, Dict[str, float]]:
+        """Return each configured bucket's current level and per-minute limit."""
+        rows = {key: (level, updated_at) for key, level, updated_at in
+                self._conn().execute("SELECT key, level, updated_at FROM buckets")}
+        now = time.time()
+        status = {}
+        for entry, limits in self.limits.items():
+            for kind in ("rpm", "tpm"):
+                if not limits.get(kind):
+                    continue
+                key = f"{entry}:{kind}"
+                rate = limits[kind] / 60.0
+                capacity = rate * self.burst_seconds
+                level, updated_at = rows.get(key, (capacity, now))
+                status[key] = {"limit": float(limits[kind]),
+                               "available": min(capacity, level + max(0.0, now - updated_at) * rate),
+                               "capacity": capacity}
+        return status
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Return the process-wide limiter using config/rate_limits.json and
+    RATE_LIMIT_STATE_PATH (default: data/rate_limits.db).
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(_load_limits(), get_setting("RATE_LIMIT_STATE_PATH", DEFAULT_STATE_PATH),
+                                   burst_seconds=get_setting("RATE_LIMIT_BURST_SECONDS", 10.0))
+        return _limiter
+
+
+def main():
+    limiter = get_rate_limiter()
+    status = limiter.status()
+    if not status:
+        print(f"No rate limits configured (see {LIMITS_PATH})")
+        return
+    for key, bucket in status.items():
+        print(f"{key:<40}  {bucket['available']:>12,.0f} / {bucket['capacity']:,.0f} available  "
+              f"(limit {bucket['limit']:,.0f}/min)")
+
+
+if __name__ == "__main__":
+    main()
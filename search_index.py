@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Full-text search over saved transcripts and summaries.
+
+Transcripts are split into passages of consecutive '[mm:ss]' lines and
+indexed with SQLite FTS5, which ranks matches with BM25. Each passage keeps
+its lines, so a hit is reported with the timestamp of the best-matching
+line. Summaries are indexed by paragraph. Documents are (re)indexed as they
+are saved, replacing the earlier passages for the same video and kind.
+
+Chinese and Japanese text has no spaces between words, so CJK characters
+are indexed as single-character terms and searched as phrases.
+
+Usage:
+  python search_index.py search "prompt caching"
+  python search_index.py search "提示詞" --kind transcript --limit 5
+  python search_index.py reindex
+  python search_index.py stats
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config.config_manager import get_setting
+from video_metadata import get_cached_metadata
+
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(__file__), "data", "search.db")
+KINDS = ('transcript', 'summary')
+
+# Passage size for transcripts: a passage ends once either limit is reached
+PASSAGE_SECONDS = 30
+PASSAGE_WORDS = 80
+
+# Passages ranked per requested result before duplicates per video are dropped
+_POOL_FACTOR = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    video_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    title TEXT,
+    channel TEXT,
+    indexed_at REAL NOT NULL,
+    PRIMARY KEY (video_id, kind)
+);
+CREATE TABLE IF NOT EXISTS passages (
+    id INTEGER PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    start INTEGER,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_passages_video ON passages (video_id, kind);
+CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5 (terms, kind, tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+_LINE_RE = re.compile(r'^\[(\d+):(\d{2})\]\s?(.*)$')
+_TIMESTAMP_RE = re.compile(r'^\[\d+:\d{2}\]', re.MULTILINE)
+# Kana, CJK unified ideographs (with extension A) and compatibility ideographs
+_CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_CJK_RE = re.compile(f'([{_CJK_CHARS}])')
+_QUERY_TERM_RE = re.compile(f'[{_CJK_CHARS}]+|[^\\s{_CJK_CHARS}]+')
+
+
+def _terms(text: str) -> str:
+    """
+    Text as handed to the FTS tokenizer: line timestamps are dropped and
+    CJK characters become separate terms.
+    """
+    return _CJK_RE.sub(r' \1 ', _TIMESTAMP_RE.sub('', text))
+
+
+def transcript_passages(formatted_transcript: str) -> List[Tuple[int, str]]:
+    """
+    Group the '[mm:ss] text' lines of a formatted transcript into passages.
+    Returns (start seconds, passage lines) pairs; lines keep their timestamps.
+    """
+    passages = []
+    lines, start, words = [], None, 0
+    for line in formatted_transcript.splitlines():
+        match = _LINE_RE.match(line)
+        if not match or not match.group(3).strip():
+            continue
+        seconds = int(match.group(1)) * 60 + int(match.group(2))
+        if lines and (seconds - start >= PASSAGE_SECONDS or words >= PASSAGE_WORDS):
+            passages.append((start, '\n'.join(lines)))
+            lines, words = [], 0
+        if not lines:
+            start = seconds
+        lines.append(line)
+        words += len(match.group(3).split())
+    if lines:
+        passages.append((start, '\n'.join(lines)))
+    return passages
+
+
+def summary_passages(summary: str) -> List[Tuple[Optional[int], str]]:
+    """Split a summary into paragraphs, which carry no timestamp."""
+    return [(None, paragraph.strip()) for paragraph in re.split(r'\n\s*\n', summary) if paragraph.strip()]
+
+
+def build_match_query(query: str, any_term: bool = False) -> str:
+    """
+    Turn free text into an FTS5 query: every word (or run of CJK characters)
+    becomes a quoted phrase, so user input cannot break the query syntax.
+    Terms are AND-ed unless any_term is set.
+    """
+    phrases = []
+    for term in _QUERY_TERM_RE.findall(query):
+        phrase = ' '.join(_terms(term).split()).replace('"', '""')
+        if phrase.strip('"'):
+            phrases.append(f'"{phrase}"')
+    return (' OR ' if any_term else ' ').join(phrases)
+
+
+def _format_timestamp(seconds: int) -> str:
+    return f"[{seconds // 60:02d}:{seconds % 60:02d}]"
+
+
+def _best_line(body: str, query: str, width: int) -> Tuple[Optional[int], str]:
+    """
+    Pick the passage line with the most query-term occurrences and return
+    its timestamp (if any) and a snippet of at most `width` characters.
+    """
+    terms = [t.lower() for t in _QUERY_TERM_RE.findall(query)]
+    best, best_hits = body.splitlines()[0], -1
+    for line in body.splitlines():
+        lowered = line.lower()
+        hits = sum(lowered.count(term) for term in terms)
+        if hits > best_hits:
+            best, best_hits = line, hits
+    start = None
+    match = _LINE_RE.match(best)
+    if match:
+        start = int(match.group(1)) * 60 + int(match.group(2))
+        best = match.group(3)
+    best = ' '.join(best.split())
+    if len(best) > width:
+        lowered = best.lower()
+        first = min((lowered.find(t) for t in terms if t in lowered), default=0)
+        begin = max(0, min(first - width // 4, len(best) - width))
+        best = ('…' if begin else '') + best[begin:begin + width] + ('…' if begin + width < len(best) else '')
+    return start, best
+
+
+class SearchIndex:
+    """
+    Args:
+        path: SQLite database file
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite connections are not shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def add(self, video_id: str, kind: str, text: str, title: Optional[str] = None,
+            channel: Optional[str] = None) -> int:
+        """
+        Index a transcript or summary, replacing its earlier passages.
+        Returns the number of passages indexed.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown document kind: {kind}")
+        passages = transcript_passages(text) if kind == 'transcript' else summary_passages(text)
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM passages_fts WHERE rowid IN "
+                         "(SELECT id FROM passages WHERE video_id = ? AND kind = ?)", (video_id, kind))
+            conn.execute("DELETE FROM passages WHERE video_id = ? AND kind = ?", (video_id, kind))
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (video_id, kind, title, channel, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                (video_id, kind, title, channel, time.time()),
+            )
+            for start, body in passages:
+                rowid = conn.execute("INSERT INTO passages (video_id, kind, start, body) VALUES (?, ?, ?, ?)",
+                                     (video_id, kind, start, body)).lastrowid
+                conn.execute("INSERT INTO passages_fts (rowid, terms, kind) VALUES (?, ?, ?)",
+                             (rowid, _terms(body), kind))
+        return len(passages)
+
+    def search(self, query: str, kind: Optional[str] = None, channel: Optional[str] = None,
+               limit: int = 10, any_term: bool = False, snippet_width: int = 120) -> List[Dict]:
+        """
+        Return the best-ranked passages for a query, at most one per video and kind.
+        Each hit has video_id, kind, title, channel, start (seconds or None),
+        snippet and score (BM25, lower is better).
+        """
+        match = build_match_query(query, any_term)
+        if not match:
+            return []
+        if kind and kind not in KINDS:
+            raise ValueError(f"Unknown document kind: {kind}")
+        # The kind is an FTS column too, so filtering by it happens inside the index
+        match = f'terms : ({match})' + (f' AND kind : "{kind}"' if kind else '')
+        clauses, params = [], []
+        if channel:
+            clauses.append("d.channel = ?")
+            params.append(channel)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        # Take the best-ranked passages, keep the first per document, and
+        # widen the pool only if too few distinct documents came back
+        pool = max(limit * _POOL_FACTOR, 100)
+        matched = None
+        while True:
+            rows = self._conn().execute(
+                "SELECT p.video_id, p.kind, d.title, d.channel, p.start, p.body, m.score FROM "
+                "(SELECT rowid, rank AS score FROM passages_fts WHERE passages_fts MATCH ? ORDER BY rank LIMIT ?) m "
+                "JOIN passages p ON p.id = m.rowid "
+                "JOIN documents d ON d.video_id = p.video_id AND d.kind = p.kind "
+                f"{where} ORDER BY m.score",
+                [match, pool] + params,
+            ).fetchall()
+            best = {}
+            for row in rows:
+                best.setdefault((row[0], row[1]), row)
+            if len(best) >= limit or len(rows) < pool and not clauses:
+                break
+            if matched is None:
+                matched = self._conn().execute("SELECT COUNT(*) FROM passages_fts WHERE passages_fts MATCH ?",
+                                               (match,)).fetchone()[0]
+            if pool >= matched:
+                break
+            pool *= 4
+
+        hits = []
+        for video_id, hit_kind, title, hit_channel, start, body, score in list(best.values())[:limit]:
+            line_start, snippet = _best_line(body, query, snippet_width)
+            hits.append({
+                "video_id": video_id, "kind": hit_kind, "title": title, "channel": hit_channel,
+                "start": line_start if line_start is not None else start,
+                "snippet": snippet, "score": score,
+            })
+        return hits
+
+    def stats(self) -> Dict[str, int]:
+        """Return indexed document and passage counts."""
+        conn = self._conn()
+        documents = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        passages = conn.execute("SELECT COUNT(*) FROM passages").fetchone()[0]
+        return {"documents": documents, "passages": passages}
+
+    def optimize(self):
+        """Merge the FTS index segments (worth doing after a large reindex)."""
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT INTO passages_fts (passages_fts) VALUES ('optimize')")
+
+
+_index: Optional[SearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """
+    Return the process-wide index at SEARCH_INDEX_PATH (default: data/search.db).
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex(get_setting("SEARCH_INDEX_PATH", DEFAULT_INDEX_PATH))
+        return _index
+
+
+def index_document(video_id: Optional[str], kind: str, text: str, title: Optional[str] = None):
+    """
+    Index a saved transcript or summary, taking title and channel from known
+    metadata. Other kinds and calls without a video ID are ignored; errors
+    are printed, never raised.
+    """
+    if not video_id or kind not in KINDS:
+        return
+    metadata = get_cached_metadata(video_id)
+    try:
+        get_search_index().add(video_id, kind, text, title=(metadata or {}).get('title') or title,
+                               channel=metadata.get('channel') if metadata else None)
+    except (sqlite3.Error, OSError) as e:
+        print(f"[SearchIndex] Could not index {kind} for {video_id}: {e}")
+
+
+def reindex(index: SearchIndex, store_path: Optional[str] = None) -> int:
+    """
+    Rebuild the index from every transcript and summary in the artifact store.
+    Returns the number of documents indexed.
+    """
+    # Imported here because the artifact store indexes through this module
+    from artifact_store import ArtifactStore, get_artifact_store
+
+    store = ArtifactStore(store_path) if store_path else get_artifact_store()
+    count = 0
+    for kind in KINDS:
+        seen = set()
+        for row in store.find(kind=kind):
+            # find() is newest first; with several models keep the newest summary
+            if row['video_id'] in seen:
+                continue
+            seen.add(row['video_id'])
+            text = store.get(row['video_id'], kind)
+            if text is not None:
+                index.add(row['video_id'], kind, text, title=row['title'], channel=row['channel'])
+                count += 1
+    index.optimize()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search saved transcripts and summaries")
+    parser.add_argument("--index", help=f"Index database (default: {DEFAULT_INDEX_PATH})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search_parser = subparsers.add_parser("search", help="Find videos mentioning the query")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--kind", choices=KINDS, help="Only transcripts or only summaries")
+    search_parser.add_argument("--channel", help="Channel name")
+    search_parser.add_argument("--limit", type=int, default=10, help="Maximum results (default: 10)")
+    search_parser.add_argument("--any", action="store_true", help="Match any word instead of all words")
+
+    reindex_parser = subparsers.add_parser("reindex", help="Rebuild the index from the artifact store")
+    reindex_parser.add_argument("--store", help="Artifact store database (default: ARTIFACT_STORE_PATH)")
+
+    subparsers.add_parser("stats", help="Show indexed document and passage counts")
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index) if args.index else get_search_index()
+    if args.command == "search":
+        started = time.perf_counter()
+        hits = index.search(args.query, args.kind, args.channel, args.limit, args.any)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for hit in hits:
+            if hit["start"] is not None:
+                location = f"{_format_timestamp(hit['start'])} https://youtu.be/{hit['video_id']}?t={hit['start']}"
+            else:
+                location = f"[summary] https://youtu.be/{hit['video_id']}"
+            print(f"{hit['title'] or hit['video_id']}\n  {location}\n  {hit['snippet']}")
+        print(f"{len(hits)} results in {elapsed_ms:.1f} ms", file=sys.stderr)
+    elif args.command == "reindex":
+        count = reindex(index, args.store)
+        print(f"Indexed {count} documents")
+    else:
+        stats = index.stats()
+        print(f"{stats['documents']} documents, {stats['passages']} passages")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,143 @@
+import hashlib
 import json
 import os
+import threading
+import time
 import requests
-from typing import Optional, Dict, Union
+from typing import Callable, Optional, Dict, List, Union
+from summary_cache import get_summary_cache
+from http_client import get_http_client
+from tracing import span, record_bytes
+from usage_ledger import record_call, extract_usage
+from rate_limiter import get_rate_limiter
+from deadline import DeadlineExceeded, check_deadline
+from token_utils import estimate_tokens
+from video_metadata import get_cached_metadata
+from prompt_formatter import load_system_prompt
+from config.config_manager import get_setting, get_output_dir
+from artifact_store import store_artifact
 
 
-def get_summary(transcript_content: str, api_key: str, grok: bool = False, use_openai: bool = False, openrouter_model: str = None) -> Optional[Dict]:
+DEFAULT_MODELS = {
+    "openai": "gpt-5.1",
+    "grok": "grok-4-1-fast-non-reasoning",
+    "openrouter": "openai/gpt-5.1",
+}
+
+# OpenRouter models that need explicit cache_control markers for prompt caching
+_CACHE_CONTROL_MODEL_PREFIXES = ("anthropic/",)
+
+# Token counts over all API calls made in this process
+_usage_totals = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+_usage_lock = threading.Lock()
+
+
+def _read_sse_stream(response: requests.Response, on_token: Optional[Callable[[str], None]],
+                     started: float) -> Dict:
+    """
+    Consume an OpenAI-compatible SSE stream and assemble a response dict shaped
+    like the non-streaming API (choices[0].message.content, usage), plus timing.
+    Raises ChunkedEncodingError if the stream closes before [DONE] or a
+    finish_reason, so a truncated summary is never taken for a complete one.
+    """
+    parts = []
+    usage = None
+    finish_reason = None
+    response_id = None
+    response_model = None
+    first_token_at = None
+    completed = False
+
+    # SSE is always UTF-8; requests would otherwise assume ISO-8859-1 for text/*
+    response.encoding = "utf-8"
+    for line in response.iter_lines(decode_unicode=True):
+        check_deadline("summary")
+        if line:
+            record_bytes(received=len(line))
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            completed = True
+            break
+        chunk = json.loads(payload)
+        response_id = chunk.get("id", response_id)
+        response_model = chunk.get("model", response_model)
+        if chunk.get("usage"):
+            usage = chunk["usage"]
+        for choice in chunk.get("choices") or []:
+            token = (choice.get("delta") or {}).get("content")
+            if token:
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                parts.append(token)
+                if on_token:
+                    on_token(token)
+            if choice.get("finish_reason"):
+                finish_reason = choice["finish_reason"]
+
+    if not completed and finish_reason is None:
+        raise requests.exceptions.ChunkedEncodingError("Stream closed before the response was complete")
+
+    finished = time.monotonic()
+    return {
+        "id": response_id,
+        "model": response_model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(parts)},
+            "finish_reason": finish_reason,
+        }],
+        "usage": usage,
+        "timing": {
+            "time_to_first_token": (first_token_at - started) if first_token_at else None,
+            "total_time": finished - started,
+        },
+    }
+
+
+def _record_usage(provider: str, model: str, result: Dict, latency: float, video_id: Optional[str]):
+    """Print token usage for a completed call and append it to the usage ledger."""
+    usage = result.get("usage")
+    counts = extract_usage(usage)
+    if counts["prompt_tokens"] is not None:
+        completion = counts["completion_tokens"] or 0
+        with _usage_lock:
+            _usage_totals["calls"] += 1
+            _usage_totals["prompt_tokens"] += counts["prompt_tokens"]
+            _usage_totals["cached_tokens"] += counts["cached_tokens"] or 0
+            _usage_totals["completion_tokens"] += completion
+        print(f"[Summarizer] Tokens: {counts['prompt_tokens']} prompt ({counts['cached_tokens'] or 0} cached), "
+              f"{completion} completion, {completion / latency if latency > 0 else 0:.1f} tokens/s")
+    metadata = get_cached_metadata(video_id) if video_id else None
+    record_call(provider, model, usage, latency, video_id=video_id,
+                channel=metadata.get("channel") if metadata else None)
+
+
+def build_messages(sys_prompt: str, transcript_content: str, provider: str, model: str) -> List[Dict]:
+    """
+    Build the chat messages with the system prompt as a stable leading prefix.
+
+    OpenAI, xAI and most OpenRouter models cache repeated prefixes
+    automatically; Anthropic models on OpenRouter only cache up to an explicit
+    cache_control breakpoint, so the system prompt is marked for them.
+    """
+    if provider == "openrouter" and model.startswith(_CACHE_CONTROL_MODEL_PREFIXES):
+        system_content = [{"type": "text", "text": sys_prompt, "cache_control": {"type": "ephemeral"}}]
+    else:
+        system_content = sys_prompt
+    return [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": transcript_content},
+    ]
+
+
+def get_summary(transcript_content: str, api_key: str, grok: bool = False, use_openai: bool = False, openrouter_model: str = None,
+                use_cache: bool = True, stream: bool = False,
+                on_token: Optional[Callable[[str], None]] = None,
+                system_prompt: Optional[str] = None, video_id: Optional[str] = None,
+                model: Optional[str] = None, timeout: Optional[float] = None,
+                max_retries: Optional[int] = None) -> Optional[Dict]:
     """
     Generate a summary from the transcript content using the selected API.
     Returns the API response JSON as a dict, or None on failure.
@@ -15,52 +148,101 @@ def get_summary(transcript_content: str, api_key: str, grok: bool = False, use_o
         grok: Whether to use Grok API
         use_openai: Whether to use OpenAI API
         openrouter_model: Model name for OpenRouter (e.g., "openai/gpt-4o")
+        use_cache: Return a cached response for the same prompt, model and transcript
+        stream: Use the SSE streaming API; the result also carries a "timing" block
+        on_token: Called with each text fragment as it arrives (streaming only;
+            a cached response is delivered as a single fragment)
+        system_prompt: Override the prompt.txt system prompt (e.g. for chunk summaries)
+        video_id: Video the call is made for, recorded in the usage ledger
+        model: Override the provider's default model (OpenAI/Grok)
+        timeout: Read timeout in seconds for this call (default: HTTP_READ_TIMEOUT)
+        max_retries: HTTP retries for this call (default: HTTP_MAX_RETRIES)
     """
     if use_openai:
-        url = "https://api.openai.com/v1/chat/completions"
+        provider = "openai"
+        url = get_setting("OPENAI_BASE_URL", "https://api.openai.com/v1") + "/chat/completions"
     elif grok:
-        url = "https://api.x.ai/v1/chat/completions"
+        provider = "grok"
+        url = get_setting("GROK_BASE_URL", "https://api.x.ai/v1") + "/chat/completions"
     else:
-        url = "https://openrouter.ai/api/v1/chat/completions"
+        provider = "openrouter"
+        url = get_setting("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1") + "/chat/completions"
         
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}"
     }
 
-    # Load system prompt from external file
-    prompt_file_path = os.path.join(os.path.dirname(__file__), 'prompt.txt')
-    try:
-        with open(prompt_file_path, 'r', encoding='utf-8') as f:
-            sys_prompt = f.read()
-    except FileNotFoundError:
-        print(f"[Summarizer] Warning: Prompt file not found at {prompt_file_path}")
-        sys_prompt = "Please summarize the following content."  # Fallback prompt
-    except Exception as e:
-        print(f"[Summarizer] Error reading prompt file: {e}")
-        sys_prompt = "Please summarize the following content."  # Fallback prompt
+    # Memoized and byte-stable across calls, so provider prefix caching can hit
+    sys_prompt = load_system_prompt()
+    # Cache entries are invalidated when prompt.txt changes, whichever prompt is sent
+    prompt_version = sys_prompt
+    if system_prompt is not None:
+        sys_prompt = system_prompt
 
     if use_openai:
-        model = "gpt-5.1"
+        model = model or DEFAULT_MODELS["openai"]
     elif grok:
-        model = "grok-4-1-fast-non-reasoning"
+        model = model or DEFAULT_MODELS["grok"]
     else:
         # OpenRouter - use the model name provided by user
-        model = openrouter_model if openrouter_model else "openai/gpt-5.1"  # Default to gpt-5.1 if no model specified
+        model = openrouter_model if openrouter_model else DEFAULT_MODELS["openrouter"]
     # model = "meta-llama/llama-4-maverick:free"
+
+    cache = get_summary_cache() if use_cache else None
+    if cache:
+        cached = cache.get(sys_prompt, model, provider, transcript_content, prompt_version)
+        if cached is not None:
+            print(f"[Summarizer] Using cached summary ({provider}/{model})")
+            if stream and on_token:
+                on_token(cached['choices'][0]['message']['content'])
+            return cached
+
     data = {
-        "messages": [
-            {"role": "system", "content": sys_prompt},
-            {"role": "user", "content": transcript_content}
-        ],
+        "messages": build_messages(sys_prompt, transcript_content, provider, model),
         "model": model,
-        "stream": False
+        "stream": stream
     }
+    if provider == "openai":
+        # Route requests sharing this system prompt to the same prompt cache
+        data["prompt_cache_key"] = hashlib.sha256(sys_prompt.encode('utf-8')).hexdigest()[:32]
+    if stream:
+        data["stream_options"] = {"include_usage": True}
+    if provider == "openrouter":
+        # Ask OpenRouter to report the cost of the call in the usage block
+        data["usage"] = {"include": True}
+
+    # Reserve provider quota for the prompt and a typical completion; corrected from usage below
+    limiter = get_rate_limiter()
+    estimated_tokens = (estimate_tokens(sys_prompt) + estimate_tokens(transcript_content)
+                        + get_setting("RATE_LIMIT_COMPLETION_TOKENS", 1000))
+    with span("summarizer.rate_limit"):
+        limiter.acquire(provider, model, estimated_tokens)
 
     try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        return response.json()
+        with span("summarizer.request"):
+            started = time.monotonic()
+            client = get_http_client()
+            request_timeout = (client.timeout[0], timeout) if timeout else client.timeout
+            response = client.post(url, headers=headers, json=data, stream=stream, timeout=request_timeout,
+                                   stage="summary", max_retries=max_retries, on_throttle=lambda delay: limiter.penalize(provider, model, delay))
+            response.raise_for_status()
+            if stream:
+                with response:
+                    result = _read_sse_stream(response, on_token, started)
+                ttft = result["timing"]["time_to_first_token"]
+                if ttft is not None:
+                    print(f"[Summarizer] Time to first token: {ttft:.2f}s")
+            else:
+                result = response.json()
+        _record_usage(provider, model, result, time.monotonic() - started, video_id)
+        counts = extract_usage(result.get("usage"))
+        if counts["prompt_tokens"] is not None:
+            limiter.settle(provider, model, estimated_tokens,
+                           counts["prompt_tokens"] + (counts["completion_tokens"] or 0))
+        if cache:
+            cache.put(sys_prompt, model, provider, transcript_content, result, prompt_version)
+        return result
     except requests.exceptions.HTTPError as e:
         if response.status_code == 401:
             if use_openai:
@@ -76,15 +258,93 @@ def get_summary(transcript_content: str, api_key: str, grok: bool = False, use_o
                 print(f"[Summarizer] Response content: {response.text}")
         return None
     except requests.exceptions.ConnectionError as e:
+        check_deadline("summary")
         print(f"[Summarizer] Connection error: {e}")
         print("[Summarizer] Please check your network connection or if the API endpoint is correct.")
         return None
     except requests.exceptions.Timeout as e:
+        check_deadline("summary")
         print(f"[Summarizer] Request timeout: {e}")
         return None
     except requests.exceptions.RequestException as e:
         print(f"[Summarizer] Request error: {e}")
         return None
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"[Summarizer] Unexpected error: {e}")
         return None
+
+
+def get_usage_totals() -> Dict[str, int]:
+    """Return calls and prompt/cached/completion token totals for this process."""
+    with _usage_lock:
+        return dict(_usage_totals)
+
+
+def get_summary_path(video_title: str, current_date: str) -> str:
+    """
+    Return summary/<date>/<date>_<title>_summary.md, creating the directory if needed.
+    """
+    summary_filename = f"{current_date}_{video_title}_summary.md"
+    summary_dir = os.path.join(get_output_dir(), "summary", current_date)
+    if not os.path.exists(summary_dir):
+        os.makedirs(summary_dir)
+    return os.path.join(summary_dir, summary_filename)
+
+
+class StreamingSummaryWriter:
+    """
+    Append streamed summary fragments to the summary file as they arrive,
+    so an interrupted stream still leaves a partial summary on disk.
+
+    Args:
+        video_title: Video title for filename
+        current_date: Current date string (YYYY-MM-DD format)
+        echo: Also print each fragment to the console
+    """
+
+    def __init__(self, video_title: str, current_date: str, echo: bool = False):
+        self.path = get_summary_path(video_title, current_date)
+        self.echo = echo
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def __call__(self, token: str):
+        self._file.write(token)
+        self._file.flush()
+        if self.echo:
+            print(token, end='', flush=True)
+
+    def close(self):
+        self._file.close()
+        if self.echo:
+            print()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+@span("summary.save")
+def save_summary(summary: str, video_title: str, current_date: str, video_id: Optional[str] = None,
+                 model: Optional[str] = None) -> str:
+    """
+    Save summary text to summary/<date>/<date>_<title>_summary.md.
+
+    Args:
+        summary: The summary text
+        video_title: Video title for filename
+        current_date: Current date string (YYYY-MM-DD format)
+        video_id: Also record the summary in the artifact store under this video
+        model: Model that wrote the summary, for the artifact store
+
+    Returns:
+        Path to saved file
+    """
+    summary_path = get_summary_path(video_title, current_date)
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        f.write(summary)
+    store_artifact(video_id, 'summary', summary, video_title, model)
+    return summary_path
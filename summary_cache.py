@@ -0,0 +1,110 @@
+"""
+On-disk cache of LLM summary responses.
+
+Entries are keyed by a hash of (system prompt, model, provider, transcript)
+and grouped under cache/summaries/<prompt.txt hash>/. When prompt.txt changes,
+entries written for older versions of it are deleted.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Optional
+
+from config.config_manager import get_setting
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache", "summaries")
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class SummaryCache:
+    """
+    Args:
+        cache_dir: Directory holding cache entries
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._current_prompt_hash = None
+
+    def _entry_path(self, sys_prompt: str, model: str, provider: str, transcript_content: str,
+                    prompt_version: Optional[str]) -> str:
+        version_hash = _sha256(sys_prompt if prompt_version is None else prompt_version)[:16]
+        self._invalidate_stale(version_hash)
+        key = _sha256(json.dumps([_sha256(sys_prompt), model, provider, _sha256(transcript_content)]))[:32]
+        return os.path.join(self.cache_dir, version_hash, f"{key}.json")
+
+    def _invalidate_stale(self, prompt_hash: str):
+        """Delete entries written for any other version of the system prompt."""
+        with self._lock:
+            if prompt_hash == self._current_prompt_hash:
+                return
+            self._current_prompt_hash = prompt_hash
+            if not os.path.isdir(self.cache_dir):
+                return
+            for name in os.listdir(self.cache_dir):
+                if name != prompt_hash:
+                    print(f"[SummaryCache] Prompt changed, dropping cached summaries for {name}")
+                    shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+    def get(self, sys_prompt: str, model: str, provider: str, transcript_content: str,
+            prompt_version: Optional[str] = None) -> Optional[Dict]:
+        """
+        Return the stored response JSON, or None on a miss.
+        prompt_version is the prompt.txt text the entry depends on (defaults to sys_prompt).
+        """
+        path = self._entry_path(sys_prompt, model, provider, transcript_content, prompt_version)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                response = json.load(f)
+        except (OSError, ValueError):
+            response = None
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+
+    def put(self, sys_prompt: str, model: str, provider: str, transcript_content: str, response: Dict,
+            prompt_version: Optional[str] = None):
+        """
+        Store a successful response JSON.
+        """
+        path = self._entry_path(sys_prompt, model, provider, transcript_content, prompt_version)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(response, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[SummaryCache] Could not write cache entry: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+_cache: Optional[SummaryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> SummaryCache:
+    """
+    Return the shared cache configured from SUMMARY_CACHE_DIR.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SummaryCache(get_setting("SUMMARY_CACHE_DIR", DEFAULT_CACHE_DIR))
+        return _cache
@@ -0,0 +1,41 @@
+from caption_cleanup import dedupe_segments
+from transcript_handler import clean_transcript
+from transcript_segments import SegmentArray
+
+
+def _segments(texts, is_generated=True):
+    return SegmentArray.from_raw_data(
+        [{'text': text, 'start': float(i), 'duration': 1.0} for i, text in enumerate(texts)],
+        video_id='test', language='English', language_code='en', is_generated=is_generated,
+    )
+
+
+def _texts(segments):
+    return [segment.text for segment in segments]
+
+
+def test_single_shared_word_is_kept():
+    assert _texts(dedupe_segments(_segments(["so what I want to say is that", "that is the point"]))) == \
+        ["so what I want to say is that", "that is the point"]
+    assert _texts(dedupe_segments(_segments(["we went to the", "the store"]))) == \
+        ["we went to the", "the store"]
+
+
+def test_rolling_overlap_is_removed():
+    assert _texts(dedupe_segments(_segments(["we went to the", "to the store", "to the store"]))) == \
+        ["we went to the", "store"]
+
+
+def test_short_cjk_overlap_is_kept():
+    assert _texts(dedupe_segments(_segments(["我們今天要講", "講的是這個"]))) == ["我們今天要講", "講的是這個"]
+    assert _texts(dedupe_segments(_segments(["我們今天要講的", "今天要講的是這個"]))) == ["我們今天要講的", "是這個"]
+
+
+def test_manual_track_is_left_unchanged():
+    manual = _segments(["we went to the", "to the store", "to the store"], is_generated=False)
+    assert _texts(clean_transcript(manual)) == ["we went to the", "to the store", "to the store"]
+
+
+def test_generated_track_is_cleaned():
+    generated = _segments(["we went to the", "to the store"], is_generated=True)
+    assert _texts(clean_transcript(generated)) == ["we went to the", "store"]
@@ -0,0 +1,28 @@
+from transcript_resolver import Track, choose_track
+
+
+def test_native_track_comes_first():
+    tracks = [Track('ja', 'Japanese', False, True), Track('en', 'English', True, True)]
+    choice = choose_track(tracks, languages=['en', 'zh-Hant'], translate_to='zh-Hant', prefer_manual=False)
+    assert choice.track.language_code == 'en'
+    assert choice.translate_to is None
+
+
+def test_translation_when_no_native_track():
+    choice = choose_track([Track('ja', 'Japanese', False, True)],
+                          languages=['en', 'zh-Hant'], translate_to='zh-Hant', prefer_manual=False)
+    assert choice.track.language_code == 'ja'
+    assert choice.language_code == 'zh-Hant'
+    assert choice.translated_from == 'ja'
+
+
+def test_translation_prefers_manual_and_skips_untranslatable():
+    tracks = [Track('fr', 'French', False, False), Track('ja', 'Japanese', True, True),
+              Track('de', 'German', False, True)]
+    choice = choose_track(tracks, languages=['en'], translate_to='zh-Hant', prefer_manual=False)
+    assert choice.track.language_code == 'de'
+
+
+def test_no_translation_target_means_no_choice():
+    assert choose_track([Track('ja', 'Japanese', False, True)],
+                        languages=['en'], translate_to='', prefer_manual=False) is None
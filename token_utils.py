@@ -0,0 +1,19 @@
+"""
+Cheap token-count estimates for budgeting prompts without a tokenizer.
+"""
+
+import re
+
+# CJK ideographs, kana and hangul are roughly one token per character
+_CJK_RE = re.compile(r'[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of text: one token per CJK character plus
+    one token per four other characters.
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
@@ -0,0 +1,195 @@
+"""
+Lightweight per-video stage timing.
+
+A Trace collects stage durations, bytes transferred and HTTP retries for one
+video. Code marks stages with `span(name)`; the measurements go to the trace
+that is active in the current thread (see `use_trace`), or are dropped if
+there is none. Finished traces are appended as one JSONL record each and
+feed the end-of-run percentile table.
+"""
+
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, List, Optional
+
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+
+# Most recent durations per stage; bounded so a long-running service does not grow without limit
+MAX_SAMPLES = 10000
+_samples: Dict[str, Deque[float]] = {}
+_samples_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+class Trace:
+    """
+    Measurements for a single video.
+
+    Args:
+        video_id: YouTube video ID
+        log_path: JSONL file the finished record is appended to (None to skip)
+        deadline: The video's time budget (a deadline.Deadline), which
+            network stages running under this trace respect
+    """
+
+    def __init__(self, video_id: str, log_path: Optional[str] = None, deadline=None):
+        self.video_id = video_id
+        self.log_path = log_path
+        self.deadline = deadline
+        self.started_at = time.time()
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+
+    def add_stage(self, name: str, seconds: float):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            stage["seconds"] += seconds
+            stage["calls"] += 1
+
+    def add_bytes(self, sent: int = 0, received: int = 0):
+        with self._lock:
+            self.bytes_sent += sent
+            self.bytes_received += received
+
+    def add_retries(self, count: int = 1):
+        with self._lock:
+            self.retries += count
+
+    def finish(self, status: str = "ok", error: Optional[str] = None) -> Dict:
+        """
+        Close the trace, record its stage totals for the percentile table and
+        append it to the JSONL log. Returns the record.
+        """
+        total = time.monotonic() - self._start
+        with self._lock:
+            record = {
+                "video_id": self.video_id,
+                "started_at": self.started_at,
+                "total_seconds": round(total, 4),
+                "status": status,
+                "error": error,
+                "stages": {name: {"seconds": round(s["seconds"], 4), "calls": s["calls"]}
+                           for name, s in self.stages.items()},
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "retries": self.retries,
+                "deadline_seconds": self.deadline.seconds if self.deadline else None,
+            }
+
+        with _samples_lock:
+            _samples.setdefault("total", deque(maxlen=MAX_SAMPLES)).append(total)
+            for name, stage in record["stages"].items():
+                _samples.setdefault(name, deque(maxlen=MAX_SAMPLES)).append(stage["seconds"])
+
+        if self.log_path:
+            line = json.dumps(record, ensure_ascii=False)
+            with _log_lock:
+                try:
+                    directory = os.path.dirname(self.log_path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    with open(self.log_path, "a", encoding="utf-8") as f:
+                        f.write(line + "\n")
+                except OSError as e:
+                    print(f"[Tracing] Could not write trace log: {e}")
+        return record
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def use_trace(trace: Optional[Trace]):
+    """
+    Make `trace` the active trace in this thread for the duration of the block.
+    """
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def bind_trace(fn: Callable) -> Callable:
+    """
+    Wrap fn so it runs with the caller's active trace, e.g. before handing it
+    to a thread pool.
+    """
+    trace = current_trace()
+
+    def run(*args, **kwargs):
+        with use_trace(trace):
+            return fn(*args, **kwargs)
+    return run
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a stage and add it to the active trace. Usable as a decorator.
+    """
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_stage(name, time.monotonic() - start)
+
+
+def record_bytes(sent: int = 0, received: int = 0):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_bytes(sent, received)
+
+
+def record_retry():
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_retries()
+
+
+def response_bytes_hook(response, *args, **kwargs):
+    """
+    requests response hook that records request/response body sizes.
+    Streamed bodies are not read here; their consumers call record_bytes.
+    """
+    body = response.request.body
+    sent = len(body) if isinstance(body, (bytes, str)) else 0
+    received = 0 if kwargs.get("stream") else len(response.content)
+    record_bytes(sent, received)
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def print_stage_table():
+    """
+    Print count, p50, p95 and max per stage over the traces finished in this
+    run (the most recent MAX_SAMPLES per stage).
+    """
+    with _samples_lock:
+        samples = {name: sorted(values) for name, values in _samples.items() if values}
+    if not samples:
+        return
+    width = max(len(name) for name in samples)
+    print(f"\n[Tracing] {'stage':<{width}}  {'count':>5}  {'p50 (s)':>8}  {'p95 (s)':>8}  {'max (s)':>8}")
+    for name in sorted(samples, key=lambda n: (n == "total", n)):
+        values = samples[name]
+        print(f"[Tracing] {name:<{width}}  {len(values):>5}  {_percentile(values, 0.5):>8.3f}  "
+              f"{_percentile(values, 0.95):>8.3f}  {values[-1]:>8.3f}")
@@ -0,0 +1,256 @@
+"""
+Persistent on-disk cache of raw transcript segments.
+
+Entries are keyed by (video_id, language_code, is_generated, translated_from)
+and stored as JSON under cache/transcripts/<video_id>/. Entries expire after a
+TTL, and the least recently used ones are evicted once the cache grows past
+its size limit. The total size is kept as a running count of the bytes
+written, so the cache directory is only walked when the limit is crossed
+(eviction then goes down to 90% of it) or every few minutes to pick up
+writes from other processes.
+
+Each video directory also holds tracks.json: the caption tracks the video
+offers, or the reason it has none (captions disabled, no track in a wanted
+language, video unavailable). Track lists and negative outcomes have their
+own, shorter TTLs, since captions can be added after upload.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional
+
+from transcript_segments import SegmentArray
+from config.config_manager import get_setting
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache", "transcripts")
+# Recount the cache directory at least this often, since other processes write to it too
+_RESCAN_SECONDS = 600
+# Eviction frees space down to this fraction of max_bytes, so it does not rerun on the next write
+_EVICT_TARGET = 0.9
+
+
+class TranscriptCache:
+    """
+    Args:
+        cache_dir: Directory holding cache entries
+        ttl_seconds: Entry lifetime in seconds (0 disables expiry)
+        max_bytes: Total size limit before LRU eviction (0 disables eviction)
+        tracks_ttl_seconds: Lifetime of a video's cached track list
+        negative_ttl_seconds: Lifetime of a cached "no transcript" outcome
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl_seconds: int = 30 * 24 * 3600,
+                 max_bytes: int = 500 * 1024 * 1024, tracks_ttl_seconds: int = 7 * 24 * 3600,
+                 negative_ttl_seconds: int = 24 * 3600):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.tracks_ttl_seconds = tracks_ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._lock = threading.Lock()
+        # Running size of the cache, None until the directory is first counted
+        self._total_bytes: Optional[int] = None
+        self._scanned_at = 0.0
+
+    @staticmethod
+    def make_key(video_id: str, language_code: str, is_generated: bool,
+                 translated_from: Optional[str] = None) -> str:
+        raw = json.dumps([video_id, language_code, bool(is_generated), translated_from])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+    def _entry_path(self, video_id: str, key: str) -> str:
+        return os.path.join(self.cache_dir, video_id, f"{key}.json")
+
+    def _load(self, path: str, ttl_seconds: Optional[int] = None, object_pairs_hook=None) -> Optional[dict]:
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f, object_pairs_hook=object_pairs_hook)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[TranscriptCache] Discarding unreadable entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        if ttl_seconds and time.time() - entry.get('fetched_at', 0) > ttl_seconds:
+            self._remove(path)
+            return None
+
+        # Touch the file so eviction sees it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get(self, video_id: str, language_code: str, is_generated: bool,
+            translated_from: Optional[str] = None) -> Optional[SegmentArray]:
+        """
+        Return the cached transcript for an exact track, or None on a miss.
+        """
+        key = self.make_key(video_id, language_code, is_generated, translated_from)
+        segments = SegmentArray()
+        entry = self._load(self._entry_path(video_id, key), object_pairs_hook=segments.json_hook())
+        if entry is None:
+            return None
+        segments.video_id = entry['video_id']
+        segments.language = entry['language']
+        segments.language_code = entry['language_code']
+        segments.is_generated = entry['is_generated']
+        return segments
+
+    def find(self, video_id: str, language_codes: Iterable[str],
+             translated_from: Optional[str] = None) -> Optional[SegmentArray]:
+        """
+        Return the first cached track matching the language preference order,
+        preferring manually created over auto-generated tracks (the same order
+        as TranscriptList.find_transcript). Returns None on a miss.
+        """
+        for language_code in language_codes:
+            for is_generated in (False, True):
+                transcript = self.get(video_id, language_code, is_generated, translated_from)
+                if transcript is not None:
+                    return transcript
+        return None
+
+    def get_tracks(self, video_id: str) -> Optional[dict]:
+        """
+        Return {"status": ..., "tracks": [...]} for a video if known and fresh.
+        Status is "ok" or a negative outcome such as "disabled".
+        """
+        path = os.path.join(self.cache_dir, video_id, "tracks.json")
+        entry = self._load(path, ttl_seconds=0)
+        if entry is None:
+            return None
+        ttl = self.tracks_ttl_seconds if entry.get('status') == 'ok' else self.negative_ttl_seconds
+        if ttl and time.time() - entry.get('fetched_at', 0) > ttl:
+            self._remove(path)
+            return None
+        return entry
+
+    def put_tracks(self, video_id: str, status: str, tracks: Optional[List[dict]] = None):
+        """Store the tracks a video offers (status "ok") or why it has none."""
+        path = os.path.join(self.cache_dir, video_id, "tracks.json")
+        old_size = self._size(path)
+        if self._write(path, {'video_id': video_id, 'status': status, 'tracks': tracks or [],
+                              'fetched_at': time.time()}):
+            self._account(self._size(path) - old_size)
+
+    def _write(self, path: str, entry: dict, segments: Optional[Iterator[dict]] = None) -> bool:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                if segments is None:
+                    json.dump(entry, f, ensure_ascii=False)
+                else:
+                    # Same JSON as with a 'segments' list, written one segment at a time
+                    f.write(json.dumps(entry, ensure_ascii=False)[:-1] + ', "segments": [')
+                    for i, segment in enumerate(segments):
+                        f.write(', ' if i else '')
+                        f.write(json.dumps(segment, ensure_ascii=False))
+                    f.write(']}')
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[TranscriptCache] Could not write cache entry: {e}")
+            return False
+        return True
+
+    def put(self, transcript: SegmentArray, translated_from: Optional[str] = None):
+        """
+        Store a fetched transcript's raw segments.
+        """
+        key = self.make_key(transcript.video_id, transcript.language_code,
+                            transcript.is_generated, translated_from)
+        entry = {
+            'video_id': transcript.video_id,
+            'language': transcript.language,
+            'language_code': transcript.language_code,
+            'is_generated': transcript.is_generated,
+            'translated_from': translated_from,
+            'fetched_at': time.time(),
+        }
+        path = self._entry_path(transcript.video_id, key)
+        old_size = self._size(path)
+        if self._write(path, entry, transcript.iter_raw_data()):
+            self._account(self._size(path) - old_size)
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _account(self, added_bytes: int):
+        """Add a write to the running size, and evict once it passes max_bytes."""
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._total_bytes is None or time.monotonic() - self._scanned_at > _RESCAN_SECONDS:
+                self._evict()
+                return
+            self._total_bytes += added_bytes
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Recount the cache and, if it is over max_bytes, delete least recently
+        used entries until it fits in _EVICT_TARGET of it. Called with the lock held.
+        """
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes * _EVICT_TARGET:
+                    break
+                self._remove(path)
+                total -= size
+        self._total_bytes = total
+        self._scanned_at = time.monotonic()
+
+
+_cache: Optional[TranscriptCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_transcript_cache() -> TranscriptCache:
+    """
+    Return the shared cache configured from TRANSCRIPT_CACHE_DIR,
+    TRANSCRIPT_CACHE_TTL, TRANSCRIPT_TRACKS_TTL, TRANSCRIPT_NEGATIVE_TTL
+    (seconds) and TRANSCRIPT_CACHE_MAX_MB.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranscriptCache(
+                cache_dir=get_setting("TRANSCRIPT_CACHE_DIR", DEFAULT_CACHE_DIR),
+                ttl_seconds=get_setting("TRANSCRIPT_CACHE_TTL", 30 * 24 * 3600),
+                max_bytes=get_setting("TRANSCRIPT_CACHE_MAX_MB", 500) * 1024 * 1024,
+                tracks_ttl_seconds=get_setting("TRANSCRIPT_TRACKS_TTL", 7 * 24 * 3600),
+                negative_ttl_seconds=get_setting("TRANSCRIPT_NEGATIVE_TTL", 24 * 3600),
+            )
+        return _cache
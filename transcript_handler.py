@@ -1,76 +1,331 @@
 import os
 import datetime
-from typing import Optional, Tuple
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
+import threading
+from typing import Iterator, Optional, Tuple
+import requests
+from youtube_transcript_api import (YouTubeTranscriptApi, TranscriptsDisabled, VideoUnavailable, VideoUnplayable,
+                                    InvalidVideoId)
 from youtube_utils import get_video_title
+from transcript_cache import get_transcript_cache
+from transcript_segments import SegmentArray
+from token_utils import estimate_tokens
+from caption_cleanup import dedupe_segments
+from tracing import span, response_bytes_hook
+from deadline import DeadlineExceeded, check_deadline, stage_timeout
+from transcript_resolver import (NEGATIVE_OUTCOMES, DEFAULT_TRANSLATE_TO, choose_track, find_listed,
+                                 language_preferences, tracks_from_json, tracks_from_list, tracks_to_json)
+from config.config_manager import get_output_dir, get_setting
+from artifact_store import store_artifact
 
+# Rendering modes for the transcript sent to the LLM
+RENDER_MODES = ('full', 'paragraph', 'sentence', 'plain')
+_SENTENCE_ENDINGS = ('.', '?', '!', '。', '？', '！', '…')
 
-def get_transcript(video_id: str) -> Tuple[Optional[str], Optional[str]]:
+
+class _TranscriptSession(requests.Session):
+    """Session whose requests time out per the "transcript" stage and the active deadline."""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', stage_timeout("transcript"))
+        try:
+            return super().request(method, url, **kwargs)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            check_deadline("transcript")
+            raise
+
+
+# One keep-alive session per worker thread, shared by that thread's API instances
+_sessions = threading.local()
+
+
+def new_transcript_api() -> YouTubeTranscriptApi:
     """
-    Fetch the transcript for a YouTube video.
-    Tries English first, then Chinese if English is unavailable.
-    Saves the formatted transcript to a file.
-    Returns (formatted_transcript, video_title) or (None, None) on failure.
+    Create a YouTubeTranscriptApi whose traffic is counted by the active
+    trace and bounded by its deadline. The API is not thread-safe, so each
+    call gets its own instance, but all instances in a thread share one
+    session, so long runs do not leave a connection pool behind per fetch.
     """
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        session = _TranscriptSession()
+        session.hooks['response'].append(response_bytes_hook)
+        _sessions.session = session
+    return YouTubeTranscriptApi(http_client=session)
+
+
+def fetch_transcript(video_id: str, use_cache: bool = True, checkpoint: bool = False) -> Optional[SegmentArray]:
+    """
+    Fetch the raw transcript for a YouTube video without formatting or saving it.
+    The track is chosen from a single track listing by the preference order
+    in transcript_resolver (English first, then Chinese, then English
+    translated to Chinese by default).
+    Returns the fetched transcript as a compact SegmentArray, or None if the
+    video has no usable transcript.
+    Network errors are raised to the caller.
+
+    Args:
+        video_id: YouTube video ID
+        use_cache: Serve from and store into the on-disk transcript cache,
+            including the video's track list and "no transcript" outcomes
+        checkpoint: Store into the cache even when use_cache is False, so a
+            resumed batch run can read the transcript back
+    """
+    cache = get_transcript_cache() if use_cache or checkpoint else None
+    if cache and use_cache:
+        with span("transcript.cache"):
+            known = cache.get_tracks(video_id)
+            if (known and known['status'] == 'no_transcript'
+                    and choose_track(tracks_from_json(known['tracks'])) is not None):
+                # The language preferences changed since; list the tracks again
+                known = None
+            if known and known['status'] != 'ok':
+                print(f"[TranscriptHandler] {NEGATIVE_OUTCOMES.get(known['status'], known['status'])} (cached)")
+                return None
+            if known:
+                choice = choose_track(tracks_from_json(known['tracks']))
+                if choice is None:
+                    print(f"[TranscriptHandler] {NEGATIVE_OUTCOMES['no_transcript']} (cached)")
+                    return None
+                cached = cache.get(video_id, choice.language_code, choice.track.is_generated,
+                                   choice.translated_from)
+            else:
+                # Entries cached before track lists were recorded
+                languages = language_preferences()
+                cached = (cache.find(video_id, languages)
+                          or cache.find(video_id, [get_setting("TRANSCRIPT_TRANSLATE_TO", DEFAULT_TRANSLATE_TO)],
+                                        translated_from=languages[0] if languages else None))
+        if cached:
+            print(f"[TranscriptHandler] Using cached {cached.language_code} transcript")
+            return cached
+
+    ytt_api = new_transcript_api()
     try:
-        ytt_api = YouTubeTranscriptApi()
-        try:
-            # Try to get English transcript (including auto-generated)
+        with span("transcript.list"):
             transcript_list = ytt_api.list(video_id)
-            transcript_obj = transcript_list.find_transcript(['en'])
-            transcript = transcript_obj.fetch()
-        except Exception as e:
-            if 'Could not retrieve a transcript' in str(e) or 'No transcripts were found' in str(e):
-                print("[TranscriptHandler] English transcript not available, trying Chinese...")
-                try:
-                    transcript_obj = transcript_list.find_transcript(['zh', 'zh-CN', 'zh-TW', 'zh-Hant', 'zh-Hans'])
-                    transcript = transcript_obj.fetch()
-                except:
-                    # If Chinese not available, try translation from English
-                    print("[TranscriptHandler] Chinese transcript not available, trying to translate English to Chinese...")
-                    english_transcript = transcript_list.find_transcript(['en'])
-                    translated_transcript = english_transcript.translate('zh-Hant')
-                    transcript = translated_transcript.fetch()
-            else:
-                raise e
-        except TranscriptsDisabled:
-            print("[TranscriptHandler] Subtitles are disabled for this video.")
-            return None, None
-        except NoTranscriptFound:
-            print("[TranscriptHandler] No transcript found for this video.")
-            return None, None
-        except Exception as e:
-            print(f"[TranscriptHandler] Unexpected error in transcript fetching logic: {e}")
-            raise e
+    except TranscriptsDisabled:
+        return _no_transcript(cache, video_id, 'disabled')
+    except (VideoUnavailable, VideoUnplayable, InvalidVideoId) as e:
+        print(f"[TranscriptHandler] {type(e).__name__}")
+        return _no_transcript(cache, video_id, 'unavailable')
+
+    tracks = tracks_from_list(transcript_list)
+    choice = choose_track(tracks)
+    if choice is None:
+        print(f"[TranscriptHandler] Available tracks: {', '.join(t.language_code for t in tracks) or 'none'}")
+        return _no_transcript(cache, video_id, 'no_transcript', tracks)
+    if cache:
+        cache.put_tracks(video_id, 'ok', tracks_to_json(tracks))
+
+    print(f"[TranscriptHandler] Using {choice.describe()} transcript")
+    transcript = find_listed(transcript_list, choice.track)
+    if choice.translate_to:
+        transcript = transcript.translate(choice.translate_to)
+    with span("transcript.fetch"):
+        fetched = SegmentArray.from_transcript(transcript.fetch())
+    if cache:
+        with span("transcript.cache"):
+            cache.put(fetched, translated_from=choice.translated_from)
+    return fetched
+
+
+def _no_transcript(cache, video_id: str, status: str, tracks=None) -> None:
+    """
+    Report a video without a usable transcript and remember it for
+    TRANSCRIPT_NEGATIVE_TTL, with the tracks it does offer if listed.
+    """
+    print(f"[TranscriptHandler] {NEGATIVE_OUTCOMES[status]}")
+    if cache:
+        cache.put_tracks(video_id, status, tracks_to_json(tracks) if tracks else None)
+    return None
+
+
+def iter_timestamped_lines(transcript) -> Iterator[str]:
+    """
+    Yield one '[mm:ss] text' line per transcript entry.
+    """
+    for entry in transcript:
+        minutes = int(entry.start // 60)
+        seconds = int(entry.start % 60)
+        yield f"[{minutes:02d}:{seconds:02d}] {entry.text}\n"
+
+
+def iter_formatted_lines(transcript, video_title: str) -> Iterator[str]:
+    """
+    Yield the lines of format_transcript one at a time.
+    """
+    yield f"# {video_title}\n\n"
+    yield from iter_timestamped_lines(transcript)
+
+
+@span("transcript.format")
+def format_transcript(transcript, video_title: str) -> str:
+    """
+    Render transcript entries as a titled list of '[mm:ss] text' lines.
+    """
+    return ''.join(iter_formatted_lines(transcript, video_title))
 
-        video_title = get_video_title(video_id)
-        current_date = datetime.datetime.now().strftime('%Y-%m-%d')
-        transcript_filename = f"{video_title}_{current_date}_transcript.txt"
 
-        formatted_lines = [f"# {video_title}\n\n"]
-        for entry in transcript:
-            minutes = int(entry.start // 60)
-            seconds = int(entry.start % 60)
-            timestamp = f"[{minutes:02d}:{seconds:02d}] "
-            formatted_lines.append(f"{timestamp}{entry.text}\n")
+def _format_timestamp(start: float) -> str:
+    minutes = int(start // 60)
+    seconds = int(start % 60)
+    return f"[{minutes:02d}:{seconds:02d}]"
 
-        formatted_transcript = ''.join(formatted_lines)
 
-        transcript_dir = os.path.join(os.path.dirname(__file__), "transcript")
-        if not os.path.exists(transcript_dir):
-            os.makedirs(transcript_dir)
+def iter_rendered_lines(transcript, video_title: str, mode: str = 'full', interval: int = 60) -> Iterator[str]:
+    """
+    Yield the lines of render_transcript one at a time.
+    """
+    if mode == 'full':
+        yield from iter_formatted_lines(transcript, video_title)
+        return
+
+    yield f"# {video_title}\n\n"
+    block_start = None
+    block_texts = []
+
+    def block_line() -> str:
+        text = ' '.join(block_texts)
+        block_texts.clear()
+        prefix = '' if mode == 'plain' else f"{_format_timestamp(block_start)} "
+        return f"{prefix}{text}\n"
+
+    for entry in transcript:
+        text = ' '.join(entry.text.split())
+        if not text:
+            continue
+        if block_texts and entry.start - block_start >= interval:
+            yield block_line()
+        if not block_texts:
+            block_start = entry.start
+        block_texts.append(text)
+        if mode == 'sentence' and text.endswith(_SENTENCE_ENDINGS):
+            yield block_line()
+    if block_texts:
+        yield block_line()
+
+
+@span("transcript.render")
+def render_transcript(transcript, video_title: str, mode: str = 'full', interval: int = 60) -> str:
+    """
+    Render transcript entries in a selectable, more compact form.
+
+    Args:
+        transcript: Iterable of entries with .start and .text
+        video_title: Title for the header line
+        mode: 'full' - one '[mm:ss] text' line per entry (same as format_transcript)
+              'paragraph' - entries merged into paragraphs, one timestamp every `interval` seconds
+              'sentence' - one timestamped line per sentence (at most `interval` seconds long)
+              'plain' - paragraphs without timestamps
+        interval: Paragraph length in seconds
+
+    Returns:
+        Rendered transcript string
+    """
+    if mode == 'full':
+        return format_transcript(transcript, video_title)
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode: {mode}")
+    return ''.join(iter_rendered_lines(transcript, video_title, mode, interval))
+
+
+def text_size(text: str) -> Tuple[int, int]:
+    """Return (characters, estimated tokens) of a rendered transcript."""
+    return len(text), estimate_tokens(text)
+
+
+def report_reduction(full_size: Tuple[int, int], compact_transcript: str, mode: str):
+    """
+    Print the character and estimated token savings of a compact rendering.
+    full_size is text_size() of the full rendering, so the full text itself
+    can be released before the compact one is built.
+    """
+    full_chars, full_tokens = full_size
+    compact_chars, compact_tokens = text_size(compact_transcript)
+    saved = 100 * (1 - compact_tokens / full_tokens) if full_tokens else 0.0
+    print(f"[TranscriptHandler] {mode} rendering: {full_chars:,} -> {compact_chars:,} chars, "
+          f"~{full_tokens:,} -> ~{compact_tokens:,} tokens ({saved:.0f}% fewer)")
+
+
+@span("transcript.dedupe")
+def clean_transcript(transcript) -> SegmentArray:
+    """
+    Remove rolling auto-caption overlap and repeated lines before formatting.
+    Manual tracks are returned unchanged.
+    """
+    if not getattr(transcript, 'is_generated', False):
+        print("[TranscriptHandler] Caption cleanup: manual track, left unchanged")
+        return transcript
+    cleaned = dedupe_segments(transcript)
+    removed_words = sum(len(e.text.split()) for e in transcript) - sum(len(e.text.split()) for e in cleaned)
+    print(f"[TranscriptHandler] Caption cleanup: {len(transcript)} -> {len(cleaned)} entries, "
+          f"{removed_words} repeated words removed")
+    return cleaned
+
+
+@span("transcript.save")
+def save_transcript(formatted_transcript: str, video_title: str, video_id: Optional[str] = None) -> str:
+    """
+    Save a formatted transcript under transcript/ and return the file path.
+    With a video_id it is also recorded in the artifact store.
+    """
+    current_date = datetime.datetime.now().strftime('%Y-%m-%d')
+    transcript_filename = f"{video_title}_{current_date}_transcript.txt"
+
+    transcript_dir = os.path.join(get_output_dir(), "transcript")
+    if not os.path.exists(transcript_dir):
+        os.makedirs(transcript_dir)
+
+    transcript_path = os.path.join(transcript_dir, transcript_filename)
+    with open(transcript_path, 'w', encoding='utf-8') as f:
+        f.write(formatted_transcript)
+    store_artifact(video_id, 'transcript', formatted_transcript, video_title)
+
+    print(f"[TranscriptHandler] Transcript saved to {transcript_path}")
+    return transcript_path
+
+
+def get_transcript(video_id: str, video_title: Optional[str] = None,
+                   use_cache: bool = True, render_mode: str = 'full',
+                   render_interval: int = 60, dedupe: bool = True) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Fetch the transcript for a YouTube video.
+    Picks the track as fetch_transcript does (English first, then Chinese).
+    Saves the full formatted transcript to a file.
+    Returns (transcript, video_title) or (None, None) on failure, where the
+    transcript is rendered with render_mode (see render_transcript).
+    DeadlineExceeded is raised to the caller.
+
+    Args:
+        video_id: YouTube video ID
+        video_title: Title already known by the caller; looked up if None
+        use_cache: Serve from and store into the on-disk transcript cache
+        render_mode: Rendering of the returned transcript
+        render_interval: Paragraph length in seconds for compact renderings
+        dedupe: Remove rolling auto-caption overlap before formatting
+    """
+    try:
+        transcript = fetch_transcript(video_id, use_cache=use_cache)
+        if transcript is None:
+            return None, None
+        if dedupe:
+            transcript = clean_transcript(transcript)
 
-        transcript_path = os.path.join(transcript_dir, transcript_filename)
-        with open(transcript_path, 'w', encoding='utf-8') as f:
-            f.write(formatted_transcript)
+        if video_title is None:
+            video_title = get_video_title(video_id)
+        formatted_transcript = format_transcript(transcript, video_title)
+        save_transcript(formatted_transcript, video_title, video_id)
+        if render_mode == 'full':
+            return formatted_transcript, video_title
 
-        print(f"[TranscriptHandler] Transcript saved to {transcript_path}")
-        return formatted_transcript, video_title
+        # Only one full-length rendering is held at a time
+        full_size = text_size(formatted_transcript)
+        del formatted_transcript
+        compact_transcript = render_transcript(transcript, video_title, render_mode, render_interval)
+        report_reduction(full_size, compact_transcript, render_mode)
+        return compact_transcript, video_title
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"[TranscriptHandler] Error fetching transcript: {e}")
-        if 'Subtitles are disabled for this video' in str(e):
-            print("[TranscriptHandler] Please ensure the video has subtitles enabled.")
-        elif 'Could not retrieve a transcript' in str(e):
-            print("[TranscriptHandler] No transcript available in English or Chinese.")
         return None, None
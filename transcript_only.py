@@ -6,19 +6,20 @@ from transcript_handler import get_transcript
 from youtube_utils import extract_video_id
 
 
-def get_youtube_transcript(url: str) -> tuple[str, str] | tuple[None, None]:
+def get_youtube_transcript(url: str, use_cache: bool = True) -> tuple[str, str] | tuple[None, None]:
     """
     Get YouTube transcript from URL.
     
     Args:
         url: YouTube URL
+        use_cache: Serve from and store into the on-disk transcript cache
         
     Returns:
         Tuple of (transcript_text, video_title) or (None, None) on failure
     """
     try:
         video_id = extract_video_id(url)
-        transcript, title = get_transcript(video_id)
+        transcript, title = get_transcript(video_id, use_cache=use_cache)
         return transcript, title
     except Exception as e:
         print(f"Error getting transcript: {e}")
@@ -0,0 +1,122 @@
+"""
+Choice of caption track from a video's track list.
+
+One list() call returns every track a video has. The best one is picked
+locally from a configurable preference order instead of probing language
+by language, and the list itself is cached, together with negative
+outcomes (captions disabled, no wanted language, video unavailable), so
+known-bad videos fail without any request until the outcome expires.
+
+Preference order, from the settings:
+  TRANSCRIPT_LANGUAGES       native languages in order (default: en, then Chinese variants)
+  TRANSCRIPT_PREFER_MANUAL   a manual track in any listed language beats a generated one
+                             (default: off, language order comes first)
+  TRANSCRIPT_TRANSLATE_TO    translation target when no native track exists (default: zh-Hant,
+                             empty to disable), translated from the first translatable track,
+                             manual before generated
+"""
+
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Sequence
+
+from config.config_manager import get_setting
+
+
+DEFAULT_LANGUAGES = "en,zh,zh-CN,zh-TW,zh-Hant,zh-Hans"
+DEFAULT_TRANSLATE_TO = "zh-Hant"
+
+# Outcomes cached as "this video has no usable transcript"
+NEGATIVE_OUTCOMES = {
+    "disabled": "Subtitles are disabled for this video.",
+    "no_transcript": "No transcript available in the configured languages.",
+    "unavailable": "The video is unavailable.",
+}
+
+
+@dataclass(frozen=True)
+class Track:
+    """A caption track as listed for a video."""
+    language_code: str
+    language: str
+    is_generated: bool
+    is_translatable: bool = False
+
+
+@dataclass(frozen=True)
+class Choice:
+    """The track to fetch, and the target language if it is to be translated."""
+    track: Track
+    translate_to: Optional[str] = None
+
+    @property
+    def language_code(self) -> str:
+        return self.translate_to or self.track.language_code
+
+    @property
+    def translated_from(self) -> Optional[str]:
+        return self.track.language_code if self.translate_to else None
+
+    def describe(self) -> str:
+        kind = "generated" if self.track.is_generated else "manual"
+        if self.translate_to:
+            return f"{self.track.language_code} ({kind}) translated to {self.translate_to}"
+        return f"{self.track.language_code} ({kind})"
+
+
+def tracks_from_list(transcript_list) -> List[Track]:
+    """Read the tracks of a youtube_transcript_api TranscriptList."""
+    return [Track(t.language_code, t.language, t.is_generated, bool(getattr(t, "is_translatable", False)))
+            for t in transcript_list]
+
+
+def tracks_to_json(tracks: Sequence[Track]) -> List[dict]:
+    return [asdict(track) for track in tracks]
+
+
+def tracks_from_json(entries: Sequence[dict]) -> List[Track]:
+    return [Track(**entry) for entry in entries]
+
+
+def language_preferences() -> List[str]:
+    return [code.strip() for code in get_setting("TRANSCRIPT_LANGUAGES", DEFAULT_LANGUAGES).split(",")
+            if code.strip()]
+
+
+def choose_track(tracks: Sequence[Track], languages: Optional[Sequence[str]] = None,
+                 translate_to: Optional[str] = None, prefer_manual: Optional[bool] = None) -> Optional[Choice]:
+    """
+    Pick the best track: native tracks in language order (manual before
+    generated within a language, or across all languages with
+    prefer_manual), then a translation of the first translatable track in
+    any other language, manual before generated. Returns None if nothing
+    matches.
+    """
+    languages = language_preferences() if languages is None else list(languages)
+    if translate_to is None:
+        translate_to = get_setting("TRANSCRIPT_TRANSLATE_TO", DEFAULT_TRANSLATE_TO)
+    if prefer_manual is None:
+        prefer_manual = get_setting("TRANSCRIPT_PREFER_MANUAL", False)
+
+    by_key = {(t.language_code, t.is_generated): t for t in tracks}
+    if prefer_manual:
+        order = [(code, False) for code in languages] + [(code, True) for code in languages]
+    else:
+        order = [(code, generated) for code in languages for generated in (False, True)]
+    for key in order:
+        if key in by_key:
+            return Choice(by_key[key])
+
+    if translate_to:
+        # Every track in a wanted language was returned above, so translate from another one
+        for track in sorted(tracks, key=lambda t: t.is_generated):
+            if track.is_translatable and track.language_code != translate_to:
+                return Choice(track, translate_to)
+    return None
+
+
+def find_listed(transcript_list, track: Track):
+    """Return the TranscriptList entry for a chosen track."""
+    for transcript in transcript_list:
+        if transcript.language_code == track.language_code and transcript.is_generated == track.is_generated:
+            return transcript
+    raise LookupError(f"Track {track.language_code} is no longer listed")
@@ -0,0 +1,119 @@
+"""
+Compact in-memory transcript representation.
+
+A FetchedTranscript holds one dataclass instance per caption entry, each
+with its own attribute dict and boxed floats. SegmentArray keeps start
+times and durations in two array('d') columns and the texts in one list,
+sharing a single string object between identical lines ("[Music]",
+repeated captions), so a 10-hour stream costs little more than its text.
+Iterating yields one Segment record at a time, so code written against
+snippets (.text, .start, .duration) works unchanged.
+"""
+
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+
+class Segment:
+    """One caption entry, as yielded by SegmentArray."""
+
+    __slots__ = ('text', 'start', 'duration')
+
+    def __init__(self, text: str, start: float, duration: float):
+        self.text = text
+        self.start = start
+        self.duration = duration
+
+    def __repr__(self) -> str:
+        return f"Segment(text={self.text!r}, start={self.start}, duration={self.duration})"
+
+
+class SegmentArray:
+    """
+    Caption entries of one track in parallel columns, with the track's
+    metadata (the same attributes as FetchedTranscript).
+
+    Args:
+        video_id: YouTube video ID
+        language: Language name as listed by YouTube
+        language_code: Language code of the track
+        is_generated: Whether the track is auto-generated
+    """
+
+    def __init__(self, video_id: str = '', language: str = '', language_code: str = '',
+                 is_generated: bool = False):
+        self.video_id = video_id
+        self.language = language
+        self.language_code = language_code
+        self.is_generated = is_generated
+        self.starts = array('d')
+        self.durations = array('d')
+        self.texts: List[str] = []
+
+    @classmethod
+    def from_transcript(cls, transcript) -> "SegmentArray":
+        """Copy a FetchedTranscript (or another SegmentArray) into a new array."""
+        segments = cls.like(transcript)
+        segments.extend((s.text, s.start, s.duration) for s in transcript)
+        return segments
+
+    @classmethod
+    def from_raw_data(cls, entries: Iterable[Dict], video_id: str = '', language: str = '',
+                      language_code: str = '', is_generated: bool = False) -> "SegmentArray":
+        """Build an array from {'text', 'start', 'duration'} dicts (FetchedTranscript.to_raw_data)."""
+        segments = cls(video_id, language, language_code, is_generated)
+        segments.extend((e['text'], e['start'], e['duration']) for e in entries)
+        return segments
+
+    @classmethod
+    def like(cls, transcript) -> "SegmentArray":
+        """Return an empty array with the same track metadata as `transcript` (if it has any)."""
+        return cls(getattr(transcript, 'video_id', ''), getattr(transcript, 'language', ''),
+                   getattr(transcript, 'language_code', ''), getattr(transcript, 'is_generated', False))
+
+    def extend(self, entries: Iterable[Tuple[str, float, float]]):
+        """Append (text, start, duration) entries, sharing one string per distinct text."""
+        shared: Dict[str, str] = {}
+        for text, start, duration in entries:
+            self.texts.append(shared.setdefault(text, text))
+            self.starts.append(start)
+            self.durations.append(duration)
+
+    def json_hook(self) -> Callable[[List[Tuple[str, Any]]], Any]:
+        """
+        Return a json object_pairs_hook that appends each {'text', 'start',
+        'duration'} object to this array and leaves None in its place, so
+        stored segments are parsed without building a dict per segment.
+        Segments are matched on the key order to_raw_data writes; other
+        objects are returned as dicts.
+        """
+        shared: Dict[str, str] = {}
+
+        def hook(pairs):
+            if len(pairs) == 3:
+                (k1, text), (k2, start), (k3, duration) = pairs
+                if k1 == 'text' and k2 == 'start' and k3 == 'duration':
+                    self.texts.append(shared.setdefault(text, text))
+                    self.starts.append(start)
+                    self.durations.append(duration)
+                    return None
+            return dict(pairs)
+        return hook
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __iter__(self) -> Iterator[Segment]:
+        for text, start, duration in zip(self.texts, self.starts, self.durations):
+            yield Segment(text, start, duration)
+
+    def __getitem__(self, index: int) -> Segment:
+        return Segment(self.texts[index], self.starts[index], self.durations[index])
+
+    def iter_raw_data(self) -> Iterator[Dict]:
+        """Yield each entry as a {'text', 'start', 'duration'} dict."""
+        for text, start, duration in zip(self.texts, self.starts, self.durations):
+            yield {'text': text, 'start': start, 'duration': duration}
+
+    def to_raw_data(self) -> List[Dict]:
+        return list(self.iter_raw_data())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Persistent token and cost ledger for LLM calls.
+
+Every API call made by get_summary (cache hits excluded) is recorded as one
+row in a SQLite database with provider, model, token counts, latency and
+the video it was made for.
+
+Usage:
+  python usage_ledger.py summary --by model
+  python usage_ledger.py summary --by day --since 2026-01-01
+  python usage_ledger.py summary --by channel
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from config.config_manager import get_setting
+
+
+DEFAULT_LEDGER_PATH = os.path.join(os.path.dirname(__file__), "data", "usage_ledger.db")
+PRICING_PATH = os.path.join(os.path.dirname(__file__), "config", "pricing.json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    video_id TEXT,
+    channel TEXT,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    cached_tokens INTEGER,
+    latency_seconds REAL,
+    tokens_per_second REAL,
+    cost REAL
+);
+CREATE INDEX IF NOT EXISTS idx_calls_day ON calls (day);
+CREATE INDEX IF NOT EXISTS idx_calls_model ON calls (model);
+CREATE INDEX IF NOT EXISTS idx_calls_channel ON calls (channel);
+"""
+
+# Prices parsed from PRICING_PATH, reloaded only when the file's mtime changes
+_pricing = {"mtime": None, "prices": {}}
+_pricing_lock = threading.Lock()
+
+_GROUP_COLUMNS = {"day": "day", "model": "provider || '/' || model", "channel": "COALESCE(channel, '(unknown)')"}
+
+
+def get_ledger_path() -> str:
+    return get_setting("USAGE_LEDGER_PATH", DEFAULT_LEDGER_PATH)
+
+
+def _connect(path: Optional[str] = None) -> sqlite3.Connection:
+    path = path or get_ledger_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _load_pricing() -> Dict:
+    """
+    Load optional per-model prices from config/pricing.json:
+    {"gpt-5.1": {"input": 1.25, "cached_input": 0.125, "output": 10.0}, ...}
+    Prices are USD per million tokens. The file is parsed again only
+    when its modification time changes.
+    """
+    try:
+        mtime = os.stat(PRICING_PATH).st_mtime
+    except FileNotFoundError:
+        return {}
+    except OSError as e:
+        print(f"[UsageLedger] Could not read pricing file: {e}")
+        return {}
+    with _pricing_lock:
+        if _pricing["mtime"] != mtime:
+            try:
+                with open(PRICING_PATH, "r", encoding="utf-8") as f:
+                    prices = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[UsageLedger] Could not read pricing file: {e}")
+                prices = {}
+            _pricing.update(mtime=mtime, prices=prices)
+        return _pricing["prices"]
+
+
+def extract_usage(usage: Optional[Dict]) -> Dict[str, Optional[int]]:
+    """
+    Normalize an OpenAI-compatible usage block into prompt/completion/cached token counts.
+    """
+    usage = usage or {}
+    details = usage.get("prompt_tokens_details") or {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+        "cached_tokens": details.get("cached_tokens", 0) if usage else None,
+    }
+
+
+def estimate_cost(model: str, usage: Optional[Dict]) -> Optional[float]:
+    """
+    Return the provider-reported cost (OpenRouter), or one computed from
+    config/pricing.json, or None if neither is available.
+    """
+    if usage and isinstance(usage.get("cost"), (int, float)):
+        return float(usage["cost"])
+    prices = _load_pricing().get(model)
+    counts = extract_usage(usage)
+    if not prices or counts["prompt_tokens"] is None:
+        return None
+    cached = counts["cached_tokens"] or 0
+    uncached = counts["prompt_tokens"] - cached
+    completion = counts["completion_tokens"] or 0
+    cost = (uncached * prices.get("input", 0)
+            + cached * prices.get("cached_input", prices.get("input", 0))
+            + completion * prices.get("output", 0))
+    return cost / 1_000_000
+
+
+def record_call(provider: str, model: str, usage: Optional[Dict], latency_seconds: float,
+                video_id: Optional[str] = None, channel: Optional[str] = None) -> None:
+    """
+    Append one row for a completed API call. Errors are printed, never raised.
+    """
+    counts = extract_usage(usage)
+    completion = counts["completion_tokens"]
+    tokens_per_second = completion / latency_seconds if completion and latency_seconds > 0 else None
+    now = time.time()
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO calls (created_at, day, video_id, channel, provider, model, prompt_tokens, "
+                    "completion_tokens, cached_tokens, latency_seconds, tokens_per_second, cost) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (now, datetime.date.fromtimestamp(now).isoformat(), video_id, channel, provider, model,
+                     counts["prompt_tokens"], completion, counts["cached_tokens"], latency_seconds,
+                     tokens_per_second, estimate_cost(model, usage)),
+                )
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError) as e:
+        print(f"[UsageLedger] Could not record call: {e}")
+
+
+def print_summary(group_by: str = "model", since: Optional[str] = None, path: Optional[str] = None):
+    """
+    Print calls, tokens, latency, throughput and cost aggregated by day, model or channel.
+    """
+    column = _GROUP_COLUMNS[group_by]
+    query = (
+        f"SELECT {column} AS grp, COUNT(*), SUM(prompt_tokens), SUM(cached_tokens), SUM(completion_tokens), "
+        "AVG(latency_seconds), SUM(completion_tokens) / NULLIF(SUM(latency_seconds), 0), SUM(cost), "
+        "SUM(CASE WHEN cost IS NOT NULL THEN completion_tokens END) / NULLIF(SUM(cost), 0) "
+        "FROM calls"
+    )
+    params = []
+    if since:
+        query += " WHERE day >= ?"
+        params.append(since)
+    query += " GROUP BY grp ORDER BY grp"
+
+    conn = _connect(path)
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        print("No calls recorded.")
+        return
+
+    width = max(len(group_by), max(len(str(row[0])) for row in rows))
+    print(f"{group_by:<{width}}  {'calls':>6}  {'prompt':>10}  {'cached':>10}  {'output':>9}  "
+          f"{'avg lat':>8}  {'tok/s':>7}  {'cost $':>9}  {'out tok/$':>10}")
+    for grp, calls, prompt, cached, completion, latency, tps, cost, per_dollar in rows:
+        per_dollar = f"{per_dollar:>10,.0f}" if per_dollar else f"{'-':>10}"
+        print(f"{str(grp):<{width}}  {calls:>6}  {prompt or 0:>10,}  {cached or 0:>10,}  {completion or 0:>9,}  "
+              f"{latency or 0:>7.1f}s  {tps or 0:>7.1f}  "
+              f"{(f'{cost:.4f}' if cost is not None else '-'):>9}  {per_dollar}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the LLM token and cost ledger")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    summary_parser = subparsers.add_parser("summary", help="Aggregate recorded calls")
+    summary_parser.add_argument("--by", choices=sorted(_GROUP_COLUMNS), default="model",
+                                help="Grouping (default: model)")
+    summary_parser.add_argument("--since", metavar="YYYY-MM-DD", help="Only include calls from this day on")
+    summary_parser.add_argument("--ledger", help=f"Ledger database (default: {DEFAULT_LEDGER_PATH})")
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        print_summary(args.by, args.since, args.ledger)
+
+
+if __name__ == "__main__":
+    main()
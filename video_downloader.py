@@ -1,84 +1,122 @@
 import os
 import argparse
+import copy
 import datetime
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
 import yt_dlp
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_utils import extract_video_id, get_video_title
+from youtube_utils import extract_video_id, get_video_title, read_urls
+from transcript_cache import get_transcript_cache
+from transcript_handler import new_transcript_api, iter_timestamped_lines
+from transcript_segments import SegmentArray
+from video_metadata import remember_metadata
+from tracing import span
+from video_sources import expand_inputs
 
 
-def download_youtube_video(url: str, save_path: str):
-    """
-    Download YouTube video with fallback format options.
+# Best video (<=1080p) + best audio merged to mp4, then best combined format up to 1080p, then anything
+DEFAULT_FORMAT = "bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/bestvideo[height<=1080]+bestaudio/best[height<=1080]/best"
+ARCHIVE_FILENAME = ".download_archive"
 
-    Args:
-        url: YouTube video URL
-        save_path: Directory to save the downloaded video
 
-    Returns:
-        bool: True if download succeeded, False otherwise
+def build_ydl_options(save_path: str, rate_limit: Optional[float] = None, fragments: int = 1,
+                      quiet: bool = False, archive: bool = False) -> dict:
     """
-    os.makedirs(save_path, exist_ok=True)
+    YoutubeDL options shared by single and batch downloads.
 
-    # More flexible format selection with fallbacks
-    ydl_opts = {
+    Args:
+        save_path: Directory to save downloads
+        rate_limit: Download speed cap in bytes/second for this instance (None: unlimited)
+        fragments: Fragments of a DASH/HLS video downloaded concurrently
+        quiet: Suppress yt-dlp's own progress output (batch mode)
+        archive: Record finished videos in the save path's download archive and
+            skip them before extraction next time (batch mode)
+    """
+    options = {
         "outtmpl": os.path.join(save_path, "%(title)s.%(ext)s"),
-        # Try multiple format options in order of preference:
-        # 1. Best video (<=1080p) + best audio, merged to mp4
-        # 2. Best combined format up to 1080p
-        # 3. Best available format
-        "format": "bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/bestvideo[height<=1080]+bestaudio/best[height<=1080]/best",
+        "format": DEFAULT_FORMAT,
         "merge_output_format": "mp4",
         # Add user agent to avoid some restrictions
         "http_headers": {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
         },
-        # Allow IPv6 to avoid some network restrictions
         "allow_unplayable_formats": False,
-        # Don't fail on unavailable formats
         "ignoreerrors": False,
+        # Keep .part files and continue them after an interruption
+        "continuedl": True,
+        "nopart": False,
+        "ratelimit": rate_limit,
+        "concurrent_fragment_downloads": fragments,
+        "quiet": quiet,
+        "noprogress": quiet,
     }
+    if archive:
+        options["download_archive"] = os.path.join(save_path, ARCHIVE_FILENAME)
+    return options
+
+
+def download_youtube_video(url: str, save_path: str, ydl: Optional[yt_dlp.YoutubeDL] = None) -> bool:
+    """
+    Download YouTube video with fallback format options.
+    The video is extracted once; the download and any format fallback reuse that info.
+
+    Args:
+        url: YouTube video URL
+        save_path: Directory to save the downloaded video
+        ydl: YoutubeDL to reuse (batch workers); a new one is created if None
+
+    Returns:
+        bool: True if download succeeded, False otherwise
+    """
+    os.makedirs(save_path, exist_ok=True)
+    if ydl is None:
+        with yt_dlp.YoutubeDL(build_ydl_options(save_path)) as ydl:
+            return download_youtube_video(url, save_path, ydl)
 
+    info = None
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # First, get video info to check availability
-            info = ydl.extract_info(url, download=False)
-            print(f"\n✓ Found video: {info['title']}")
-            print(
-                f"  Duration: {info.get('duration', 0) // 60}:{info.get('duration', 0) % 60:02d}"
-            )
-            print(f"  Uploader: {info.get('uploader', 'Unknown')}")
-
-            # Now download
-            print(f"\nDownloading to: {save_path}")
-            ydl.download([url])
-            print("\n✓ Download completed!")
+        # Extract without resolving formats, so a format error can fall back on the same info
+        with span("video.extract"):
+            info = ydl.extract_info(url, download=False, process=False)
+        if info is None:
+            print(f"\n✓ Already downloaded: {url}")
             return True
+        remember_metadata(info['id'], info['title'], info.get('uploader'), duration=info.get('duration'))
+        duration = int(info.get('duration') or 0)
+        print(f"\n✓ Found video: {info['title']}")
+        print(f"  Duration: {duration // 60}:{duration % 60:02d}")
+        print(f"  Uploader: {info.get('uploader', 'Unknown')}")
+
+        print(f"\nDownloading to: {save_path}")
+        with span("video.download"):
+            ydl.process_ie_result(copy.deepcopy(info), download=True)
+        print(f"\n✓ Download completed: {info['title']}")
+        return True
 
     except yt_dlp.utils.DownloadError as e:
         error_msg = str(e)
         print(f"\n✗ Download failed: {error_msg}")
 
-        # If format error, try to list available formats
-        if (
+        # If format error, list the formats and retry with a simpler selection, from the same info
+        if info is not None and (
             "Requested format is not available" in error_msg
             or "format" in error_msg.lower()
         ):
-            print("\nAttempting to list available formats...")
+            print("\nAvailable formats:")
             try:
-                list_opts = ydl_opts.copy()
-                list_opts["listformats"] = True
-                with yt_dlp.YoutubeDL(list_opts) as ydl_list:
-                    ydl_list.extract_info(url, download=False)
+                ydl.list_formats(info)
             except Exception as list_error:
                 print(f"Could not list formats: {list_error}")
 
-            # Try a simpler format as last resort
             print("\nAttempting download with simplified format selection...")
+            format_selector = ydl.format_selector
             try:
-                simple_opts = ydl_opts.copy()
-                simple_opts["format"] = "best"
-                with yt_dlp.YoutubeDL(simple_opts) as ydl_simple:
-                    ydl_simple.download([url])
+                ydl.format_selector = ydl.build_format_selector("best")
+                with span("video.download"):
+                    ydl.process_ie_result(copy.deepcopy(info), download=True)
                 print("\n✓ Download completed with simplified format!")
                 return True
             except Exception as simple_error:
@@ -89,10 +127,87 @@ def download_youtube_video(url: str, save_path: str):
                 print("  - Geographic restrictions")
                 print("  - YouTube API changes require yt-dlp update")
                 print("\nTry updating yt-dlp: pip install -U yt-dlp")
+            finally:
+                ydl.format_selector = format_selector
         return False
 
 
-def download_transcript(video_id: str, save_path: str, language: str = "en"):
+def download_batch(urls: List[str], save_path: str, workers: int = 3, rate_limit: Optional[float] = None,
+                   fragments: int = 4, transcript: bool = False, transcript_only: bool = False,
+                   language: str = "en", use_cache: bool = True) -> Dict[str, bool]:
+    """
+    Download many videos concurrently, fetching transcripts alongside the media.
+
+    Each worker thread keeps one YoutubeDL for all its videos. The bandwidth
+    cap is split evenly across the workers, since yt-dlp limits each
+    download separately.
+
+    Args:
+        urls: Video URLs
+        save_path: Directory to save downloads
+        workers: Videos downloaded at the same time
+        rate_limit: Total download speed cap in bytes/second (None: unlimited)
+        fragments: Fragments downloaded concurrently per video
+        transcript: Also download transcripts
+        transcript_only: Download only transcripts
+        language: Transcript language code
+        use_cache: Serve transcripts from and store them into the on-disk cache
+
+    Returns:
+        {url: True if every requested download for it succeeded}
+    """
+    os.makedirs(save_path, exist_ok=True)
+    options = build_ydl_options(save_path, rate_limit / workers if rate_limit else None, fragments, quiet=True,
+                                archive=True)
+    local = threading.local()
+    instances = []
+    instances_lock = threading.Lock()
+
+    def worker_ydl() -> yt_dlp.YoutubeDL:
+        # YoutubeDL is not thread-safe; one instance per worker, reused across its videos
+        if not hasattr(local, "ydl"):
+            local.ydl = yt_dlp.YoutubeDL(options)
+            with instances_lock:
+                instances.append(local.ydl)
+        return local.ydl
+
+    def video_job(url: str) -> bool:
+        return download_youtube_video(url, save_path, worker_ydl())
+
+    results = {url: True for url in urls}
+    futures = {}
+    with ThreadPoolExecutor(workers, thread_name_prefix="download") as download_pool, \
+            ThreadPoolExecutor(workers, thread_name_prefix="transcript") as transcript_pool:
+        for url in urls:
+            if transcript or transcript_only:
+                try:
+                    video_id = extract_video_id(url)
+                except ValueError as e:
+                    print(f"✗ {e}: {url}")
+                    results[url] = False
+                    continue
+                futures[transcript_pool.submit(download_transcript, video_id, save_path, language, use_cache)] = url
+            if not transcript_only:
+                futures[download_pool.submit(video_job, url)] = url
+        for future in as_completed(futures):
+            try:
+                ok = future.result()
+            except Exception as e:
+                print(f"✗ {futures[future]}: {e}")
+                ok = False
+            results[futures[future]] = results[futures[future]] and ok
+    for ydl in instances:
+        ydl.close()
+
+    succeeded = sum(1 for ok in results.values() if ok)
+    print(f"\n{succeeded}/{len(results)} videos downloaded to {save_path}")
+    for url, ok in results.items():
+        if not ok:
+            print(f"  ✗ {url}")
+    return results
+
+
+def download_transcript(video_id: str, save_path: str, language: str = "en", use_cache: bool = True):
     """
     Download English transcript for a YouTube video.
 
@@ -100,6 +215,7 @@ def download_transcript(video_id: str, save_path: str, language: str = "en"):
         video_id: YouTube video ID
         save_path: Directory to save the transcript
         language: Language code (default: 'en' for English)
+        use_cache: Serve from and store into the on-disk transcript cache
 
     Returns:
         bool: True if download succeeded, False otherwise
@@ -108,42 +224,41 @@ def download_transcript(video_id: str, save_path: str, language: str = "en"):
 
     try:
         print(f"\n📝 Fetching {language.upper()} transcript...")
-        ytt_api = YouTubeTranscriptApi()
-        transcript_list = ytt_api.list(video_id)
-
-        # Try to get transcript in requested language
-        try:
-            transcript = transcript_list.find_transcript([language])
-            fetched_transcript = transcript.fetch()
-            transcript_data = fetched_transcript.to_raw_data()
-            print(
-                f"✓ Found {language.upper()} transcript ({'auto-generated' if transcript.is_generated else 'manual'})"
-            )
-        except Exception as e:
-            print(f"✗ {language.upper()} transcript not available: {e}")
-            return False
+        cache = get_transcript_cache() if use_cache else None
+        fetched_transcript = cache.find(video_id, [language]) if cache else None
+
+        if fetched_transcript is None:
+            ytt_api = new_transcript_api()
+            with span("transcript.list"):
+                transcript_list = ytt_api.list(video_id)
+
+            # Try to get transcript in requested language
+            try:
+                transcript = transcript_list.find_transcript([language])
+                with span("transcript.fetch"):
+                    fetched_transcript = SegmentArray.from_transcript(transcript.fetch())
+            except Exception as e:
+                print(f"✗ {language.upper()} transcript not available: {e}")
+                return False
+            if cache:
+                cache.put(fetched_transcript)
+
+        print(
+            f"✓ Found {language.upper()} transcript ({'auto-generated' if fetched_transcript.is_generated else 'manual'})"
+        )
 
         # Get video title and format transcript
         video_title = get_video_title(video_id)
         current_date = datetime.datetime.now().strftime("%Y-%m-%d")
         transcript_filename = f"{video_title}_{current_date}_transcript_{language}.txt"
 
-        formatted_lines = [f"# {video_title}\n"]
-        formatted_lines.append(f"# Language: {language.upper()}\n")
-        formatted_lines.append(f"# Date: {current_date}\n\n")
-
-        for entry in transcript_data:
-            minutes = int(entry["start"] // 60)
-            seconds = int(entry["start"] % 60)
-            timestamp = f"[{minutes:02d}:{seconds:02d}]"
-            formatted_lines.append(f"{timestamp} {entry['text']}\n")
-
-        formatted_transcript = "".join(formatted_lines)
-
-        # Save transcript
+        # Lines are written as they are formatted; the whole file is never held in memory
         transcript_path = os.path.join(save_path, transcript_filename)
-        with open(transcript_path, "w", encoding="utf-8") as f:
-            f.write(formatted_transcript)
+        with span("transcript.save"), open(transcript_path, "w", encoding="utf-8") as f:
+            f.write(f"# {video_title}\n")
+            f.write(f"# Language: {language.upper()}\n")
+            f.write(f"# Date: {current_date}\n\n")
+            f.writelines(iter_timestamped_lines(fetched_transcript))
 
         print(f"✓ Transcript saved to: {transcript_path}")
         return True
@@ -174,9 +289,17 @@ Examples:
 
   # Download with Chinese transcript
   python video_downloader.py https://youtube.com/watch?v=VIDEO_ID --transcript --lang zh
+
+  # Download a list of videos (or a playlist/channel), 4 at a time, capped at 10 MB/s overall
+  python video_downloader.py --batch urls.txt --workers 4 --limit-rate 10M --transcript
         """,
     )
-    parser.add_argument("url", help="YouTube video URL")
+    parser.add_argument("url", nargs="?", help="YouTube video URL")
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="File with one video, playlist or channel URL per line ('-' for stdin)",
+    )
     parser.add_argument(
         "--save-path",
         default="./downloads",
@@ -193,24 +316,67 @@ Examples:
     parser.add_argument(
         "--lang", default="en", help="Transcript language code (default: en)"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the on-disk transcript cache",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=3, help="Videos downloaded at the same time in batch mode (default: 3)"
+    )
+    parser.add_argument(
+        "--limit-rate",
+        metavar="RATE",
+        help="Total download speed cap across all workers, e.g. 5M or 800K bytes/second",
+    )
+    parser.add_argument(
+        "--fragments", type=int, default=4, help="Fragments downloaded concurrently per video (default: 4)"
+    )
 
     args = parser.parse_args()
+    if not args.url and not args.batch:
+        parser.error("give a video URL or --batch FILE")
+
+    rate_limit = None
+    if args.limit_rate:
+        rate_limit = yt_dlp.utils.parse_bytes(args.limit_rate)
+        if not rate_limit:
+            parser.error(f"invalid --limit-rate: {args.limit_rate}")
+
+    if args.batch:
+        if args.batch == '-':
+            urls = read_urls(sys.stdin)
+        else:
+            with open(args.batch, 'r', encoding='utf-8') as f:
+                urls = read_urls(f)
+        urls = expand_inputs(urls)
+        print(f"Downloading {len(urls)} videos with {args.workers} workers")
+        results = download_batch(urls, args.save_path, args.workers, rate_limit, args.fragments,
+                                 args.transcript, args.transcript_only, args.lang, use_cache=not args.no_cache)
+        if not all(results.values()):
+            sys.exit(1)
+        return
 
     # Extract video ID
-    video_id = extract_video_id(args.url)
-    if not video_id:
+    try:
+        video_id = extract_video_id(args.url)
+    except ValueError:
         print("✗ Invalid YouTube URL")
         return
 
     print(f"Video ID: {video_id}")
 
-    # Download transcript if requested
-    if args.transcript or args.transcript_only:
-        download_transcript(video_id, args.save_path, args.lang)
-
-    # Download video unless transcript-only mode
-    if not args.transcript_only:
-        download_youtube_video(args.url, args.save_path)
+    # Fetch the transcript in the background while the video downloads
+    with ThreadPoolExecutor(1, thread_name_prefix="transcript") as transcript_pool:
+        if args.transcript or args.transcript_only:
+            transcript_pool.submit(download_transcript, video_id, args.save_path, args.lang,
+                                   use_cache=not args.no_cache)
+
+        # Download video unless transcript-only mode
+        if not args.transcript_only:
+            options = build_ydl_options(args.save_path, rate_limit, args.fragments)
+            with yt_dlp.YoutubeDL(options) as ydl:
+                download_youtube_video(args.url, args.save_path, ydl)
 
 
 if __name__ == "__main__":
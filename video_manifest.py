@@ -0,0 +1,96 @@
+"""
+Persistent record of videos that have already been summarized.
+
+Each row is one (video, prompt, provider, model) tuple, where prompt is a
+hash of prompt.txt, so re-running a playlist or channel only processes new
+uploads, while changing the prompt or model makes every video eligible again.
+Stored in SQLite next to the usage ledger.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Iterable, List, Optional
+
+from config.config_manager import get_setting
+from prompt_formatter import load_system_prompt
+
+
+DEFAULT_MANIFEST_PATH = os.path.join(os.path.dirname(__file__), "data", "manifest.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed (
+    video_id TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    output_path TEXT,
+    processed_at REAL NOT NULL,
+    PRIMARY KEY (video_id, prompt_hash, provider, model)
+);
+"""
+
+# SQLite's default limit on host parameters per statement is 999
+_QUERY_BATCH = 500
+
+
+class VideoManifest:
+    """
+    Processed-video manifest for one prompt/provider/model combination.
+
+    Args:
+        provider: Provider name, or "router" for routed runs
+        model: Model name, or the route list for routed runs
+        prompt_text: System prompt the summaries depend on (default: prompt.txt)
+        path: SQLite database file (default: MANIFEST_PATH or data/manifest.db)
+    """
+
+    def __init__(self, provider: str, model: str, prompt_text: Optional[str] = None,
+                 path: Optional[str] = None):
+        self.provider = provider
+        self.model = model
+        prompt_text = load_system_prompt() if prompt_text is None else prompt_text
+        self.prompt_hash = hashlib.sha256(prompt_text.encode('utf-8')).hexdigest()[:16]
+        self.path = path or get_setting("MANIFEST_PATH", DEFAULT_MANIFEST_PATH)
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def filter_new(self, video_ids: Iterable[str]) -> List[str]:
+        """Return the video IDs not yet processed with this prompt and model, in order."""
+        video_ids = list(video_ids)
+        done = set()
+        conn = self._connect()
+        try:
+            for i in range(0, len(video_ids), _QUERY_BATCH):
+                batch = video_ids[i:i + _QUERY_BATCH]
+                rows = conn.execute(
+                    f"SELECT video_id FROM processed WHERE prompt_hash = ? AND provider = ? AND model = ? "
+                    f"AND video_id IN ({', '.join('?' * len(batch))})",
+                    [self.prompt_hash, self.provider, self.model] + batch,
+                ).fetchall()
+                done.update(row[0] for row in rows)
+        finally:
+            conn.close()
+        return [video_id for video_id in video_ids if video_id not in done]
+
+    def mark_processed(self, video_id: str, output_path: Optional[str] = None):
+        """Record a finished video. Errors are printed, never raised."""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO processed (video_id, prompt_hash, provider, model, output_path, "
+                        "processed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (video_id, self.prompt_hash, self.provider, self.model, output_path, time.time()),
+                    )
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError) as e:
+            print(f"[VideoManifest] Could not record {video_id}: {e}")
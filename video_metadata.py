@@ -0,0 +1,161 @@
+"""
+Lightweight video metadata lookup with in-memory and on-disk caching.
+
+Titles are resolved in this order:
+1. Metadata already seen in this run (e.g. registered from yt_dlp's extract_info)
+2. The on-disk cache under cache/metadata/
+3. YouTube's oEmbed endpoint (a few hundred bytes of JSON)
+4. A streamed read of the watch page that stops at the title meta tag
+"""
+
+import html
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+from config.config_manager import get_setting
+from http_client import get_http_client
+from tracing import span, record_bytes
+from deadline import stage_timeout
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache", "metadata")
+DEFAULT_YOUTUBE_BASE_URL = "https://www.youtube.com"
+
+_TITLE_META_RE = re.compile(rb'<meta name="title" content="([^"]+)"')
+# Give up on the streamed watch page once this much has been read
+_MAX_WATCH_PAGE_BYTES = 512 * 1024
+
+_memory: Dict[str, Dict] = {}
+_memory_lock = threading.Lock()
+
+
+def _youtube_url(path: str) -> str:
+    # YOUTUBE_BASE_URL lets the benchmarks point lookups at a local server
+    return get_setting("YOUTUBE_BASE_URL", DEFAULT_YOUTUBE_BASE_URL) + path
+
+
+def _cache_path(video_id: str) -> str:
+    cache_dir = get_setting("METADATA_CACHE_DIR", DEFAULT_CACHE_DIR)
+    return os.path.join(cache_dir, f"{video_id}.json")
+
+
+def _load_from_disk(video_id: str) -> Optional[Dict]:
+    try:
+        with open(_cache_path(video_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_to_disk(metadata: Dict):
+    path = _cache_path(metadata['video_id'])
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[VideoMetadata] Could not write metadata cache: {e}")
+
+
+def remember_metadata(video_id: str, title: str, channel: Optional[str] = None, **extra) -> Dict:
+    """
+    Register metadata fetched elsewhere (e.g. yt_dlp info) so later lookups
+    in this run, and later runs, skip the network.
+
+    Returns:
+        The stored metadata dict
+    """
+    metadata = {'video_id': video_id, 'title': title, 'channel': channel, 'fetched_at': time.time()}
+    metadata.update(extra)
+    with _memory_lock:
+        _memory[video_id] = metadata
+    _save_to_disk(metadata)
+    return metadata
+
+
+@span("metadata.oembed")
+def fetch_oembed(video_id: str) -> Optional[Dict]:
+    """
+    Fetch title and channel from the oEmbed endpoint.
+    Returns None if the video is not embeddable or the request fails.
+    """
+    response = get_http_client().get(
+        _youtube_url("/oembed"),
+        params={'url': f"{DEFAULT_YOUTUBE_BASE_URL}/watch?v={video_id}", 'format': 'json'},
+        timeout=stage_timeout("metadata"), stage="metadata",
+    )
+    if response.status_code != 200:
+        return None
+    data = response.json()
+    if not data.get('title'):
+        return None
+    return {'title': data['title'], 'channel': data.get('author_name')}
+
+
+@span("metadata.watch_page")
+def fetch_title_from_watch_page(video_id: str) -> Optional[str]:
+    """
+    Stream the watch page and stop reading as soon as the title meta tag is found.
+    """
+    response = get_http_client().get(_youtube_url("/watch"), params={'v': video_id}, stream=True,
+                                     timeout=stage_timeout("metadata"), stage="metadata")
+    try:
+        response.raise_for_status()
+        buffer = b""
+        for chunk in response.iter_content(chunk_size=16 * 1024):
+            buffer += chunk
+            record_bytes(received=len(chunk))
+            match = _TITLE_META_RE.search(buffer)
+            if match:
+                return html.unescape(match.group(1).decode('utf-8', errors='replace'))
+            if b"</head>" in buffer or len(buffer) > _MAX_WATCH_PAGE_BYTES:
+                return None
+        return None
+    finally:
+        response.close()
+
+
+def get_cached_metadata(video_id: str) -> Optional[Dict]:
+    """
+    Return metadata already known in memory or on disk, without any network call.
+    """
+    with _memory_lock:
+        metadata = _memory.get(video_id)
+    if metadata:
+        return metadata
+    metadata = _load_from_disk(video_id)
+    if metadata:
+        with _memory_lock:
+            _memory[video_id] = metadata
+    return metadata
+
+
+def get_video_metadata(video_id: str) -> Optional[Dict]:
+    """
+    Return {'video_id', 'title', 'channel', ...} for a video, or None if the
+    title could not be determined.
+    """
+    metadata = get_cached_metadata(video_id)
+    if metadata:
+        return metadata
+
+    try:
+        found = fetch_oembed(video_id)
+        if found is None:
+            title = fetch_title_from_watch_page(video_id)
+            found = {'title': title, 'channel': None} if title else None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"[VideoMetadata] Error fetching metadata: {e}")
+        return None
+
+    if found is None:
+        return None
+    return remember_metadata(video_id, found['title'], found['channel'])
@@ -0,0 +1,157 @@
+"""
+Expansion of batch inputs into individual videos.
+
+Inputs may be single-video URLs, bare video IDs, playlist URLs or channel
+URLs. Single videos are normalized without any network access; playlists
+and channels are expanded with yt_dlp's flat extraction, which reads only
+the listing pages and not each video's info. Duplicates are removed both
+before expansion and across the expanded result.
+"""
+
+import re
+from typing import Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from video_metadata import remember_metadata
+from tracing import span
+
+
+WATCH_URL = "https://www.youtube.com/watch?v={}"
+
+_VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+_YOUTUBE_HOSTS = ('www.youtube.com', 'youtube.com', 'm.youtube.com')
+_CHANNEL_PREFIXES = ('/@', '/channel/', '/c/', '/user/')
+_CHANNEL_TABS = ('videos', 'shorts', 'streams', 'playlists', 'featured')
+# Path forms /<prefix>/<video id> that name a single video
+_VIDEO_PATH_PREFIXES = ('shorts', 'embed', 'live')
+
+
+def collection_url(url: str) -> Optional[str]:
+    """
+    Return the URL to list if `url` is a playlist or channel, else None.
+    Channel URLs without a tab are pointed at their /videos tab so the
+    listing holds videos rather than nested tab playlists.
+    """
+    parsed = urlparse(url.strip().strip('"\''))
+    if parsed.hostname not in _YOUTUBE_HOSTS:
+        return None
+    if parsed.path == '/playlist' and 'list' in parse_qs(parsed.query):
+        return parsed.geturl()
+    if parsed.path.startswith(_CHANNEL_PREFIXES):
+        parts = [part for part in parsed.path.split('/') if part]
+        if parts[-1] not in _CHANNEL_TABS:
+            parts.append('videos')
+        return f"https://www.youtube.com/{'/'.join(parts)}"
+    return None
+
+
+def _normalize(source: str) -> Optional[str]:
+    """
+    Return the video ID for a bare ID or a single-video URL (watch?v=,
+    youtu.be/, /shorts/, /embed/, /live/), else None. Playlist and
+    channel URLs are never taken for videos.
+    """
+    source = source.strip().strip('"\'')
+    if _VIDEO_ID_RE.match(source):
+        return source
+    if collection_url(source):
+        return None
+    parsed = urlparse(source)
+    if parsed.hostname in _YOUTUBE_HOSTS:
+        parts = [part for part in parsed.path.split('/') if part]
+        if parsed.path == '/watch':
+            video_id = parse_qs(parsed.query).get('v', [None])[0]
+        elif len(parts) == 2 and parts[0] in _VIDEO_PATH_PREFIXES:
+            video_id = parts[1]
+        else:
+            return None
+    elif parsed.hostname == 'youtu.be':
+        video_id = parsed.path.strip('/')
+    else:
+        return None
+    return video_id if video_id and _VIDEO_ID_RE.match(video_id) else None
+
+
+@span("sources.expand")
+def expand_collection(url: str, max_videos: int = 0) -> List[str]:
+    """
+    List the video IDs of a playlist or channel tab using flat extraction.
+    Titles and channel names from the listing are remembered, so later
+    title lookups for these videos need no request.
+
+    Args:
+        url: Playlist or channel URL (see collection_url)
+        max_videos: Stop after this many entries, newest first for channels (0: all)
+    """
+    # Imported here so single-video batches do not require yt_dlp
+    import yt_dlp
+
+    ydl_opts = {
+        "extract_flat": "in_playlist",
+        "skip_download": True,
+        "quiet": True,
+        "no_warnings": True,
+    }
+    if max_videos:
+        ydl_opts["playlistend"] = max_videos
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+
+    video_ids = []
+    for entry in info.get('entries') or []:
+        if not entry or entry.get('ie_key', 'Youtube') != 'Youtube' or not entry.get('id'):
+            continue
+        video_ids.append(entry['id'])
+        if entry.get('title'):
+            remember_metadata(entry['id'], entry['title'], entry.get('channel') or info.get('channel'))
+    print(f"[VideoSources] {len(video_ids)} videos in {info.get('title') or url}")
+    return video_ids
+
+
+def expand_inputs(sources: Iterable[str], max_videos: int = 0) -> List[str]:
+    """
+    Turn batch inputs into a de-duplicated list of watch URLs, in input order.
+    Inputs that are neither videos nor collections are passed through
+    unchanged so the batch reports them as invalid.
+
+    Args:
+        sources: URLs or video IDs, one per item
+        max_videos: Per-collection limit passed to expand_collection
+    """
+    # De-duplicate the raw inputs before any collection is fetched
+    unique_inputs = []
+    seen_inputs = set()
+    duplicates = 0
+    for source in sources:
+        video_id = _normalize(source)
+        key = ('video', video_id) if video_id else ('collection', collection_url(source) or source)
+        if key in seen_inputs:
+            duplicates += 1
+            continue
+        seen_inputs.add(key)
+        unique_inputs.append(key)
+
+    urls = []
+    seen_videos = set()
+    for kind, value in unique_inputs:
+        if kind == 'video':
+            video_ids = [value]
+        elif collection_url(value):
+            try:
+                video_ids = expand_collection(value, max_videos)
+            except Exception as e:
+                print(f"[VideoSources] Could not expand {value}: {e}")
+                urls.append(value)
+                continue
+        else:
+            urls.append(value)
+            continue
+        for video_id in video_ids:
+            if video_id in seen_videos:
+                duplicates += 1
+                continue
+            seen_videos.add(video_id)
+            urls.append(WATCH_URL.format(video_id))
+    if duplicates:
+        print(f"[VideoSources] Skipped {duplicates} duplicate videos")
+    return urls
@@ -1,16 +1,391 @@
 import sys
 import os
+import argparse
 import datetime
 import json
 
-from config.config_manager import load_api_keys
-from youtube_utils import extract_video_id
-from transcript_handler import get_transcript
-from summarizer import get_summary
+from config.config_manager import load_api_keys, get_setting
+from youtube_utils import extract_video_id, read_urls
+from transcript_handler import get_transcript, RENDER_MODES
+from summarizer import save_summary, StreamingSummaryWriter, DEFAULT_MODELS
+from chunked_summarizer import summarize_transcript
 from prompt_formatter import format_prompt, save_formatted_prompt
+from batch_pipeline import BatchPipeline
+from job_service import JobService, serve
+from provider_router import ProviderRouter, parse_routes
+from model_policy import PolicyRouter, load_policy, DEFAULT_POLICY_PATH
+from video_sources import expand_inputs
+from video_manifest import VideoManifest
+from batch_queue import BatchQueue
+from artifact_store import store_artifact
+from tracing import Trace, use_trace, print_stage_table
+from deadline import Deadline, DeadlineExceeded
+
+
+DEFAULT_TRACE_LOG = os.path.join(os.path.dirname(__file__), "logs", "trace.jsonl")
+
+# Options recorded with each batch run and restored by --resume
+RESUME_OPTIONS = ("provider", "model", "route", "model_policy", "hedge_after", "route_timeout", "transcript_only",
+                  "no_cache", "stream", "render", "render_interval", "no_dedupe", "chunk_tokens", "deadline")
+
+PROVIDER_KEYS = {
+    "openai": ("openai_api_key", "OPENAI_API_KEY"),
+    "grok": ("grok_api_key", "GROK_API_KEY"),
+    "openrouter": ("openrouter_api_key", "OPENROUTER_API_KEY"),
+}
+
+
+def build_router(args) -> ProviderRouter:
+    """
+    Build a ProviderRouter from --route, exiting with a message if a route is
+    invalid or its provider has no API key.
+    """
+    api_keys = load_api_keys()
+    keys = {provider: api_keys.get(key_name) for provider, (key_name, _) in PROVIDER_KEYS.items()}
+    try:
+        routes = parse_routes(args.route)
+        router = ProviderRouter(routes, keys, hedge_after=args.hedge_after, timeout=args.route_timeout)
+    except ValueError as e:
+        print(f"Invalid --route: {e}")
+        print("Set the API key for every provider in the route, e.g. "
+              + ", ".join(env_name for _, env_name in PROVIDER_KEYS.values()) + " in the .env file")
+        sys.exit(1)
+    print(f"Routing summaries across: {', '.join(str(r) for r in routes)}")
+    return router
+
+
+def build_policy_router(args) -> PolicyRouter:
+    """
+    Build a PolicyRouter from --model-policy, exiting with a message if the
+    policy file is invalid or a provider it uses has no API key.
+    """
+    api_keys = load_api_keys()
+    keys = {provider: api_keys.get(key_name) for provider, (key_name, _) in PROVIDER_KEYS.items()}
+    try:
+        policy = load_policy(None if args.model_policy is True else args.model_policy)
+    except ValueError as e:
+        print(f"Invalid --model-policy: {e}")
+        sys.exit(1)
+    try:
+        router = PolicyRouter(policy, keys, hedge_after=args.hedge_after, timeout=args.route_timeout)
+    except ValueError as e:
+        print(f"--model-policy: {e}")
+        print("Set the API key for every provider the policy uses, e.g. "
+              + ", ".join(env_name for _, env_name in PROVIDER_KEYS.values()) + " in the .env file")
+        sys.exit(1)
+    print("Choosing models by transcript size:")
+    for rule in router.policy.rules:
+        print(f"  {rule.describe()} -> {', '.join(str(r) for r in rule.routes)}")
+    return router
+
+
+def skip_processed(urls, manifest: VideoManifest):
+    """
+    Drop URLs whose videos the manifest already lists for this prompt and model.
+    Inputs that are not video URLs are kept so the batch reports them.
+    """
+    video_ids = {}
+    for url in urls:
+        try:
+            video_ids[url] = extract_video_id(url)
+        except ValueError:
+            pass
+    new_ids = set(manifest.filter_new(video_ids.values()))
+    kept = [url for url in urls if url not in video_ids or video_ids[url] in new_ids]
+    if len(kept) < len(urls):
+        print(f"[Batch] Skipping {len(urls) - len(kept)} videos already summarized with this prompt and model "
+              f"(use --reprocess to redo them)")
+    return kept
+
+
+def build_pipeline(args, run=None):
+    """
+    Build the BatchPipeline and processed-video manifest described by the
+    command line, exiting with a message if an API key is missing.
+    `run` is the BatchRun the pipeline records video states in.
+
+    Returns:
+        (pipeline, manifest), where manifest is None in transcript-only mode
+    """
+    api_key = None
+    router = None
+    if args.model_policy and not args.transcript_only:
+        router = build_policy_router(args)
+    elif args.route and not args.transcript_only:
+        router = build_router(args)
+    elif not args.transcript_only:
+        key_name, env_name = PROVIDER_KEYS[args.provider]
+        api_key = load_api_keys().get(key_name)
+        if not api_key:
+            print(f"Please set {args.provider} API key")
+            print(f"You can add {env_name}=your_key in the .env file")
+            sys.exit(1)
+
+    manifest = None
+    if not args.transcript_only:
+        if isinstance(router, PolicyRouter):
+            manifest = VideoManifest("policy", router.policy.describe())
+        elif router:
+            manifest = VideoManifest("router", args.route)
+        else:
+            model = args.model if args.provider == "openrouter" and args.model else DEFAULT_MODELS[args.provider]
+            manifest = VideoManifest(args.provider, model)
+
+    pipeline = BatchPipeline(
+        api_key=api_key,
+        grok=args.provider == "grok",
+        use_openai=args.provider == "openai",
+        openrouter_model=args.model,
+        transcript_only=args.transcript_only,
+        transcript_workers=args.transcript_workers,
+        title_workers=args.title_workers,
+        llm_workers=args.llm_workers,
+        prefetch=args.prefetch,
+        use_cache=not args.no_cache,
+        stream=args.stream,
+        chunk_tokens=args.chunk_tokens,
+        chunk_workers=args.chunk_workers,
+        render_mode=args.render,
+        render_interval=args.render_interval,
+        dedupe=not args.no_dedupe,
+        trace_log=args.trace,
+        router=router,
+        manifest=manifest,
+        run=run,
+        deadline=args.deadline,
+    )
+    return pipeline, manifest
+
+
+def run_batch(args):
+    """
+    Run the non-interactive batch mode with URLs from a file or stdin, or
+    resume an earlier run with --resume.
+    """
+    queue = BatchQueue()
+    if args.resume:
+        run = queue.get_run(args.resume)
+        if run is None:
+            print(f"Unknown batch run: {args.resume}")
+            sys.exit(1)
+        for name, value in run.options().items():
+            setattr(args, name, value)
+        urls = run.remaining(args.max_attempts)
+        print(f"[Batch] Resuming run {run.run_id}: {len(urls)} videos left")
+        pipeline, _ = build_pipeline(args, run)
+    else:
+        if args.batch == '-':
+            urls = read_urls(sys.stdin)
+        else:
+            with open(args.batch, 'r', encoding='utf-8') as f:
+                urls = read_urls(f)
+
+        pipeline, manifest = build_pipeline(args)
+        urls = expand_inputs(urls, args.max_videos)
+        if manifest and not args.reprocess:
+            urls = skip_processed(urls, manifest)
+        run = queue.create_run(urls, {name: getattr(args, name) for name in RESUME_OPTIONS})
+        pipeline.run_record = run
+        print(f"[Batch] Run {run.run_id}: processing {len(urls)} URLs")
+
+    try:
+        results = pipeline.run(urls)
+    except KeyboardInterrupt:
+        print("\nProgram interrupted by user.")
+        print(f"Resume with: python youtube_summary.py --resume {run.run_id}")
+        sys.exit(130)
+    counts = run.counts()
+    failed = counts.get('failed', 0) + counts.get('timed_out', 0)
+    if failed:
+        print(f"[Batch] {failed} videos failed or timed out; retry them with --resume {run.run_id}")
+    if not all(r.ok for r in results):
+        sys.exit(1)
+
+
+def run_service(args):
+    """
+    Run the HTTP job service on --serve [HOST:]PORT with the pipeline
+    options from the command line.
+    """
+    host, _, port = args.serve.rpartition(':')
+    try:
+        port = int(port)
+    except ValueError:
+        print(f"Invalid --serve address: {args.serve}")
+        sys.exit(1)
+    pipeline, manifest = build_pipeline(args)
+    service = JobService(pipeline, manifest, max_queue=args.max_queue, max_videos=args.max_videos)
+    serve(service, host or "127.0.0.1", port)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Summarize YouTube videos. Runs interactively unless --batch or --serve is given.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Interactive mode
+  python youtube_summary.py
+
+  # Summarize every URL in a file with Grok
+  python youtube_summary.py --batch urls.txt --provider grok
+
+  # Fail over from Claude to GPT, hedging after 8 seconds without output
+  python youtube_summary.py --batch urls.txt --stream --route openrouter:anthropic/claude-sonnet-4.5,openai:gpt-5.1 --hedge-after 8
+
+  # Summarize a channel's uploads; re-running only processes new videos
+  echo https://www.youtube.com/@channel | python youtube_summary.py --batch - --provider grok
+
+  # Short videos to a fast model, long ones to a long-context model (config/model_routing.json)
+  python youtube_summary.py --batch urls.txt --model-policy
+
+  # Continue the newest batch run after a crash or Ctrl-C
+  python youtube_summary.py --resume last
+
+  # Read URLs from stdin and only save formatted prompts
+  cat urls.txt | python youtube_summary.py --batch - --transcript-only
+
+  # Keep a warm job service running and submit videos over HTTP
+  python youtube_summary.py --serve 8765 --provider grok
+  curl -d '{"urls": ["https://youtu.be/VIDEO_ID"]}' http://127.0.0.1:8765/jobs
+        """,
+    )
+    parser.add_argument("--batch", metavar="FILE",
+                        help="File with one video, playlist or channel URL per line ('-' for stdin)")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue an interrupted batch run ('last' for the newest) with its original options")
+    parser.add_argument("--max-attempts", type=int, default=3,
+                        help="With --resume, skip failed videos already tried this many times (default: 3)")
+    parser.add_argument("--serve", metavar="[HOST:]PORT",
+                        help="Run the HTTP job service instead (host defaults to 127.0.0.1)")
+    parser.add_argument("--max-queue", type=int, default=100,
+                        help="With --serve, unfinished videos beyond which submissions get 429 (default: 100)")
+    parser.add_argument("--provider", choices=sorted(PROVIDER_KEYS), default="openai",
+                        help="API platform for batch and service mode (default: openai)")
+    parser.add_argument("--model", help="Model name for OpenRouter (default: openai/gpt-5.1)")
+    parser.add_argument("--route", metavar="PROVIDER[:MODEL],...",
+                        help="Ordered provider/model list to fail over across, e.g. "
+                             "'openrouter:anthropic/claude-sonnet-4.5,openai:gpt-5.1,grok' (overrides --provider)")
+    # Without FILE the flag is True and load_policy resolves MODEL_POLICY_PATH or the default file
+    parser.add_argument("--model-policy", nargs="?", const=True, metavar="FILE",
+                        help="Choose provider and model per call by transcript size from a rules file "
+                             f"(default file: MODEL_POLICY_PATH or {DEFAULT_POLICY_PATH}; "
+                             "overrides --provider and --route)")
+    parser.add_argument("--hedge-after", type=float, default=0.0, metavar="SECONDS",
+                        help="With --route or --model-policy, also send the request to the next route if the first has not "
+                             "produced a first byte within this time (default: 0, no hedging)")
+    parser.add_argument("--route-timeout", type=float, metavar="SECONDS",
+                        help="With --route or --model-policy, read timeout per attempt before failing over (default: HTTP_READ_TIMEOUT)")
+    parser.add_argument("--deadline", type=float, default=get_setting("VIDEO_DEADLINE", 0.0), metavar="SECONDS",
+                        help="Give up on a video whose stages take longer than this in total, recording it as "
+                             "timed out; in batch mode time queued for a worker does not count "
+                             "(default: VIDEO_DEADLINE or 0, no deadline)")
+    parser.add_argument("--max-videos", type=int, default=0,
+                        help="Per playlist/channel, only take the first N videos (newest first for channels)")
+    parser.add_argument("--reprocess", action="store_true",
+                        help="Summarize videos even if the manifest lists them as done")
+    parser.add_argument("--transcript-only", action="store_true",
+                        help="Save formatted prompts only, no API call")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Bypass the transcript and summary caches")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream the summary, writing tokens to the summary file as they arrive")
+    parser.add_argument("--render", choices=RENDER_MODES, default="full",
+                        help="Transcript form sent to the LLM; the full form is always saved (default: full)")
+    parser.add_argument("--render-interval", type=int, default=60,
+                        help="Seconds per paragraph for compact renderings (default: 60)")
+    parser.add_argument("--no-dedupe", action="store_true",
+                        help="Keep auto-caption overlap between consecutive entries")
+    parser.add_argument("--trace", nargs="?", const=DEFAULT_TRACE_LOG, metavar="FILE",
+                        help=f"Append per-video stage timings as JSONL (default file: {DEFAULT_TRACE_LOG})")
+    parser.add_argument("--chunk-tokens", type=int, default=0,
+                        help="Map-reduce transcripts longer than this many tokens (default: 0, disabled)")
+    parser.add_argument("--chunk-workers", type=int, default=4,
+                        help="Concurrent chunk summaries in map-reduce mode (default: 4)")
+    parser.add_argument("--transcript-workers", type=int, default=4,
+                        help="Concurrent transcript fetches (default: 4)")
+    parser.add_argument("--title-workers", type=int, default=4,
+                        help="Concurrent title lookups (default: 4)")
+    parser.add_argument("--llm-workers", type=int, default=2,
+                        help="Concurrent LLM calls (default: 2)")
+    parser.add_argument("--prefetch", type=int, default=8,
+                        help="Videos fetched ahead of the LLM stage (default: 8)")
+    return parser.parse_args(argv)
+
+
+def process_video(video_id, args, transcript_only_mode, api_key, use_grok, use_openai, selected_model,
+                  router=None) -> bool:
+    """
+    Fetch one video's transcript, then summarize it or save the formatted prompt.
+    Returns True on success.
+    """
+    transcript_content, video_title = get_transcript(video_id, use_cache=not args.no_cache,
+                                                     render_mode=args.render, render_interval=args.render_interval,
+                                                     dedupe=not args.no_dedupe)
+    current_date = datetime.datetime.now().strftime('%Y-%m-%d')
+
+    if transcript_content and video_title:
+        if transcript_only_mode:
+            # Transcript-only mode: format and save prompt without calling LLM
+            print("\nFormatting prompt...")
+            formatted_prompt = format_prompt(transcript_content)
+            prompt_path = save_formatted_prompt(formatted_prompt, video_title, current_date, video_id)
+            print(f"\nFormatted prompt saved to {prompt_path}")
+            print("(No API call was made)")
+            return True
+        else:
+            # Summary mode: call LLM API
+            print("\nGenerating summary...")
+            if args.stream:
+                # Tokens are printed and appended to the summary file as they arrive
+                print("\nSummary:")
+                with StreamingSummaryWriter(video_title, current_date, echo=True) as writer:
+                    result = summarize_transcript(transcript_content, api_key, grok=use_grok, use_openai=use_openai,
+                                                  openrouter_model=selected_model, use_cache=not args.no_cache,
+                                                  stream=True, on_token=writer, chunk_tokens=args.chunk_tokens,
+                                                  chunk_workers=args.chunk_workers, video_id=video_id,
+                                                  router=router)
+                if result:
+                    store_artifact(video_id, 'summary', result['choices'][0]['message']['content'], video_title,
+                                   result.get('model'))
+                    print(f"\nSummary saved to {writer.path}")
+                else:
+                    print(f"\nPartial summary kept at {writer.path}")
+                    print("API call failed, please check error messages and ensure your API key is correct.")
+                return bool(result)
+            else:
+                result = summarize_transcript(transcript_content, api_key, grok=use_grok, use_openai=use_openai,
+                                              openrouter_model=selected_model, use_cache=not args.no_cache,
+                                              chunk_tokens=args.chunk_tokens, chunk_workers=args.chunk_workers,
+                                              video_id=video_id, router=router)
+
+                if result:
+                    try:
+                        summary = result['choices'][0]['message']['content']
+                        print("\nSummary:")
+                        print(summary)
+
+                        summary_path = save_summary(summary, video_title, current_date, video_id,
+                                                    result.get('model'))
+                        print(f"\nSummary saved to {summary_path}")
+                        return True
+                    except KeyError as e:
+                        print(f"Error parsing API response: {e}")
+                        print("API response:", json.dumps(result, indent=2, ensure_ascii=False))
+                else:
+                    print("API call failed, please check error messages and ensure your API key is correct.")
+    return False
 
 
 def main():
+    args = parse_args()
+    if args.serve:
+        run_service(args)
+        return
+    if args.batch or args.resume:
+        run_batch(args)
+        return
+
     # Ask user to select mode
     print("Please select mode:")
     print("1. Generate summary (requires API)")
@@ -39,8 +414,13 @@ def main():
     use_grok = False
     use_openai = False
     selected_model = None
-    
-    if not transcript_only_mode:
+    router = None
+
+    if not transcript_only_mode and args.model_policy:
+        router = build_policy_router(args)
+    elif not transcript_only_mode and args.route:
+        router = build_router(args)
+    elif not transcript_only_mode:
         api_keys = load_api_keys()
         openai_api_key = api_keys.get("openai_api_key")
         grok_api_key = api_keys.get("grok_api_key")
@@ -110,44 +490,22 @@ def main():
             url = input("Please enter YouTube video URL (or enter 'q' to quit): ")
             if url.lower() == 'q':
                 print("Program ended!")
+                if router:
+                    router.print_stats()
+                if args.trace:
+                    print_stage_table()
                 break
 
             video_id = extract_video_id(url)
-            transcript_content, video_title = get_transcript(video_id)
-            current_date = datetime.datetime.now().strftime('%Y-%m-%d')
-
-            if transcript_content and video_title:
-                if transcript_only_mode:
-                    # Transcript-only mode: format and save prompt without calling LLM
-                    print("\nFormatting prompt...")
-                    formatted_prompt = format_prompt(transcript_content)
-                    prompt_path = save_formatted_prompt(formatted_prompt, video_title, current_date)
-                    print(f"\nFormatted prompt saved to {prompt_path}")
-                    print("(No API call was made)")
-                else:
-                    # Summary mode: call LLM API
-                    print("\nGenerating summary...")
-                    result = get_summary(transcript_content, api_key, grok=use_grok, use_openai=use_openai, openrouter_model=selected_model)
-
-                    if result:
-                        try:
-                            summary = result['choices'][0]['message']['content']
-                            print("\nSummary:")
-                            print(summary)
-
-                            summary_filename = f"{current_date}_{video_title}_summary.md"
-                            summary_dir = os.path.join(os.path.dirname(__file__), "summary", current_date)
-                            if not os.path.exists(summary_dir):
-                                os.makedirs(summary_dir)
-                            summary_path = os.path.join(summary_dir, summary_filename)
-                            with open(summary_path, 'w', encoding='utf-8') as f:
-                                f.write(summary)
-                            print(f"\nSummary saved to {summary_path}")
-                        except KeyError as e:
-                            print(f"Error parsing API response: {e}")
-                            print("API response:", json.dumps(result, indent=2, ensure_ascii=False))
-                    else:
-                        print("API call failed, please check error messages and ensure your API key is correct.")
+            trace = Trace(video_id, args.trace, Deadline(args.deadline) if args.deadline else None)
+            try:
+                with use_trace(trace):
+                    ok = process_video(video_id, args, transcript_only_mode, api_key, use_grok, use_openai,
+                                       selected_model, router)
+                trace.finish("ok" if ok else "failed")
+            except DeadlineExceeded as e:
+                print(f"\n{e}, giving up on this video")
+                trace.finish("timeout", str(e))
             print("\nPlease enter the next video URL, or enter 'q' to quit")
 
         except ValueError as e:
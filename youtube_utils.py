@@ -1,6 +1,8 @@
-import re
-import requests
+from typing import Iterable, List
 from urllib.parse import urlparse, parse_qs
+from video_metadata import get_video_metadata
+from tracing import span
+from deadline import DeadlineExceeded
 
 
 def extract_video_id(url: str) -> str:
@@ -25,6 +27,18 @@ def extract_video_id(url: str) -> str:
         raise ValueError(f"Invalid YouTube URL: {str(e)}")
 
 
+def read_urls(lines: Iterable[str]) -> List[str]:
+    """
+    Read URLs from an iterable of lines, skipping blanks and '#' comments.
+    """
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls.append(line)
+    return urls
+
+
 def sanitize_filename(filename: str) -> str:
     """
     Sanitize a string to be a safe filename by removing invalid characters,
@@ -37,21 +51,20 @@ def sanitize_filename(filename: str) -> str:
     return filename
 
 
+@span("metadata.title")
 def get_video_title(video_id: str) -> str:
     """
     Fetch the YouTube video title using the video ID.
+    Uses cached or already-known metadata when available.
     Returns sanitized title or video ID as fallback.
     """
     try:
-        response = requests.get(f'https://www.youtube.com/watch?v={video_id}')
-        response.raise_for_status()
-        title_match = re.search(r'<meta name="title" content="([^"]+)"', response.text)
-        if title_match:
-            return sanitize_filename(title_match.group(1))
-        return video_id
-    except requests.exceptions.RequestException as e:
-        print(f"[YouTubeUtils] Error fetching video page: {e}")
+        metadata = get_video_metadata(video_id)
+        if metadata and metadata.get('title'):
+            return sanitize_filename(metadata['title'])
         return video_id
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"[YouTubeUtils] Could not get video title: {e}")
         return video_id